@@ -1,21 +1,46 @@
 import os
-from flask import Flask, request, render_template_string, send_file, redirect, url_for, flash, session, jsonify
+from flask import Flask, request, render_template_string, send_file, redirect, url_for, flash, session, jsonify, stream_with_context
 import ssl
+import _ssl
 import tempfile
 import hashlib
+import binascii
+import base64
 import secrets
 from cryptography import x509
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import rsa, ec, dsa, ed25519, ed448
 from cryptography.x509.oid import NameOID, ExtensionOID
+from cryptography.hazmat.primitives.serialization import pkcs7
+from cryptography.x509 import ocsp
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.exceptions import InvalidSignature, UnsupportedAlgorithm
 from fpdf import FPDF
 import urllib.request
+import urllib.error
+import mmap
+import struct
 import datetime
 import socket
 from urllib.parse import urlparse
 import concurrent.futures
+import asyncio
 import logging
-from io import BytesIO
+import csv
+import json
+import multiprocessing
+import atexit
+import random
+import fcntl
+import tarfile
+import zipfile
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import Mapping
+from io import BytesIO, StringIO
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from werkzeug.wrappers import Response
 
@@ -30,7 +55,7 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-ALLOWED_EXTENSIONS = {'.pem', '.der', '.crt', '.cer', '.key', '.pfx', '.p12'}
+ALLOWED_EXTENSIONS = {'.pem', '.der', '.crt', '.cer', '.key', '.pfx', '.p12', '.p7b', '.p7c'}
 TEMP_FILE_PREFIX = 'ssl_validator_'
 
 # Use system temp directory
@@ -42,6 +67,113 @@ if not URL_PREFIX.startswith('/'):
     URL_PREFIX = '/' + URL_PREFIX
 URL_PREFIX = URL_PREFIX.rstrip('/')
 
+# Cache shared by all workers on the host, kept across restarts
+SHARED_CACHE_ENABLED = os.environ.get('SHARED_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+SHARED_CACHE_DIR = os.environ.get('SHARED_CACHE_DIR', os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}cache"))
+SHARED_CACHE_MAX_BYTES = int(os.environ.get('SHARED_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Downloadable artifacts (chains, reports) stored per validation result
+ARTIFACT_DIR = os.environ.get('ARTIFACT_DIR', os.path.join(SHARED_CACHE_DIR, 'artifacts'))
+ARTIFACT_TTL = int(os.environ.get('ARTIFACT_TTL', 3600))  # seconds
+ARTIFACT_MAX_BYTES = int(os.environ.get('ARTIFACT_MAX_BYTES', 512 * 1024 * 1024))
+ARTIFACT_INLINE_MAX = int(os.environ.get('ARTIFACT_INLINE_MAX', 64 * 1024))  # larger artifacts are written to files
+
+# Background jobs: a persistent SQLite queue worked by threads in every app process
+JOB_DB = os.environ.get('JOB_DB', os.path.join(SHARED_CACHE_DIR, 'jobs.sqlite3'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # per process; 0 only accepts jobs
+JOB_LEASE = int(os.environ.get('JOB_LEASE', 600))  # seconds before a job whose worker went silent is retried
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_TTL = int(os.environ.get('JOB_TTL', 24 * 3600))  # seconds finished jobs are kept
+JOB_POLL_INTERVAL = 1.0  # seconds between queue checks of an idle worker
+
+# Continuous monitoring of an endpoint inventory; one process per host runs the scheduler
+MONITOR_ENABLED = os.environ.get('MONITOR_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+MONITOR_DB = os.environ.get('MONITOR_DB', os.path.join(SHARED_CACHE_DIR, 'monitor.sqlite3'))
+MONITOR_INTERVAL = int(os.environ.get('MONITOR_INTERVAL', 3600))  # seconds between probes of an endpoint
+MONITOR_JITTER = float(os.environ.get('MONITOR_JITTER', 0.1))  # +/- fraction of the interval
+MONITOR_CONCURRENCY = int(os.environ.get('MONITOR_CONCURRENCY', 64))
+MONITOR_PER_HOST = int(os.environ.get('MONITOR_PER_HOST', 2))
+MONITOR_TIMEOUT = float(os.environ.get('MONITOR_TIMEOUT', 10))  # seconds per probe
+MONITOR_MAX_BACKOFF = int(os.environ.get('MONITOR_MAX_BACKOFF', 4))  # interval multiplier for endpoints that do not change
+MONITOR_EXPIRY_DAYS = int(os.environ.get('MONITOR_EXPIRY_DAYS', 30))  # no backoff this close to expiry
+MONITOR_FULL_CHECK_INTERVAL = int(os.environ.get('MONITOR_FULL_CHECK_INTERVAL', 24 * 3600))
+MONITOR_HISTORY = int(os.environ.get('MONITOR_HISTORY', 50))  # recorded changes kept per endpoint
+MONITOR_MAX_ENDPOINTS = int(os.environ.get('MONITOR_MAX_ENDPOINTS', 100000))
+
+# Inventory of every certificate validated, with where it was seen
+INVENTORY_ENABLED = os.environ.get('INVENTORY_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+INVENTORY_DB = os.environ.get('INVENTORY_DB', os.path.join(SHARED_CACHE_DIR, 'inventory.sqlite3'))
+INVENTORY_FLUSH_INTERVAL = float(os.environ.get('INVENTORY_FLUSH_INTERVAL', 1.0))  # seconds sightings are buffered
+
+# Process-wide cache for intermediate certificates fetched via AIA
+INTERMEDIATE_CACHE_ENABLED = os.environ.get('INTERMEDIATE_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+INTERMEDIATE_CACHE_SIZE = int(os.environ.get('INTERMEDIATE_CACHE_SIZE', 512))
+INTERMEDIATE_CACHE_MAX_TTL = int(os.environ.get('INTERMEDIATE_CACHE_MAX_TTL', 24 * 3600))  # seconds
+
+# Maximum simultaneous TLS handshakes on the per-process handshake event loop
+ASYNC_MAX_CONCURRENCY = int(os.environ.get('ASYNC_MAX_CONCURRENCY', 500))
+
+# Short-lived results of URL fetches and AIA chain builds; concurrent identical requests share one fetch
+URL_RESULT_CACHE_TTL = int(os.environ.get('URL_RESULT_CACHE_TTL', 30))  # seconds, 0 disables caching
+URL_RESULT_CACHE_SIZE = int(os.environ.get('URL_RESULT_CACHE_SIZE', 1024))
+
+# TLS session resumption for repeat probes of the same host. Off by default:
+# a resumed session reports the certificate from the original handshake.
+TLS_SESSION_RESUMPTION = os.environ.get('TLS_SESSION_RESUMPTION', '0').lower() in ('1', 'true', 'yes', 'on')
+TLS_SESSION_CACHE_SIZE = int(os.environ.get('TLS_SESSION_CACHE_SIZE', 4096))
+TLS_SESSION_CACHE_TTL = int(os.environ.get('TLS_SESSION_CACHE_TTL', 300))  # seconds
+TLS_SESSION_TICKET_WAIT = 0.25  # seconds to wait for TLS 1.3 tickets after the handshake
+
+# Cached certificate/private key match results
+KEY_MATCH_CACHE_SIZE = int(os.environ.get('KEY_MATCH_CACHE_SIZE', 1024))
+
+# Parsed certificate details, keyed by SHA-256 fingerprint
+CERT_INFO_CACHE_SIZE = int(os.environ.get('CERT_INFO_CACHE_SIZE', 2048))
+
+# Decoded certificates keyed by the SHA-256 of their DER bytes; both limits apply to each thread
+PARSE_CACHE_MAX_ENTRIES = int(os.environ.get('PARSE_CACHE_MAX_ENTRIES', 2000))
+PARSE_CACHE_MAX_BYTES = int(os.environ.get('PARSE_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+
+# Trust anchors used to complete chains offline. Defaults to the bundle OpenSSL uses.
+TRUST_STORE_FILE = (os.environ.get('TRUST_STORE_FILE') or os.environ.get('SSL_CERT_FILE')
+                    or ssl.get_default_verify_paths().cafile or '/etc/ssl/certs/ca-certificates.crt')
+TRUST_STORE_CHECK_INTERVAL = int(os.environ.get('TRUST_STORE_CHECK_INTERVAL', 60))  # seconds between mtime checks
+
+# Issuer signature verification results, keyed by (child, issuer) fingerprints
+SIGNATURE_CACHE_SIZE = int(os.environ.get('SIGNATURE_CACHE_SIZE', 4096))
+SIGNATURE_WORKERS = int(os.environ.get('SIGNATURE_WORKERS', 4))
+
+# OCSP revocation checking
+OCSP_ENABLED = os.environ.get('OCSP_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+OCSP_TIMEOUT = float(os.environ.get('OCSP_TIMEOUT', 5))  # seconds
+OCSP_CACHE_SIZE = int(os.environ.get('OCSP_CACHE_SIZE', 4096))
+OCSP_DEFAULT_TTL = int(os.environ.get('OCSP_DEFAULT_TTL', 3600))  # used when a response has no nextUpdate
+OCSP_MAX_TTL = int(os.environ.get('OCSP_MAX_TTL', 7 * 24 * 3600))
+OCSP_CLOCK_SKEW = datetime.timedelta(minutes=5)
+
+# CRL revocation checking
+CRL_ENABLED = os.environ.get('CRL_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+CRL_CACHE_DIR = os.environ.get('CRL_CACHE_DIR', os.path.join(SHARED_CACHE_DIR, 'crl'))
+CRL_LOCAL_DIR = os.environ.get('CRL_LOCAL_DIR')  # pre-downloaded CRLs, matched by file name
+CRL_TIMEOUT = float(os.environ.get('CRL_TIMEOUT', 30))  # seconds
+CRL_MAX_SIZE = int(os.environ.get('CRL_MAX_SIZE', 200 * 1024 * 1024))
+CRL_RECHECK_INTERVAL = int(os.environ.get('CRL_RECHECK_INTERVAL', 900))  # seconds between conditional re-fetches
+
+# Bulk URL scanning
+BULK_MAX_WORKERS = int(os.environ.get('BULK_MAX_WORKERS', 32))
+BULK_MAX_TARGETS = int(os.environ.get('BULK_MAX_TARGETS', 20000))
+BULK_HOST_TIMEOUT = float(os.environ.get('BULK_HOST_TIMEOUT', 10))  # seconds per host
+BULK_DEADLINE = float(os.environ.get('BULK_DEADLINE', 100))  # seconds for the whole scan
+BULK_STREAM_DEADLINE = float(os.environ.get('BULK_STREAM_DEADLINE', 900))  # streamed scans report progress, so may run longer
+
+# Batch chain validation, analyzed in a process pool
+BATCH_MAX_BUNDLES = int(os.environ.get('BATCH_MAX_BUNDLES', 1000))
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 100 * 1024 * 1024))  # total uncompressed bytes per batch
+# Defaults to the CPUs this process may run on (not the host's CPU count). Each worker process
+# imports the whole app, so set it lower on memory-limited hosts (render.yaml does)
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity')
+                                   else os.cpu_count() or 1))
+
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
 <html lang='en'>
@@ -253,7 +385,7 @@ HTML_TEMPLATE = '''
             transform: scale(1.02);
         }
         
-        input[type=password], input[type=text], input[type=url] {
+        input[type=password], input[type=text], input[type=url], textarea {
             width: 100%;
             padding: 14px;
             background: #334155;
@@ -264,7 +396,7 @@ HTML_TEMPLATE = '''
             transition: all 0.3s ease;
         }
         
-        input[type=password]:focus, input[type=text]:focus, input[type=url]:focus {
+        input[type=password]:focus, input[type=text]:focus, input[type=url]:focus, textarea:focus {
             outline: none;
             border-color: #38bdf8;
             background: #3f4b63;
@@ -495,6 +627,23 @@ HTML_TEMPLATE = '''
             font-size: 0.85rem;
             color: #fbbf24;
         }
+        
+        .stream-progress {
+            margin-bottom: 12px;
+            color: #94a3b8;
+            font-size: 0.9rem;
+        }
+        
+        .stream-rows {
+            max-height: 420px;
+            overflow-y: auto;
+        }
+        
+        .batch-form {
+            margin-top: 30px;
+            padding-top: 24px;
+            border-top: 1px solid rgba(148, 163, 184, 0.2);
+        }
     </style>
 </head>
 <body>
@@ -514,6 +663,7 @@ HTML_TEMPLATE = '''
             <button class='tab active' onclick='switchTab("cert-key")'>Certificate + Key</button>
             <button class='tab' onclick='switchTab("url-check")'>URL Check</button>
             <button class='tab' onclick='switchTab("chain-only")'>Chain Only</button>
+            <button class='tab' onclick='switchTab("bulk-scan")'>Bulk Scan</button>
         </div>
         
         <!-- Certificate + Key Tab -->
@@ -696,7 +846,7 @@ HTML_TEMPLATE = '''
                 <div class='form-group'>
                     <label for='chain_file'>Certificate Chain File</label>
                     <div class='file-input-wrapper'>
-                        <input type='file' name='chain_file' id='chain_file' accept='.pem,.crt,.cer' required>
+                        <input type='file' name='chain_file' id='chain_file' accept='.pem,.crt,.cer,.der,.p7b,.p7c' required>
                         <label for='chain_file' class='file-input-label' id='chainLabel'>
                             Choose certificate chain file...
                         </label>
@@ -717,6 +867,102 @@ HTML_TEMPLATE = '''
                     <p style='margin-top: 10px; color: #94a3b8;'>Analyzing certificate chain...</p>
                 </div>
             </form>
+            
+            <form method='post' action='{{ url_for('api_validate_chains') }}' enctype='multipart/form-data' class='validateForm batch-form'
+                  data-stream-url='{{ url_for('api_validate_chains') }}'>
+                <div class='form-group'>
+                    <label for='batch_archive'>Batch: archive of chain files</label>
+                    <div class='file-input-wrapper'>
+                        <input type='file' name='archive' id='batch_archive' accept='.zip,.tar,.tgz,.gz,.bz2,.xz' required>
+                        <label for='batch_archive' class='file-input-label' id='batchLabel'>
+                            Choose zip or tar archive...
+                        </label>
+                    </div>
+                    <p class='url-example'>Every .pem, .crt, .cer, .der, .p7b or .p7c file in the archive is checked; results appear as each one finishes</p>
+                </div>
+                
+                <div class='checkbox-group'>
+                    <input type='checkbox' name='include_root' id='batch_include_root'>
+                    <label for='batch_include_root'>Include root certificates in the corrected chains</label>
+                </div>
+                
+                <button type='submit' class='btn btn-primary submitBtn'>
+                    Validate Archive
+                </button>
+                
+                <div class='loading'>
+                    <div class='spinner'></div>
+                    <p style='margin-top: 10px; color: #94a3b8;'>Analyzing certificate chains...</p>
+                </div>
+            </form>
+            <div class='stream-results'></div>
+        </div>
+        
+        <!-- Bulk Scan Tab -->
+        <div id='bulk-scan' class='tab-content'>
+            <div class='info-box'>
+                <strong>Bulk scan:</strong> Check the certificates of many hosts in one run
+                <div class='feature-grid'>
+                    <div class='feature-item'>
+                        <svg width='16' height='16' fill='currentColor' viewBox='0 0 16 16'>
+                            <path d='M10.97 4.97a.75.75 0 0 1 1.07 1.05l-3.99 4.99a.75.75 0 0 1-1.08.02L4.324 8.384a.75.75 0 1 1 1.06-1.06l2.094 2.093 3.473-4.425a.267.267 0 0 1 .02-.022z'/>
+                        </svg>
+                        Parallel handshakes
+                    </div>
+                    <div class='feature-item'>
+                        <svg width='16' height='16' fill='currentColor' viewBox='0 0 16 16'>
+                            <path d='M10.97 4.97a.75.75 0 0 1 1.07 1.05l-3.99 4.99a.75.75 0 0 1-1.08.02L4.324 8.384a.75.75 0 1 1 1.06-1.06l2.094 2.093 3.473-4.425a.267.267 0 0 1 .02-.022z'/>
+                        </svg>
+                        Per-host timeouts
+                    </div>
+                    <div class='feature-item'>
+                        <svg width='16' height='16' fill='currentColor' viewBox='0 0 16 16'>
+                            <path d='M10.97 4.97a.75.75 0 0 1 1.07 1.05l-3.99 4.99a.75.75 0 0 1-1.08.02L4.324 8.384a.75.75 0 1 1 1.06-1.06l2.094 2.093 3.473-4.425a.267.267 0 0 1 .02-.022z'/>
+                        </svg>
+                        Expiry overview
+                    </div>
+                    <div class='feature-item'>
+                        <svg width='16' height='16' fill='currentColor' viewBox='0 0 16 16'>
+                            <path d='M10.97 4.97a.75.75 0 0 1 1.07 1.05l-3.99 4.99a.75.75 0 0 1-1.08.02L4.324 8.384a.75.75 0 1 1 1.06-1.06l2.094 2.093 3.473-4.425a.267.267 0 0 1 .02-.022z'/>
+                        </svg>
+                        CSV/JSON export
+                    </div>
+                </div>
+            </div>
+            
+            <form method='post' action='{{ url_for('validate_bulk') }}' enctype='multipart/form-data' class='validateForm'
+                  data-stream-url='{{ url_for('api_validate_bulk') }}'>
+                <div class='form-group'>
+                    <label for='targets'>Hosts</label>
+                    <textarea name='targets' id='targets' rows='8' placeholder='example.com&#10;mail.example.com:8443&#10;https://api.example.com'></textarea>
+                    <p class='url-example'>One host[:port] or URL per line. Lines starting with # are ignored</p>
+                </div>
+                
+                <div class='form-group'>
+                    <label for='targets_file'>Or upload a host list</label>
+                    <div class='file-input-wrapper'>
+                        <input type='file' name='targets_file' id='targets_file' accept='.txt,.csv,.lst'>
+                        <label for='targets_file' class='file-input-label' id='targetsLabel'>
+                            Choose host list file...
+                        </label>
+                    </div>
+                </div>
+                
+                <div class='checkbox-group'>
+                    <input type='checkbox' name='check_hostname' id='bulk_check_hostname' checked>
+                    <label for='bulk_check_hostname'>Verify hostname matches certificate</label>
+                </div>
+                
+                <button type='submit' class='btn btn-primary submitBtn'>
+                    Scan Hosts
+                </button>
+                
+                <div class='loading'>
+                    <div class='spinner'></div>
+                    <p style='margin-top: 10px; color: #94a3b8;'>Scanning hosts...</p>
+                </div>
+            </form>
+            <div class='stream-results'></div>
         </div>
         
         {% if result %}
@@ -766,6 +1012,22 @@ HTML_TEMPLATE = '''
                     Download JSON Report
                 </a>
                 {% endif %}
+                {% if 'bulk_csv' in download_links %}
+                <a href='{{ download_links.bulk_csv }}' class='download-link'>
+                    <svg width='20' height='20' fill='currentColor' viewBox='0 0 16 16'>
+                        <path d='M14 4.5V14a2 2 0 0 1-2 2H4a2 2 0 0 1-2-2V2a2 2 0 0 1 2-2h5.5L14 4.5zm-3 0A1.5 1.5 0 0 1 9.5 3V1H4a1 1 0 0 0-1 1v12a1 1 0 0 0 1 1h8a1 1 0 0 0 1-1V4.5h-2z'/>
+                    </svg>
+                    Download CSV Results
+                </a>
+                {% endif %}
+                {% if 'bulk_json' in download_links %}
+                <a href='{{ download_links.bulk_json }}' class='download-link'>
+                    <svg width='20' height='20' fill='currentColor' viewBox='0 0 16 16'>
+                        <path d='M14 4.5V14a2 2 0 0 1-2 2H4a2 2 0 0 1-2-2V2a2 2 0 0 1 2-2h5.5L14 4.5zm-3 0A1.5 1.5 0 0 1 9.5 3V1H4a1 1 0 0 0-1 1v12a1 1 0 0 0 1 1h8a1 1 0 0 0 1-1V4.5h-2z'/>
+                    </svg>
+                    Download JSON Results
+                </a>
+                {% endif %}
             </div>
             {% endif %}
         </div>
@@ -834,6 +1096,45 @@ HTML_TEMPLATE = '''
                 }
             });
             
+            // Host list file input
+            const targetsInput = document.getElementById('targets_file');
+            const targetsLabel = document.getElementById('targetsLabel');
+            
+            targetsInput?.addEventListener('change', function(e) {
+                if (e.target.files && e.target.files[0]) {
+                    targetsLabel.textContent = e.target.files[0].name;
+                    targetsLabel.classList.add('has-file');
+                } else {
+                    targetsLabel.textContent = 'Choose host list file...';
+                    targetsLabel.classList.remove('has-file');
+                }
+            });
+            
+            // Batch archive file input
+            const batchInput = document.getElementById('batch_archive');
+            const batchLabel = document.getElementById('batchLabel');
+            
+            batchInput?.addEventListener('change', function(e) {
+                if (e.target.files && e.target.files[0]) {
+                    batchLabel.textContent = e.target.files[0].name;
+                    batchLabel.classList.add('has-file');
+                } else {
+                    batchLabel.textContent = 'Choose zip or tar archive...';
+                    batchLabel.classList.remove('has-file');
+                }
+            });
+            
+            // Streamed bulk scans and chain batches: show each host or bundle as soon as it completes
+            document.querySelectorAll('form[data-stream-url]').forEach(form => {
+                form.addEventListener('submit', function(e) {
+                    if (!window.fetch || !window.ReadableStream || !window.TextDecoder) {
+                        return;  // fall back to a normal form post
+                    }
+                    e.preventDefault();
+                    streamForm(this);
+                });
+            });
+            
             // Form submission handling for cert-key form
             const certKeyForm = document.getElementById('certKeyForm');
             certKeyForm?.addEventListener('submit', function(e) {
@@ -900,6 +1201,107 @@ HTML_TEMPLATE = '''
             });
         });
         
+        const STATUS_ICONS = {success: '✅', warning: '⚠️', error: '❌', timeout: '⏱️'};
+        const STREAM_DOWNLOADS = {
+            bulk_csv: 'Download CSV Results',
+            bulk_json: 'Download JSON Results',
+            fixed_chains: 'Download Fixed Chains (zip)',
+            batch_json: 'Download JSON Results'
+        };
+        
+        async function streamForm(form) {
+            const panel = form.parentElement.querySelector('.stream-results');
+            const loading = form.querySelector('.loading');
+            const submitBtn = form.querySelector('.submitBtn');
+            const buttonText = submitBtn.textContent;
+            
+            panel.innerHTML = '';
+            const container = document.createElement('div');
+            container.className = 'result-container';
+            const progress = document.createElement('div');
+            progress.className = 'stream-progress';
+            const rows = document.createElement('div');
+            rows.className = 'result-details stream-rows';
+            container.append(progress, rows);
+            panel.appendChild(container);
+            
+            let total = 0;
+            let completed = 0;
+            const counts = {};
+            
+            function handle(record) {
+                if (record.type === 'start') {
+                    total = record.targets || record.bundles || 0;
+                } else if (record.type === 'host' || record.type === 'bundle') {
+                    completed += 1;
+                    counts[record.status] = (counts[record.status] || 0) + 1;
+                    const detail = record.error || (record.failed_checks || []).join('; ')
+                        || `${record.subject || ''} valid until ${record.not_after || 'N/A'}`;
+                    const line = document.createElement('div');
+                    line.textContent = `${STATUS_ICONS[record.status] || '❌'} ${record.target || record.name}: ${detail}`;
+                    rows.appendChild(line);
+                } else if (record.type === 'summary') {
+                    const links = document.createElement('div');
+                    links.className = 'download-links';
+                    Object.entries(record.downloads || {}).forEach(([fileType, href]) => {
+                        const link = document.createElement('a');
+                        link.className = 'download-link';
+                        link.href = href;
+                        link.textContent = STREAM_DOWNLOADS[fileType] || fileType;
+                        links.appendChild(link);
+                    });
+                    container.appendChild(links);
+                    container.classList.add(counts.success === completed ? 'result-success'
+                                            : counts.success ? 'result-warning' : 'result-error');
+                } else if (record.type === 'error') {
+                    const line = document.createElement('div');
+                    line.textContent = `❌ ${record.error}`;
+                    rows.appendChild(line);
+                    container.classList.add('result-error');
+                }
+                const summary = Object.entries(counts).map(([status, count]) => `${status}: ${count}`).join(', ');
+                progress.textContent = `${completed}${total ? ' / ' + total : ''} completed` + (summary ? ` (${summary})` : '')
+                    + (record.type === 'summary' ? ` in ${record.elapsed_seconds}s` : '');
+            }
+            
+            try {
+                const response = await fetch(form.dataset.streamUrl, {
+                    method: 'POST',
+                    body: new FormData(form),
+                    headers: {'Accept': 'text/event-stream'}
+                });
+                if (!response.ok) {
+                    const body = await response.json().catch(() => ({}));
+                    handle({type: 'error', error: body.error || `Request failed (${response.status})`});
+                    return;
+                }
+                
+                // Parse Server-Sent Events frames as they arrive
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                while (true) {
+                    const {value, done} = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, {stream: true});
+                    let end;
+                    while ((end = buffer.indexOf('\\n\\n')) >= 0) {
+                        const frame = buffer.slice(0, end);
+                        buffer = buffer.slice(end + 2);
+                        const data = frame.split('\\n').filter(line => line.startsWith('data: ')).map(line => line.slice(6)).join('\\n');
+                        if (data) handle(JSON.parse(data));
+                    }
+                }
+            } catch (err) {
+                handle({type: 'error', error: `Connection lost: ${err.message}`});
+            } finally {
+                loading.style.display = 'none';
+                submitBtn.disabled = false;
+                submitBtn.textContent = buttonText;
+                form.style.opacity = '1';
+            }
+        }
+        
         // Restore active tab
         {% if active_tab %}
         document.addEventListener('DOMContentLoaded', function() {
@@ -913,390 +1315,3097 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
-class CertificateValidator:
+class LRUCache:
+    """Thread-safe LRU cache with optional per-entry expiry and hit/miss counters
+    
+    Bounded by entry count and, when max_bytes is set, by the total of the
+    sizes passed to set().
+    """
+    
+    def __init__(self, max_entries=1024, default_ttl=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # key -> (expires_at, value, size)
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def _remove(self, key):
+        self.total_bytes -= self._data.pop(key)[2]
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+    
+    def set(self, key, value, ttl=None, size=0):
+        ttl = self.default_ttl if ttl is None else ttl
+        if self.max_entries <= 0 or (ttl is not None and ttl <= 0):
+            return
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, value, size)
+            self.total_bytes += size
+            while len(self._data) > self.max_entries or (
+                    self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+        if self.max_bytes is not None:
+            stats['bytes'] = self.total_bytes
+            stats['max_bytes'] = self.max_bytes
+        return stats
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution
+    
+    The first caller runs the function; callers arriving while it is in
+    flight wait and receive the same result (or exception).
+    """
+    
+    class _Call:
+        __slots__ = ('event', 'result', 'error')
+        
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+    
     def __init__(self):
-        self.temp_files = []
+        self.calls = 0
+        self.shared = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, fn):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = self._Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.event.set()
     
-    def __enter__(self):
-        return self
+    def stats(self):
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._inflight)}
+
+class SharedCache:
+    """Key/value cache in a SQLite database (WAL mode) shared by all workers on the host
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.cleanup()
+    Entries live in namespaces, carry their own expiry and are evicted least
+    recently used first once the total size passes max_bytes. Every thread
+    of every process opens its own connection. Database errors are logged
+    and treated as misses, so the cache can never fail a validation.
+    """
     
-    def cleanup(self):
-        for temp_file in self.temp_files:
-            try:
-                if os.path.exists(temp_file):
-                    os.unlink(temp_file)
-            except Exception as e:
-                logger.error(f"Failed to cleanup temp file {temp_file}: {e}")
-    
-    def create_temp_file(self, data, suffix=''):
-        temp_file = tempfile.NamedTemporaryFile(
-            prefix=TEMP_FILE_PREFIX,
-            suffix=suffix,
-            delete=False,
-            dir=TEMP_DIR
+    EVICT_EVERY = 256  # writes between size checks
+    TOUCH_INTERVAL = 60  # seconds; limits access-time updates to one write per entry per minute
+    
+    def __init__(self, directory=SHARED_CACHE_DIR, max_bytes=SHARED_CACHE_MAX_BYTES, enabled=True):
+        self.enabled = enabled
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self._local = threading.local()
+    
+    def _connection(self):
+        # Connections must not cross a fork, so they are also keyed by PID
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+            'expires_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL, '
+            'PRIMARY KEY (namespace, key))'
         )
-        temp_file.write(data)
-        temp_file.close()
-        self.temp_files.append(temp_file.name)
-        return temp_file.name
+        conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
     
-    def load_certificate(self, cert_data):
-        """Load certificate from PEM or DER format"""
+    def get(self, namespace, key):
+        """Stored bytes for (namespace, key), or None if absent or expired"""
+        return self.get_with_ttl(namespace, key)[0]
+    
+    def get_with_ttl(self, namespace, key):
+        """(stored bytes, seconds until expiry) for (namespace, key), or (None, None)"""
+        if not self.enabled:
+            return None, None
+        now = time.time()
         try:
-            if cert_data.strip().startswith(b'-----BEGIN'):
-                return x509.load_pem_x509_certificate(cert_data, default_backend())
-            else:
-                return x509.load_der_x509_certificate(cert_data, default_backend())
-        except Exception as e:
-            raise ValueError(f"Failed to load certificate: {str(e)}")
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT value, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ?',
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None, None
+            if now - row[2] >= self.TOUCH_INTERVAL:
+                conn.execute('UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?',
+                             (now, namespace, key))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache read failed: {e}")
+            return None, None
+        self.hits += 1
+        return row[0], row[1] - now
     
-    def load_certificate_chain(self, chain_data):
-        """Load multiple certificates from a chain file"""
-        certificates = []
-        
-        # Handle PEM format
-        if b'-----BEGIN' in chain_data:
-            # Split by certificate boundaries
-            cert_starts = chain_data.split(b'-----BEGIN CERTIFICATE-----')
-            for cert_start in cert_starts[1:]:  # Skip first empty element
-                try:
-                    cert_data = b'-----BEGIN CERTIFICATE-----' + cert_start.split(b'-----END CERTIFICATE-----')[0] + b'-----END CERTIFICATE-----'
-                    cert = x509.load_pem_x509_certificate(cert_data, default_backend())
-                    certificates.append(cert)
-                except Exception as e:
-                    logger.warning(f"Failed to load certificate from chain: {e}")
-        else:
-            # Try DER format (single certificate)
+    def set(self, namespace, key, value, ttl):
+        if not self.enabled or ttl is None or ttl <= 0 or len(value) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, accessed_at, size) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (namespace, key, value, now + ttl, now, len(value))
+            )
+            self.writes += 1
+            if self.writes % self.EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared cache write failed: {e}")
+    
+    def evict(self):
+        """Drop expired entries, then the least recently used ones beyond max_bytes"""
+        conn = self._connection()
+        conn.execute('DELETE FROM entries WHERE expires_at <= ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM entries WHERE rowid IN ('
+            'SELECT rowid FROM (SELECT rowid, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS running '
+            'FROM entries) WHERE running > ?)',
+            (self.max_bytes,)
+        )
+    
+    def stats(self):
+        stats = {
+            'enabled': self.enabled,
+            'path': self.path,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'errors': self.errors
+        }
+        if self.enabled:
             try:
-                cert = x509.load_der_x509_certificate(chain_data, default_backend())
-                certificates.append(cert)
-            except Exception as e:
-                raise ValueError(f"Failed to load certificate chain: {str(e)}")
-        
-        return certificates
+                entries, size = self._connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+                stats.update({'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes})
+            except sqlite3.Error as e:
+                stats['error'] = str(e)
+        return stats
+
+shared_cache = SharedCache(enabled=SHARED_CACHE_ENABLED)
+
+class ArtifactStore:
+    """Downloadable artifacts of validation results, shared by all workers on the host
     
-    def get_url_certificate(self, url, port=443, timeout=10):
-        """Fetch certificate from URL"""
-        # Parse URL
-        parsed = urlparse(url)
-        hostname = parsed.hostname or parsed.path
-        
-        # Remove any path components if no scheme was provided
-        if not parsed.hostname and '/' in hostname:
-            hostname = hostname.split('/')[0]
-        
-        # Create SSL context
-        context = ssl.create_default_context()
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
+    Each result gets a random ID; its artifacts are addressed by (result ID,
+    name). Small artifacts are kept inline in the SQLite index, larger ones
+    as files in the store directory. Artifacts expire after the TTL and the
+    least recently used ones are evicted once the total passes max_bytes.
+    """
+    
+    EVICT_EVERY = 32  # writes between expiry / size sweeps
+    TOUCH_INTERVAL = 60  # seconds
+    
+    def __init__(self, directory=ARTIFACT_DIR, ttl=ARTIFACT_TTL, max_bytes=ARTIFACT_MAX_BYTES,
+                 inline_max=ARTIFACT_INLINE_MAX):
+        self.directory = directory
+        self.path = os.path.join(directory, 'artifacts.sqlite3')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.inline_max = inline_max
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._local = threading.local()
+    
+    @staticmethod
+    def new_result_id():
+        return secrets.token_hex(16)
+    
+    @staticmethod
+    def valid_result_id(result_id):
+        return len(result_id) == 32 and all(c in '0123456789abcdef' for c in result_id)
+    
+    def _connection(self):
+        # Connections must not cross a fork, so they are also keyed by PID
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS artifacts ('
+            'result_id TEXT NOT NULL, name TEXT NOT NULL, data BLOB, size INTEGER NOT NULL, '
+            'expires_at REAL NOT NULL, accessed_at REAL NOT NULL, '
+            'PRIMARY KEY (result_id, name))'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS artifacts_accessed ON artifacts (accessed_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS artifacts_expires ON artifacts (expires_at)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    def _file_path(self, result_id, name):
+        return os.path.join(self.directory, f"{result_id}_{name}")
+    
+    def put(self, result_id, name, data):
+        """Store the bytes of an artifact, replacing any previous version"""
+        now = time.time()
+        inline = len(data) <= self.inline_max
+        file_path = self._file_path(result_id, name)
+        if not inline:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, file_path)
+        
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO artifacts (result_id, name, data, size, expires_at, accessed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (result_id, name, data if inline else None, len(data), now + self.ttl, now)
+        )
+        if inline:
+            self._unlink(file_path)
         
+        self.writes += 1
+        if self.writes % self.EVICT_EVERY == 0:
+            self.evict()
+    
+    def get(self, result_id, name):
+        """('data', bytes) or ('file', path) for an artifact, or None if absent or expired"""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT data, expires_at, accessed_at FROM artifacts WHERE result_id = ? AND name = ?',
+            (result_id, name)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            self.misses += 1
+            return None
+        
+        data, _, accessed_at = row
+        if data is None:
+            file_path = self._file_path(result_id, name)
+            if not os.path.exists(file_path):
+                self.misses += 1
+                return None
+        if now - accessed_at >= self.TOUCH_INTERVAL:
+            conn.execute('UPDATE artifacts SET accessed_at = ? WHERE result_id = ? AND name = ?',
+                         (now, result_id, name))
+        self.hits += 1
+        return ('data', data) if data is not None else ('file', file_path)
+    
+    def read(self, result_id, name):
+        """The bytes of an artifact, or None"""
+        artifact = self.get(result_id, name)
+        if artifact is None:
+            return None
+        kind, value = artifact
+        if kind == 'data':
+            return value
         try:
-            # Connect and get certificate
-            with socket.create_connection((hostname, port), timeout=timeout) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    # Get the certificate in DER format
-                    der_cert = ssock.getpeercert(True)
-                    
-                    # Convert to x509 object
-                    cert = x509.load_der_x509_certificate(der_cert, default_backend())
-                    
-                    # Try to get the full certificate chain
-                    chain = []
-                    
-                    # For Python 3.10+, use getpeercert_chain if available
-                    if hasattr(ssock, 'getpeercert_chain'):
-                        peer_cert_chain = ssock.getpeercert_chain()
-                        if peer_cert_chain:
-                            for cert_der in peer_cert_chain:
-                                try:
-                                    chain_cert = x509.load_der_x509_certificate(cert_der, default_backend())
-                                    chain.append(chain_cert)
-                                except:
-                                    pass
-                    else:
-                        # For older Python versions, just add the server certificate
-                        chain = [cert]
-                    
-                    # If chain is empty or only has one cert, try to build it
-                    if not chain or len(chain) == 1:
-                        chain = [cert]
-                    
-                    return cert, chain, hostname
-                    
-        except socket.timeout:
-            raise ValueError(f"Connection to {hostname}:{port} timed out")
-        except socket.gaierror:
-            raise ValueError(f"Failed to resolve hostname: {hostname}")
-        except Exception as e:
-            raise ValueError(f"Failed to connect to {hostname}:{port}: {str(e)}")
+            with open(value, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
     
-    def verify_certificate_chain_order(self, certificates):
-        """Verify if certificates are in correct order and find the correct order"""
-        if not certificates:
-            return False, [], "No certificates provided"
-        
-        if len(certificates) == 1:
-            return True, certificates, "Single certificate (no chain to verify)"
-        
-        # Build a map of subject -> certificate
-        subject_to_cert = {}
-        issuer_to_certs = {}
+    def exists(self, result_id, name):
+        row = self._connection().execute(
+            'SELECT 1 FROM artifacts WHERE result_id = ? AND name = ? AND expires_at > ?',
+            (result_id, name, time.time())
+        ).fetchone()
+        return row is not None
+    
+    def _unlink(self, file_path):
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+    
+    def evict(self):
+        """Drop expired artifacts, then the least recently used ones beyond max_bytes"""
+        conn = self._connection()
+        expired = conn.execute(
+            'SELECT result_id, name, data IS NULL FROM artifacts WHERE expires_at <= ?', (time.time(),)
+        ).fetchall()
+        over_size = conn.execute(
+            'SELECT result_id, name, is_file FROM (SELECT result_id, name, data IS NULL AS is_file, '
+            'SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS running FROM artifacts) WHERE running > ?',
+            (self.max_bytes,)
+        ).fetchall()
+        for result_id, name, is_file in set(expired + over_size):
+            conn.execute('DELETE FROM artifacts WHERE result_id = ? AND name = ?', (result_id, name))
+            if is_file:
+                self._unlink(self._file_path(result_id, name))
+            self.evictions += 1
+    
+    def stats(self):
+        stats = {
+            'path': self.path,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions
+        }
+        try:
+            entries, size, inline_size, results = self._connection().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0), '
+                'COUNT(DISTINCT result_id) FROM artifacts'
+            ).fetchone()
+            stats.update({'results': results, 'entries': entries, 'bytes': size,
+                          'inline_bytes': inline_size, 'file_bytes': size - inline_size,
+                          'max_bytes': self.max_bytes})
+        except sqlite3.Error as e:
+            stats['error'] = str(e)
+        return stats
+
+artifact_store = ArtifactStore()
+
+class JobQueue:
+    """Validation jobs persisted in SQLite and run by a bounded pool of worker threads
+    
+    Jobs and their uploaded inputs survive process restarts. A worker claims a
+    job under a lease; a job whose lease runs out, or whose worker process on
+    this host has gone, is queued again until max_attempts is reached.
+    
+    Private keys and their passwords are never written to the database. They
+    stay in the memory of the process that accepted the job, only that
+    process runs it, and the job fails if that process exits first.
+    """
+    
+    PURGE_INTERVAL = 60  # seconds
+    SECRET_INPUTS = ('key',)
+    SECRET_PARAMS = ('key_password',)
+    LOST_SECRETS = "The private key was only held in memory by a process that has since exited; submit the job again"
+    
+    def __init__(self, path=JOB_DB, workers=JOB_WORKERS, lease=JOB_LEASE, max_attempts=JOB_MAX_ATTEMPTS, ttl=JOB_TTL):
+        self.path = path
+        self.workers = workers
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.ttl = ttl
+        self.host = socket.gethostname()
+        self._local = threading.local()
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_purge = 0
+        self._secrets = {}  # job ID -> (inputs, params) held by this process only
+    
+    @staticmethod
+    def valid_job_id(job_id):
+        return len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)
+    
+    def _connection(self):
+        # Connections must not cross a fork, so they are also keyed by PID
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA secure_delete=ON')  # overwrite deleted uploads instead of leaving them in free pages
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, submitted_at REAL NOT NULL, started_at REAL, finished_at REAL, '
+            'lease_until REAL, worker TEXT, progress TEXT, result TEXT, error TEXT, owner TEXT)'
+        )
+        if 'owner' not in [column[1] for column in conn.execute('PRAGMA table_info(jobs)')]:
+            conn.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_inputs ('
+            'job_id TEXT NOT NULL, seq INTEGER NOT NULL, name TEXT NOT NULL, data BLOB NOT NULL, '
+            'PRIMARY KEY (job_id, seq))'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    def _transaction(self, fn):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return result
+    
+    def submit(self, kind, params, inputs=()):
+        """Queue a job; inputs are (name, bytes) pairs kept until it finishes. Returns the job ID"""
+        job_id = secrets.token_hex(16)
+        secret_inputs = [(name, data) for name, data in inputs if name in self.SECRET_INPUTS]
+        secret_params = {name: params[name] for name in self.SECRET_PARAMS if params.get(name)}
+        owner = None
+        if secret_inputs or secret_params:
+            if self.workers <= 0:
+                raise ValueError("Jobs with a private key need JOB_WORKERS > 0 in the process that accepts them")
+            owner = f"{self.host}:{os.getpid()}"
+            self._secrets[job_id] = (secret_inputs, secret_params)
+        stored_inputs = [(name, data) for name, data in inputs if name not in self.SECRET_INPUTS]
+        stored_params = {name: value for name, value in params.items() if name not in self.SECRET_PARAMS}
+        
+        def insert(conn):
+            conn.execute('INSERT INTO jobs (id, kind, params, status, submitted_at, owner) VALUES (?, ?, ?, ?, ?, ?)',
+                         (job_id, kind, json.dumps(stored_params), 'queued', time.time(), owner))
+            conn.executemany('INSERT INTO job_inputs (job_id, seq, name, data) VALUES (?, ?, ?, ?)',
+                             [(job_id, seq, name, data) for seq, (name, data) in enumerate(stored_inputs)])
         
-        for cert in certificates:
-            subject = cert.subject.rfc4514_string()
-            issuer = cert.issuer.rfc4514_string()
+        try:
+            self._transaction(insert)
+        except BaseException:
+            self._secrets.pop(job_id, None)
+            raise
+        self._wakeup.set()
+        return job_id
+    
+    def _row_to_job(self, row):
+        job = dict(zip(('id', 'kind', 'params', 'status', 'attempts', 'submitted_at', 'started_at', 'finished_at',
+                        'progress', 'result', 'error'), row))
+        for field in ('params', 'progress', 'result'):
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
+    
+    def get(self, job_id):
+        """The job as a dict (with its queue position while queued), or None"""
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT id, kind, params, status, attempts, submitted_at, started_at, finished_at, progress, result, error '
+            'FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = self._row_to_job(row)
+        if job['status'] == 'queued':
+            job['queue_position'] = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND submitted_at < ?", (job['submitted_at'],)
+            ).fetchone()[0] + 1
+        return job
+    
+    def inputs(self, job_id):
+        """Stored inputs of a job, plus the private ones this process holds for it"""
+        stored = self._connection().execute(
+            'SELECT name, data FROM job_inputs WHERE job_id = ? ORDER BY seq', (job_id,)
+        ).fetchall()
+        return stored + self._secrets.get(job_id, ([], {}))[0]
+    
+    def _worker_alive(self, worker):
+        host, _, pid = (worker or '').rpartition(':')
+        if host != self.host or not pid.isdigit():
+            return True  # only processes on this host can be checked
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        return True
+    
+    def claim(self):
+        """Lease the oldest runnable job to this process; returns the job or None"""
+        worker = f"{self.host}:{os.getpid()}"
+        
+        def give_up(conn, job_id, now, error):
+            conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, lease_until = NULL, error = ? WHERE id = ?",
+                         (now, error, job_id))
+            conn.execute('DELETE FROM job_inputs WHERE job_id = ?', (job_id,))
+            self._secrets.pop(job_id, None)
+        
+        def take(conn):
+            now = time.time()
+            # Jobs left running by a dead process or an expired lease are retried or given up on
+            for job_id, attempts, running_worker, lease_until in conn.execute(
+                    "SELECT id, attempts, worker, lease_until FROM jobs WHERE status = 'running'").fetchall():
+                if lease_until > now and self._worker_alive(running_worker):
+                    continue
+                if attempts >= self.max_attempts:
+                    give_up(conn, job_id, now, f"Abandoned after {attempts} attempt(s)")
+                else:
+                    conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ?", (job_id,))
             
-            subject_to_cert[subject] = cert
+            # Jobs whose private inputs died with the process holding them cannot run anywhere
+            for job_id, owner in conn.execute(
+                    "SELECT id, owner FROM jobs WHERE status = 'queued' AND owner IS NOT NULL").fetchall():
+                if (owner == worker and job_id not in self._secrets) or not self._worker_alive(owner):
+                    give_up(conn, job_id, now, self.LOST_SECRETS)
             
-            if issuer not in issuer_to_certs:
-                issuer_to_certs[issuer] = []
-            issuer_to_certs[issuer].append(cert)
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' AND (owner IS NULL OR owner = ?) "
+                "ORDER BY submitted_at LIMIT 1", (worker,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, lease_until = ?, "
+                "worker = ? WHERE id = ?",
+                (now, now + self.lease, worker, row[0])
+            )
+            return row[0]
+        
+        job_id = self._transaction(take)
+        if job_id is None:
+            return None
+        job = self.get(job_id)
+        job['params'].update(self._secrets.get(job_id, ([], {}))[1])
+        return job
+    
+    def progress(self, job_id, progress):
+        """Record progress and extend the lease"""
+        now = time.time()
+        self._connection().execute('UPDATE jobs SET progress = ?, lease_until = ? WHERE id = ?',
+                                   (json.dumps(progress, default=str), now + self.lease, job_id))
+    
+    def finish(self, job_id, result=None, error=None):
+        def complete(conn):
+            conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, result = ?, error = ? WHERE id = ?',
+                ('failed' if error else 'done', time.time(),
+                 json.dumps(result, default=str) if result is not None else None, error, job_id)
+            )
+            conn.execute('DELETE FROM job_inputs WHERE job_id = ?', (job_id,))
         
-        # Find the end-entity certificate (leaf)
-        # It should have an issuer that is the subject of another cert, but no cert has it as issuer
-        leaf_certs = []
-        for cert in certificates:
-            subject = cert.subject.rfc4514_string()
-            # Check if this cert is an issuer for any other cert
-            is_issuer = any(c.issuer.rfc4514_string() == subject for c in certificates if c != cert)
-            
-            # Check if it's likely a CA cert
+        self._transaction(complete)
+        self._secrets.pop(job_id, None)
+    
+    def purge(self):
+        """Delete finished jobs older than the TTL"""
+        self._connection().execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                                   (time.time() - self.ttl,))
+    
+    def start(self, handler):
+        """Start this process's worker threads once; handler(job) returns the job result"""
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = [threading.Thread(target=self._work, args=(handler,), name=f"job-worker-{i}", daemon=True)
+                             for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+    
+    def _work(self, handler):
+        while True:
             try:
-                basic_constraints = cert.extensions.get_extension_for_class(x509.BasicConstraints)
-                is_ca = basic_constraints.value.ca
-            except:
-                is_ca = False
+                if time.monotonic() - self._last_purge > self.PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    self.purge()
+                job = self.claim()
+            except sqlite3.Error as e:
+                logger.warning(f"Job queue unavailable: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
             
-            if not is_issuer and not is_ca:
-                leaf_certs.append(cert)
-        
-        if not leaf_certs:
-            # If no clear leaf, pick the cert that's not a CA
-            for cert in certificates:
-                try:
-                    basic_constraints = cert.extensions.get_extension_for_class(x509.BasicConstraints)
-                    if not basic_constraints.value.ca:
-                        leaf_certs.append(cert)
-                except:
-                    leaf_certs.append(cert)
+            logger.info(f"Running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+            try:
+                self.finish(job['id'], result=handler(job))
+            except Exception as e:
+                logger.error(f"Job {job['id']} failed: {str(e)}", exc_info=not isinstance(e, ValueError))
+                self.finish(job['id'], error=str(e))
+    
+    def stats(self):
+        now = time.time()
+        stats = {'path': self.path, 'workers': self.workers, 'threads_alive': sum(t.is_alive() for t in self._threads)}
+        try:
+            conn = self._connection()
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+            oldest = conn.execute("SELECT MIN(submitted_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            finished, wait, run = conn.execute(
+                'SELECT COUNT(*), AVG(started_at - submitted_at), AVG(finished_at - started_at) FROM jobs '
+                'WHERE finished_at >= ? AND started_at IS NOT NULL', (now - 3600,)
+            ).fetchone()
+            stats.update({
+                'queued': counts.get('queued', 0),
+                'running': counts.get('running', 0),
+                'done': counts.get('done', 0),
+                'failed': counts.get('failed', 0),
+                'oldest_queued_seconds': round(now - oldest, 2) if oldest else 0,
+                'finished_last_hour': finished,
+                'avg_wait_seconds': round(wait, 3) if wait is not None else None,
+                'avg_run_seconds': round(run, 3) if run is not None else None
+            })
+        except sqlite3.Error as e:
+            stats['error'] = str(e)
+        return stats
+
+job_queue = JobQueue()
+
+class IntermediateCache:
+    """Intermediate certificates keyed by caIssuers URL and by subject / key identifier
+    
+    Lookups fall back to the shared cache, so intermediates one worker
+    downloaded are reused by the others and survive restarts. Entries are DER
+    bytes and every lookup decodes a fresh object, since cryptography 41
+    certificates cannot be read by two threads at once.
+    """
+    
+    def __init__(self, max_entries=INTERMEDIATE_CACHE_SIZE, max_ttl=INTERMEDIATE_CACHE_MAX_TTL, enabled=True):
+        self.enabled = enabled
+        self.max_ttl = max_ttl
+        self._cache = LRUCache(max_entries=max_entries)
+    
+    @staticmethod
+    def _issuer_keys(cert):
+        """Keys under which the issuer of cert would have been stored"""
+        keys = []
+        try:
+            aki = cert.extensions.get_extension_for_class(x509.AuthorityKeyIdentifier).value
+            if aki.key_identifier:
+                keys.append(('ski', aki.key_identifier))
+        except x509.ExtensionNotFound:
+            pass
+        keys.append(('subject', cert.issuer.public_bytes()))
+        return keys
+    
+    @staticmethod
+    def _shared_key(key):
+        kind, value = key
+        return f"{kind}:{value}" if kind == 'url' else f"{kind}:{value.hex()}"
+    
+    def _get(self, key):
+        der = self._cache.get(key)
+        if der is not None:
+            return x509.load_der_x509_certificate(der, default_backend())
+        der = shared_cache.get('intermediate', self._shared_key(key))
+        if der is None:
+            return None
+        cert = x509.load_der_x509_certificate(der, default_backend())
+        self.store(key[1] if key[0] == 'url' else None, cert, share=False)
+        return cert
+    
+    def get_by_url(self, url):
+        if not self.enabled:
+            return None
+        return self._get(('url', url))
+    
+    def get_issuer(self, cert):
+        """Return a cached issuer certificate for cert, if any"""
+        if not self.enabled:
+            return None
+        for key in self._issuer_keys(cert):
+            issuer = self._get(key)
+            if issuer is not None:
+                return issuer
+        return None
+    
+    def store(self, url, cert, share=True):
+        if not self.enabled:
+            return
+        # Never keep an intermediate past its own expiry
+        ttl = (cert.not_valid_after - datetime.datetime.utcnow()).total_seconds()
+        ttl = min(ttl, self.max_ttl)
+        if ttl <= 0:
+            return
+        keys = [('subject', cert.subject.public_bytes())]
+        if url:
+            keys.append(('url', url))
+        try:
+            ski = cert.extensions.get_extension_for_class(x509.SubjectKeyIdentifier).value
+            keys.append(('ski', ski.digest))
+        except x509.ExtensionNotFound:
+            pass
         
-        if not leaf_certs:
-            return False, certificates, "Could not identify leaf certificate"
+        der = cert.public_bytes(serialization.Encoding.DER)
+        for key in keys:
+            self._cache.set(key, der, ttl)
+            if share:
+                shared_cache.set('intermediate', self._shared_key(key), der, ttl)
+    
+    def clear(self):
+        self._cache.clear()
+    
+    def stats(self):
+        stats = self._cache.stats()
+        stats['enabled'] = self.enabled
+        return stats
+
+intermediate_cache = IntermediateCache(enabled=INTERMEDIATE_CACHE_ENABLED)
+
+# Client SSL contexts are built once per configuration and shared by all requests.
+# Building one loads the whole CA bundle, which is far too slow for the hot path.
+_client_contexts = {}
+_client_contexts_lock = threading.Lock()
+
+def get_client_context(verify=False, alpn=None, min_version=None, max_version=None):
+    """Return the shared client SSLContext for this configuration"""
+    key = (verify, tuple(alpn) if alpn else None, min_version, max_version)
+    context = _client_contexts.get(key)
+    if context is not None:
+        return context
+    
+    with _client_contexts_lock:
+        context = _client_contexts.get(key)
+        if context is None:
+            context = ssl.create_default_context()
+            if not verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            if alpn:
+                context.set_alpn_protocols(list(alpn))
+            if min_version is not None:
+                context.minimum_version = min_version
+            if max_version is not None:
+                context.maximum_version = max_version
+            _client_contexts[key] = context
+        return context
+
+# Certificate/key match results keyed by (certificate fingerprint, public key fingerprint)
+key_match_cache = LRUCache(max_entries=KEY_MATCH_CACHE_SIZE)
+
+# Memoized chain edges: the same popular chains are verified over and over
+signature_cache = LRUCache(max_entries=SIGNATURE_CACHE_SIZE)
+
+# Independent chain links are verified in parallel; the crypto work releases the GIL
+signature_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=max(1, SIGNATURE_WORKERS),
+    thread_name_prefix='signature-verify'
+)
+
+# DER OCSP responses keyed by "issuer key hash:serial", kept until nextUpdate
+ocsp_cache = LRUCache(max_entries=OCSP_CACHE_SIZE)
+ocsp_flight = SingleFlight()
+
+# Certificates served at (hostname, port, SNI) and chains built for a leaf fingerprint
+url_certificate_cache = LRUCache(max_entries=URL_RESULT_CACHE_SIZE, default_ttl=URL_RESULT_CACHE_TTL)
+url_certificate_flight = SingleFlight()
+built_chain_cache = LRUCache(max_entries=URL_RESULT_CACHE_SIZE, default_ttl=URL_RESULT_CACHE_TTL)
+built_chain_flight = SingleFlight()
+
+# Resumable TLS sessions keyed by (hostname, port, server_hostname, context id)
+tls_session_cache = LRUCache(max_entries=TLS_SESSION_CACHE_SIZE, default_ttl=TLS_SESSION_CACHE_TTL)
+
+class HandshakeLoop:
+    """One asyncio event loop per process that runs every outgoing TLS handshake
+    
+    Threads submit handshake coroutines and get concurrent futures back, so a
+    bulk scan or the monitor multiplexes its connections on a single loop
+    instead of starting an event loop per host. At most `concurrency`
+    handshakes are in progress at once; the rest wait their turn on the loop.
+    """
+    
+    def __init__(self, concurrency=ASYNC_MAX_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self.submitted = 0
+        self._active = 0
+        self._loop = None
+        self._semaphore = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _event_loop(self):
+        # Started lazily, and again in a forked child, which does not inherit the thread
+        if self._pid == os.getpid():
+            return self._loop
+        with self._lock:
+            if self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='tls-handshakes', daemon=True).start()
+                self._semaphore = None
+                self._loop = loop
+                self._pid = os.getpid()
+        return self._loop
+    
+    async def _bounded(self, coro):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            self._active += 1
+            try:
+                return await coro
+            finally:
+                self._active -= 1
+    
+    def submit(self, coro):
+        """Schedule coro on the loop; returns a concurrent.futures.Future"""
+        self.submitted += 1
+        return asyncio.run_coroutine_threadsafe(self._bounded(coro), self._event_loop())
+    
+    def run(self, coro):
+        """Run coro on the loop and wait for its result"""
+        return self.submit(coro).result()
+    
+    def stats(self):
+        return {'concurrency': self.concurrency, 'active': self._active, 'submitted': self.submitted}
+
+tls_handshakes = HandshakeLoop()
+
+_UNSET = object()
+
+# One block found while scanning a certificate bundle: either a certificate or an error
+ParsedBlock = namedtuple('ParsedBlock', ['offset', 'label', 'certificate', 'error'])
+
+# DER prefix of the PKCS#7 signedData content type OID (1.2.840.113549.1.7.2)
+PKCS7_SIGNED_DATA_OID = b'\x06\x09\x2a\x86\x48\x86\xf7\x0d\x01\x07\x02'
+
+class CertificateInfo(Mapping):
+    """Certificate details parsed lazily on first access
+    
+    Behaves like the dict extract_certificate_info used to build, so templates
+    and reports can keep indexing it by key. Instances are shared through
+    certificate_info_cache and must be treated as read-only.
+    """
+    
+    FIELDS = ('subject', 'issuer', 'san', 'serial_number', 'not_before', 'not_after',
+              'signature_algorithm', 'version', 'is_ca', 'key_usage', 'extended_key_usage',
+              'crl_distribution_points')
+    
+    # Shared instances are read from several threads; one lock is enough, each read is short
+    _lock = threading.Lock()
+    
+    __slots__ = ('cert', '_subject', '_issuer', '_san', '_is_ca', '_key_usage', '_extended_key_usage',
+                 '_crl_distribution_points')
+    
+    def __init__(self, cert):
+        self.cert = cert
+        self._subject = _UNSET
+        self._issuer = _UNSET
+        self._san = _UNSET
+        self._is_ca = _UNSET
+        self._key_usage = _UNSET
+        self._extended_key_usage = _UNSET
+        self._crl_distribution_points = _UNSET
+    
+    @classmethod
+    def for_certificate(cls, cert):
+        """Return the shared CertificateInfo for cert"""
+        fingerprint = cert.fingerprint(hashes.SHA256())
+        info = certificate_info_cache.get(fingerprint)
+        if info is None:
+            # Keep a private copy: the caller goes on using its own object, and cryptography 41
+            # certificates raise "Already borrowed" when two threads read one at the same time
+            info = cls(x509.load_der_x509_certificate(cert.public_bytes(serialization.Encoding.DER), default_backend()))
+            certificate_info_cache.set(fingerprint, info)
+        return info
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        with self._lock:
+            return getattr(self, key)
+    
+    def __iter__(self):
+        return iter(self.FIELDS)
+    
+    def __len__(self):
+        return len(self.FIELDS)
+    
+    def to_dict(self):
+        """Plain dict in the shape extract_certificate_info has always returned"""
+        with self._lock:
+            return {field: getattr(self, field) for field in self.FIELDS}
+    
+    @property
+    def subject(self):
+        if self._subject is _UNSET:
+            self._subject = {attr.oid._name: attr.value for attr in self.cert.subject}
+        return self._subject
+    
+    @property
+    def issuer(self):
+        if self._issuer is _UNSET:
+            self._issuer = {attr.oid._name: attr.value for attr in self.cert.issuer}
+        return self._issuer
+    
+    @property
+    def san(self):
+        if self._san is _UNSET:
+            try:
+                san_ext = self.cert.extensions.get_extension_for_class(x509.SubjectAlternativeName)
+                self._san = [name.value for name in san_ext.value]
+            except x509.ExtensionNotFound:
+                self._san = []
+        return self._san
+    
+    @property
+    def serial_number(self):
+        return format(self.cert.serial_number, 'x')
+    
+    @property
+    def not_before(self):
+        return self.cert.not_valid_before
+    
+    @property
+    def not_after(self):
+        return self.cert.not_valid_after
+    
+    @property
+    def signature_algorithm(self):
+        return self.cert.signature_algorithm_oid._name
+    
+    @property
+    def version(self):
+        return self.cert.version.name
+    
+    @property
+    def is_ca(self):
+        if self._is_ca is _UNSET:
+            try:
+                basic_constraints = self.cert.extensions.get_extension_for_class(x509.BasicConstraints)
+                self._is_ca = basic_constraints.value.ca
+            except x509.ExtensionNotFound:
+                self._is_ca = False
+        return self._is_ca
+    
+    @property
+    def key_usage(self):
+        if self._key_usage is _UNSET:
+            usages = []
+            try:
+                key_usage = self.cert.extensions.get_extension_for_class(x509.KeyUsage).value
+                usage_attrs = ['digital_signature', 'content_commitment', 'key_encipherment',
+                               'data_encipherment', 'key_agreement', 'key_cert_sign',
+                               'crl_sign']
+                
+                # Check basic attributes
+                for attr in usage_attrs:
+                    if getattr(key_usage, attr, False):
+                        usages.append(attr)
+                
+                # encipher_only and decipher_only are only valid when key_agreement is true
+                if key_usage.key_agreement:
+                    if key_usage.encipher_only:
+                        usages.append('encipher_only')
+                    if key_usage.decipher_only:
+                        usages.append('decipher_only')
+            except x509.ExtensionNotFound:
+                pass
+            self._key_usage = usages
+        return self._key_usage
+    
+    @property
+    def extended_key_usage(self):
+        if self._extended_key_usage is _UNSET:
+            try:
+                ext_key_usage = self.cert.extensions.get_extension_for_class(x509.ExtendedKeyUsage)
+                self._extended_key_usage = [usage._name for usage in ext_key_usage.value]
+            except x509.ExtensionNotFound:
+                self._extended_key_usage = []
+        return self._extended_key_usage
+    
+    @property
+    def crl_distribution_points(self):
+        if self._crl_distribution_points is _UNSET:
+            try:
+                cdp = self.cert.extensions.get_extension_for_class(x509.CRLDistributionPoints).value
+                self._crl_distribution_points = [name.value for point in cdp for name in (point.full_name or [])
+                                                 if isinstance(name, x509.UniformResourceIdentifier)]
+            except x509.ExtensionNotFound:
+                self._crl_distribution_points = []
+        return self._crl_distribution_points
+
+certificate_info_cache = LRUCache(max_entries=CERT_INFO_CACHE_SIZE)
+
+class CertificateParseCache:
+    """Decoded certificates keyed by the SHA-256 of their DER bytes
+    
+    cryptography 41 certificates raise "Already borrowed" when two threads
+    read one at the same time, so each thread keeps its own LRU of the
+    objects it decoded and only ever gets those back. Each thread's cache is
+    bounded by max_entries and by max_bytes of DER.
+    """
+    
+    def __init__(self, max_entries=PARSE_CACHE_MAX_ENTRIES, max_bytes=PARSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._caches = []  # (thread, LRUCache)
+        self._retired = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+    
+    def _cache(self):
+        cache = getattr(self._local, 'cache', None)
+        if cache is None:
+            cache = self._local.cache = LRUCache(max_entries=self.max_entries, max_bytes=self.max_bytes)
+            with self._lock:
+                self._retire_finished_threads()
+                self._caches.append((threading.current_thread(), cache))
+        return cache
+    
+    def _retire_finished_threads(self):
+        """Drop the caches of threads that have exited, keeping their counters"""
+        live = []
+        for thread, cache in self._caches:
+            if thread.is_alive():
+                live.append((thread, cache))
+            else:
+                for counter in self._retired:
+                    self._retired[counter] += getattr(cache, counter)
+        self._caches = live
+    
+    def decode(self, der_data):
+        """Return the certificate for der_data, decoding it only on this thread's first sight"""
+        der_data = bytes(der_data)
+        cache = self._cache()
+        digest = hashlib.sha256(der_data).digest()
+        cert = cache.get(digest)
+        if cert is None:
+            cert = x509.load_der_x509_certificate(der_data, default_backend())
+            cache.set(digest, cert, size=len(der_data))
+        return cert
+    
+    def stats(self):
+        with self._lock:
+            self._retire_finished_threads()
+            caches = [cache for _, cache in self._caches]
+            totals = dict(self._retired)
+        entries = total_bytes = 0
+        for cache in caches:
+            entries += len(cache)
+            total_bytes += cache.total_bytes
+            for counter in totals:
+                totals[counter] += getattr(cache, counter)
+        lookups = totals['hits'] + totals['misses']
+        return dict(totals,
+                    threads=len(caches),
+                    entries=entries,
+                    bytes=total_bytes,
+                    max_entries=self.max_entries,
+                    max_bytes=self.max_bytes,
+                    hit_rate=round(totals['hits'] / lookups, 4) if lookups else 0.0)
+
+# Uploaded certificates and chains, so re-submitted bundles skip ASN.1 decoding
+certificate_parse_cache = CertificateParseCache()
+
+class ChainIndex:
+    """Certificates indexed once by raw subject DER and key identifiers for chain building
+    
+    Issuer lookups are dictionary hits, so resolving paths through a bundle of
+    thousands of certificates is linear instead of comparing every pair.
+    """
+    
+    MAX_PATHS = 16
+    
+    def __init__(self, certificates):
+        self.certificates = list(certificates)
+        self.subjects = []
+        self.issuers = []
+        self.akis = []
+        self.is_ca = []
+        self.not_after = []
+        self.expired = []
+        self.by_subject = {}
+        self.by_ski = {}  # (SKI, subject DER) -> indices
+        self.issuer_counts = {}
         
-        # Build the chain starting from the leaf
-        correct_order = []
-        current = leaf_certs[0]
-        used_certs = set()
+        now = datetime.datetime.utcnow()
         
-        while current:
-            correct_order.append(current)
-            used_certs.add(current)
+        for i, cert in enumerate(self.certificates):
+            not_after = cert.not_valid_after
+            self.not_after.append(not_after)
+            self.expired.append(not (cert.not_valid_before <= now <= not_after))
             
-            # Find the issuer
-            issuer_name = current.issuer.rfc4514_string()
-            next_cert = None
+            subject = cert.subject.public_bytes()
+            issuer = cert.issuer.public_bytes()
+            self.subjects.append(subject)
+            self.issuers.append(issuer)
+            self.by_subject.setdefault(subject, []).append(i)
+            self.issuer_counts[issuer] = self.issuer_counts.get(issuer, 0) + 1
             
-            # Look for exact subject match
-            if issuer_name in subject_to_cert and subject_to_cert[issuer_name] not in used_certs:
-                next_cert = subject_to_cert[issuer_name]
+            try:
+                ski = cert.extensions.get_extension_for_class(x509.SubjectKeyIdentifier).value.digest
+                self.by_ski.setdefault((ski, subject), []).append(i)
+            except x509.ExtensionNotFound:
+                pass
             
-            # If self-signed, we've reached the root
-            if current.subject == current.issuer:
-                break
+            try:
+                self.akis.append(cert.extensions.get_extension_for_class(x509.AuthorityKeyIdentifier).value.key_identifier)
+            except x509.ExtensionNotFound:
+                self.akis.append(None)
             
-            current = next_cert
-        
-        # Add any remaining certificates (might be alternate chains or roots)
-        for cert in certificates:
-            if cert not in used_certs:
-                correct_order.append(cert)
-        
-        # Check if the original order matches the correct order
-        is_correct = len(correct_order) == len(certificates)
-        if is_correct:
-            for i, cert in enumerate(certificates):
-                if cert != correct_order[i]:
-                    is_correct = False
-                    break
-        
-        return is_correct, correct_order, "Chain order verified"
+            try:
+                self.is_ca.append(cert.extensions.get_extension_for_class(x509.BasicConstraints).value.ca)
+            except x509.ExtensionNotFound:
+                self.is_ca.append(False)
     
-    def load_private_key(self, key_data, password=None):
-        """Load private key with optional password"""
-        try:
-            return serialization.load_pem_private_key(
-                key_data, 
-                password=password, 
-                backend=default_backend()
-            )
-        except Exception:
-            # Try DER format
-            return serialization.load_der_private_key(
-                key_data, 
-                password=password, 
-                backend=default_backend()
-            )
+    def is_self_signed(self, i):
+        return self.subjects[i] == self.issuers[i]
     
-    def fetch_intermediate_certificates(self, cert):
-        """Fetch intermediate certificates from AIA extension"""
-        chain = []
-        seen_urls = set()
-        current_cert = cert
-        
-        while current_cert:
-            try:
-                aia_ext = current_cert.extensions.get_extension_for_oid(
-                    ExtensionOID.AUTHORITY_INFORMATION_ACCESS
-                )
-                
-                ca_issuer_url = None
-                for desc in aia_ext.value:
-                    if desc.access_method == x509.AuthorityInformationAccessOID.CA_ISSUERS:
-                        ca_issuer_url = desc.access_location.value
-                        break
-                
-                if not ca_issuer_url or ca_issuer_url in seen_urls:
-                    break
-                
-                seen_urls.add(ca_issuer_url)
-                
-                # Fetch certificate with timeout
-                with urllib.request.urlopen(ca_issuer_url, timeout=10) as response:
-                    cert_data = response.read()
-                    intermediate_cert = self.load_certificate(cert_data)
-                    chain.append(intermediate_cert)
-                    current_cert = intermediate_cert
-                    
-            except Exception as e:
-                logger.warning(f"Failed to fetch intermediate certificate: {e}")
-                break
-        
-        return chain
+    def issues_others(self, i):
+        """True if another certificate in the index names this one as issuer"""
+        count = self.issuer_counts.get(self.subjects[i], 0)
+        return count - (1 if self.is_self_signed(i) else 0) > 0
     
-    def build_certificate_chain(self, cert):
-        """Build complete certificate chain"""
-        chain = [cert]
-        intermediates = self.fetch_intermediate_certificates(cert)
-        chain.extend(intermediates)
-        return chain
+    def issuers_of(self, i):
+        """Indices of candidate issuers of certificate i, key identifier matches first"""
+        if self.is_self_signed(i):
+            return []
+        
+        issuer = self.issuers[i]
+        candidates = []
+        if self.akis[i] is not None:
+            candidates = list(self.by_ski.get((self.akis[i], issuer), []))
+        for j in self.by_subject.get(issuer, []):
+            if j not in candidates:
+                candidates.append(j)
+        return [j for j in candidates if j != i]
     
-    def extract_certificate_info(self, cert):
-        """Extract detailed certificate information"""
-        info = {
-            'subject': {},
-            'issuer': {},
-            'san': [],
-            'serial_number': format(cert.serial_number, 'x'),
-            'not_before': cert.not_valid_before,
-            'not_after': cert.not_valid_after,
-            'signature_algorithm': cert.signature_algorithm_oid._name,
-            'version': cert.version.name,
-            'is_ca': False,
-            'key_usage': [],
-            'extended_key_usage': []
-        }
-        
-        # Extract subject
-        for attr in cert.subject:
-            info['subject'][attr.oid._name] = attr.value
-        
-        # Extract issuer
-        for attr in cert.issuer:
-            info['issuer'][attr.oid._name] = attr.value
-        
-        # Extract SANs
+    def leaves(self):
+        """Indices of end-entity certificates, in input order"""
+        leaves = [i for i in range(len(self.certificates)) if not self.issues_others(i) and not self.is_ca[i]]
+        if not leaves:
+            # If no clear leaf, pick the certs that are not CAs
+            leaves = [i for i in range(len(self.certificates)) if not self.is_ca[i]]
+        return leaves
+    
+    def paths_from(self, i):
+        """All issuer paths starting at certificate i (as index lists), preferred first"""
+        paths = []
+        stack = [[i]]
+        
+        while stack and len(paths) < self.MAX_PATHS:
+            path = stack.pop()
+            candidates = [j for j in self.issuers_of(path[-1]) if j not in path]
+            if not candidates:
+                paths.append(path)
+                continue
+            # Reversed so the best-matching candidate is explored first
+            for j in reversed(candidates):
+                stack.append(path + [j])
+        
+        def rank(path):
+            # Complete paths first, then fewest expired certificates, then the
+            # shortest path, then the one that stays valid the longest
+            complete = self.is_self_signed(path[-1])
+            expired = sum(1 for j in path if self.expired[j])
+            return (not complete, expired, len(path), -min(self.not_after[j] for j in path).timestamp())
+        
+        paths.sort(key=rank)
+        return paths
+    
+    def build_paths(self):
+        """Candidate chains for every leaf, each leaf's preferred path first"""
+        return [[self.certificates[j] for j in path]
+                for leaf in self.leaves()
+                for path in self.paths_from(leaf)]
+
+class ReportPDF(FPDF):
+    """FPDF that folds text to Latin-1, the only encoding the core fonts support"""
+    
+    def cell(self, w, h=0, txt='', *args, **kwargs):
+        txt = str(txt).replace('\u2192', '->').encode('latin-1', 'replace').decode('latin-1')
+        return super().cell(w, h, txt, *args, **kwargs)
+
+TrustAnchor = namedtuple('TrustAnchor', ['der', 'subject'])
+
+class TrustStore:
+    """Trust anchors indexed by subject DER and Subject Key Identifier
+    
+    Loaded once per process at import time, so with gunicorn --preload the
+    index is built before workers fork. The bundle file is re-checked at most
+    every TRUST_STORE_CHECK_INTERVAL seconds and only changed entries are
+    added to or removed from the index. Lookups take the same lock as the
+    reload. Anchors are kept as DER and decoded for each caller, since
+    certificate objects must not be shared by threads.
+    """
+    
+    def __init__(self, path=TRUST_STORE_FILE, check_interval=TRUST_STORE_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.by_fingerprint = {}
+        self.by_subject = {}
+        self.by_ski = {}
+        self.loaded_at = None
+        self._file_state = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.by_fingerprint)
+    
+    def _file_signature(self):
         try:
-            san_ext = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName)
-            info['san'] = [name.value for name in san_ext.value]
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+    
+    def _add(self, fingerprint, cert):
+        anchor = TrustAnchor(cert.public_bytes(serialization.Encoding.DER), cert.subject.public_bytes())
+        self.by_fingerprint[fingerprint] = anchor
+        self.by_subject.setdefault(anchor.subject, []).append(anchor)
+        try:
+            ski = cert.extensions.get_extension_for_class(x509.SubjectKeyIdentifier).value.digest
+            self.by_ski.setdefault(ski, []).append(anchor)
         except x509.ExtensionNotFound:
             pass
-        
-        # Check if CA certificate
+    
+    def _remove(self, fingerprint):
+        anchor = self.by_fingerprint.pop(fingerprint)
+        for index in (self.by_subject, self.by_ski):
+            for key, anchors in list(index.items()):
+                if anchor in anchors:
+                    anchors.remove(anchor)
+                    if not anchors:
+                        del index[key]
+    
+    def load(self):
+        """(Re)load the bundle, applying only the differences to the index"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            file_state = self._file_signature()
+            if file_state is None:
+                logger.warning(f"Trust store {self.path} not found; chains cannot be anchored")
+                return
+            if file_state == self._file_state:
+                return
+            
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            
+            current = {}
+            for block in CertificateValidator().iter_certificates(data):
+                if block.certificate is not None:
+                    current[block.certificate.fingerprint(hashes.SHA256())] = block.certificate
+            
+            removed = [fp for fp in self.by_fingerprint if fp not in current]
+            added = [fp for fp in current if fp not in self.by_fingerprint]
+            for fingerprint in removed:
+                self._remove(fingerprint)
+            for fingerprint in added:
+                self._add(fingerprint, current[fingerprint])
+            
+            self._file_state = file_state
+            self.loaded_at = datetime.datetime.utcnow()
+            logger.info(f"Trust store {self.path}: {len(self.by_fingerprint)} anchors "
+                        f"({len(added)} added, {len(removed)} removed)")
+    
+    def maybe_reload(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.load()
+    
+    def contains(self, cert):
+        """True if cert itself is a trust anchor"""
+        self.maybe_reload()
+        fingerprint = cert.fingerprint(hashes.SHA256())
+        with self._lock:
+            return fingerprint in self.by_fingerprint
+    
+    def find_issuer(self, cert):
+        """Return the trust anchor that issued cert, if any"""
+        self.maybe_reload()
+        issuer = cert.issuer.public_bytes()
         try:
-            basic_constraints = cert.extensions.get_extension_for_class(x509.BasicConstraints)
-            info['is_ca'] = basic_constraints.value.ca
+            aki = cert.extensions.get_extension_for_class(x509.AuthorityKeyIdentifier).value.key_identifier
         except x509.ExtensionNotFound:
-            pass
-        
-        # Extract key usage
+            aki = None
+        
+        # load() edits the index lists in place, so read them under its lock
+        with self._lock:
+            candidates = [anchor for anchor in self.by_ski.get(aki, []) if anchor.subject == issuer] if aki is not None else []
+            candidates = candidates or self.by_subject.get(issuer, [])
+            der = candidates[0].der if candidates else None
+        return x509.load_der_x509_certificate(der, default_backend()) if der else None
+    
+    def stats(self):
+        return {
+            'path': self.path,
+            'anchors': len(self.by_fingerprint),
+            'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None
+        }
+
+class CRLIndex:
+    """Revoked serials of one CRL as a memory-mapped, sorted array of fixed-width records
+    
+    Each record is the serial as a 20-byte big-endian integer followed by the
+    revocation time, so a lookup is a binary search over the mapping and the
+    CRL itself is only parsed again when it changes.
+    """
+    
+    SERIAL_SIZE = 20
+    RECORD = struct.Struct('>20sq')
+    EPOCH = datetime.datetime(1970, 1, 1)
+    
+    def __init__(self, index_path, crl_path, meta):
+        self.index_path = index_path
+        self.crl_path = crl_path
+        self.meta = meta
+        self.count = meta['count']
+        # Serials that do not fit a record (negative or longer than RFC 5280 allows)
+        self.extra = {int(serial): timestamp for serial, timestamp in meta.get('extra', {}).items()}
+        self.verified_keys = set(meta.get('verified_keys', []))
+        self.next_update = datetime.datetime.fromisoformat(meta['next_update']) if meta.get('next_update') else None
+        self._map = b''
+        if self.count:
+            with open(index_path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    @classmethod
+    def write(cls, crl, index_path):
+        """Write the sorted index for crl; returns (count, extra)"""
+        records = []
+        extra = {}
+        for revoked in crl:
+            serial = revoked.serial_number
+            timestamp = int((revoked.revocation_date - cls.EPOCH).total_seconds())
+            if 0 <= serial < 1 << (8 * cls.SERIAL_SIZE):
+                records.append(cls.RECORD.pack(serial.to_bytes(cls.SERIAL_SIZE, 'big'), timestamp))
+            else:
+                extra[str(serial)] = timestamp
+        records.sort()
+        
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(records))
+        os.replace(tmp_path, index_path)
+        return len(records), extra
+    
+    def lookup(self, serial_number):
+        """Revocation time of serial_number, or None if the CRL does not list it"""
+        if not 0 <= serial_number < 1 << (8 * self.SERIAL_SIZE):
+            timestamp = self.extra.get(serial_number)
+        else:
+            key = serial_number.to_bytes(self.SERIAL_SIZE, 'big')
+            size = self.RECORD.size
+            lo, hi = 0, self.count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._map[mid * size:mid * size + self.SERIAL_SIZE] < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            timestamp = None
+            if lo < self.count:
+                candidate, found = self.RECORD.unpack_from(self._map, lo * size)
+                if candidate == key:
+                    timestamp = found
+        return None if timestamp is None else self.EPOCH + datetime.timedelta(seconds=timestamp)
+    
+    def load_crl(self):
+        with open(self.crl_path, 'rb') as f:
+            return x509.load_der_x509_crl(f.read())
+    
+    def revocation_reason(self, serial_number):
+        """CRL reason for a revoked serial; parses the stored CRL, so only call it on a hit"""
+        revoked = self.load_crl().get_revoked_certificate_by_serial_number(serial_number)
+        if revoked is None:
+            return None
         try:
-            key_usage = cert.extensions.get_extension_for_class(x509.KeyUsage)
-            usage_attrs = ['digital_signature', 'content_commitment', 'key_encipherment',
-                          'data_encipherment', 'key_agreement', 'key_cert_sign',
-                          'crl_sign']
-            
-            # Check basic attributes
-            for attr in usage_attrs:
-                if hasattr(key_usage.value, attr) and getattr(key_usage.value, attr):
-                    info['key_usage'].append(attr)
-            
-            # encipher_only and decipher_only are only valid when key_agreement is true
-            if hasattr(key_usage.value, 'key_agreement') and key_usage.value.key_agreement:
-                if hasattr(key_usage.value, 'encipher_only') and key_usage.value.encipher_only:
-                    info['key_usage'].append('encipher_only')
-                if hasattr(key_usage.value, 'decipher_only') and key_usage.value.decipher_only:
-                    info['key_usage'].append('decipher_only')
-                    
+            return revoked.extensions.get_extension_for_class(x509.CRLReason).value.reason
         except x509.ExtensionNotFound:
-            pass
+            return None
+    
+    def verified_by(self, issuer, crl=None):
+        """True if issuer signed this CRL; checked once per issuer certificate"""
+        issuer_id = issuer.fingerprint(hashes.SHA256()).hex()
+        if issuer_id in self.verified_keys:
+            return True
+        crl = crl or self.load_crl()
+        if crl.issuer != issuer.subject or not crl.is_signature_valid(issuer.public_key()):
+            return False
+        self.verified_keys.add(issuer_id)
+        return True
+    
+    def is_stale(self):
+        return self.next_update is not None and self.next_update < datetime.datetime.utcnow()
+    
+    def due_for_check(self):
+        """True once the recheck interval or the CRL's nextUpdate has passed"""
+        checked_at = self.meta.get('checked_at', 0)
+        now = time.time()
+        if now - checked_at >= CRL_RECHECK_INTERVAL:
+            return True
+        # Past nextUpdate, retry at most once a minute so an unchanged CRL does not cause a fetch per request
+        return self.is_stale() and now - checked_at >= 60
+
+def require_http_url(url):
+    """url, if it is http(s); URLs taken from certificates must never reach file:// or other handlers"""
+    if urlparse(url).scheme.lower() not in ('http', 'https'):
+        raise ValueError(f"Refusing to fetch {url}: only http and https URLs are supported")
+    return url
+
+class CRLStore:
+    """CRLs from CRL Distribution Points, downloaded once and indexed on disk
+    
+    The raw CRL, its serial index and a small metadata file live under
+    CRL_CACHE_DIR, so they survive restarts and are shared by every worker on
+    the host. A CRL is revalidated with If-None-Match / If-Modified-Since when
+    it is due, and re-indexed only when its content changed.
+    """
+    
+    def __init__(self, cache_dir=CRL_CACHE_DIR, local_dir=CRL_LOCAL_DIR):
+        self.cache_dir = cache_dir
+        self.local_dir = local_dir
+        self.downloads = 0
+        self.not_modified = 0
+        self.rebuilds = 0
+        self._indexes = {}
+        self._flight = SingleFlight()
+    
+    def _paths(self, url):
+        base = os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest())
+        return base + '.crl', base + '.json'
+    
+    def local_source(self, url):
+        """File in local_dir to read the CRL for url from, if any
+        
+        Only the file name of the URL is used, so a certificate cannot point the
+        lookup at any other path on the host.
+        """
+        if not self.local_dir:
+            return None
+        name = os.path.basename(urlparse(url).path)
+        if not name or name in ('.', '..'):
+            return None
+        candidate = os.path.join(self.local_dir, name)
+        return candidate if os.path.isfile(candidate) else None
+    
+    def get(self, url, issuer):
+        """Current CRLIndex for url, fetching or revalidating it when due"""
+        index = self._indexes.get(url)
+        if index is not None and not index.due_for_check():
+            return index
+        return self._flight.do(url, lambda: self._refresh(url, issuer))
+    
+    def _load_persisted(self, url):
+        crl_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            return CRLIndex(os.path.join(self.cache_dir, meta['index']), crl_path, meta)
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def _write_meta(self, url, meta):
+        _, meta_path = self._paths(url)
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    
+    def _refresh(self, url, issuer):
+        index = self._indexes.get(url) or self._load_persisted(url)
+        if index is None or index.due_for_check():
+            try:
+                index = self._fetch(url, issuer, index)
+            except Exception as e:
+                if index is None:
+                    raise
+                logger.warning(f"CRL refresh for {url} failed, using the cached copy: {e}")
+                index.meta['checked_at'] = time.time()
+        self._indexes[url] = index
+        return index
+    
+    def _touch(self, url, index, meta):
+        meta['checked_at'] = time.time()
+        index.meta = meta
+        self._write_meta(url, meta)
+        return index
+    
+    def _fetch(self, url, issuer, index):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta = dict(index.meta) if index is not None else {'url': url}
+        source = self.local_source(url)
+        
+        if source is not None:
+            st = os.stat(source)
+            file_state = [st.st_size, st.st_mtime_ns]
+            if index is not None and meta.get('file_state') == file_state:
+                return self._touch(url, index, meta)
+            with open(source, 'rb') as f:
+                data = f.read(CRL_MAX_SIZE + 1)
+            meta['file_state'] = file_state
+        else:
+            require_http_url(url)
+            headers = {}
+            if index is not None and meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if index is not None and meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=CRL_TIMEOUT) as response:
+                    data = response.read(CRL_MAX_SIZE + 1)
+                    meta['etag'] = response.headers.get('ETag')
+                    meta['last_modified'] = response.headers.get('Last-Modified')
+            except urllib.error.HTTPError as e:
+                if e.code == 304 and index is not None:
+                    self.not_modified += 1
+                    return self._touch(url, index, meta)
+                raise
+            self.downloads += 1
+        
+        if len(data) > CRL_MAX_SIZE:
+            raise ValueError(f"CRL exceeds {CRL_MAX_SIZE} bytes")
+        digest = hashlib.sha256(data).hexdigest()
+        if index is not None and digest == meta.get('sha256'):
+            return self._touch(url, index, meta)
+        
+        if data.lstrip().startswith(b'-----BEGIN'):
+            crl = x509.load_pem_x509_crl(data)
+            data = crl.public_bytes(serialization.Encoding.DER)
+        else:
+            crl = x509.load_der_x509_crl(data)
+        if crl.issuer != issuer.subject or not crl.is_signature_valid(issuer.public_key()):
+            raise ValueError("CRL is not signed by the certificate's issuer")
+        
+        crl_path, _ = self._paths(url)
+        index_name = f"{os.path.basename(crl_path)[:-4]}-{digest[:16]}.idx"
+        count, extra = CRLIndex.write(crl, os.path.join(self.cache_dir, index_name))
+        tmp_path = f"{crl_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, crl_path)
+        
+        old_index = meta.get('index')
+        now = time.time()
+        meta.update({
+            'sha256': digest,
+            'index': index_name,
+            'count': count,
+            'extra': extra,
+            'this_update': crl.last_update.isoformat(),
+            'next_update': crl.next_update.isoformat() if crl.next_update else None,
+            'verified_keys': [],
+            'fetched_at': now,
+            'checked_at': now
+        })
+        new_index = CRLIndex(os.path.join(self.cache_dir, index_name), crl_path, meta)
+        new_index.verified_by(issuer, crl)
+        meta['verified_keys'] = sorted(new_index.verified_keys)
+        self._write_meta(url, meta)
+        if old_index and old_index != index_name:
+            try:
+                os.unlink(os.path.join(self.cache_dir, old_index))
+            except OSError:
+                pass
+        
+        self.rebuilds += 1
+        logger.info(f"Indexed CRL {url}: {count + len(extra)} revoked serials")
+        return new_index
+    
+    def stats(self):
+        return {
+            'cache_dir': self.cache_dir,
+            'crls': len(self._indexes),
+            'revoked_serials': sum(index.count + len(index.extra) for index in self._indexes.values()),
+            'downloads': self.downloads,
+            'not_modified': self.not_modified,
+            'rebuilds': self.rebuilds,
+            'fetches': self._flight.stats()
+        }
+
+crl_store = CRLStore()
+
+class CertificateValidator:
+    def __init__(self):
+        self.parse_errors = []
+    
+    def parse_der_certificate(self, der_data):
+        """Decode a DER certificate, reusing this thread's object for known bytes"""
+        return certificate_parse_cache.decode(der_data)
+    
+    def pem_to_der(self, pem_block):
+        """Decode the base64 body of a single PEM block"""
+        body = pem_block.split(b'-----', 2)[2].split(b'-----END', 1)[0]
+        der_data = binascii.a2b_base64(body)
+        if not der_data:
+            raise ValueError("Empty PEM block")
+        return der_data
+    
+    def load_certificate(self, cert_data):
+        """Load certificate from PEM or DER format"""
+        try:
+            if cert_data.strip().startswith(b'-----BEGIN'):
+                return self.parse_der_certificate(self.pem_to_der(cert_data.strip()))
+            else:
+                return self.parse_der_certificate(cert_data)
+        except Exception as e:
+            raise ValueError(f"Failed to load certificate: {str(e)}")
+    
+    def der_element_length(self, data, offset):
+        """Total length (header included) of the DER element starting at offset"""
+        if len(data) < offset + 2:
+            raise ValueError("Truncated DER element")
+        first = data[offset + 1]
+        if first < 0x80:
+            return 2 + first
+        count = first & 0x7f
+        if count == 0 or count > 4 or len(data) < offset + 2 + count:
+            raise ValueError("Invalid DER length")
+        return 2 + count + int.from_bytes(data[offset + 2:offset + 2 + count], 'big')
+    
+    def iter_der_blocks(self, data, base_offset=0, label='CERTIFICATE'):
+        """Yield certificates from concatenated DER certificates and PKCS#7 bundles"""
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            if view[offset] != 0x30:
+                yield ParsedBlock(base_offset + offset, label, None, "Expected a DER SEQUENCE")
+                return
+            try:
+                length = self.der_element_length(view, offset)
+                if offset + length > len(view):
+                    raise ValueError("Truncated DER element")
+            except ValueError as e:
+                yield ParsedBlock(base_offset + offset, label, None, str(e))
+                return
+            
+            element = view[offset:offset + length]
+            try:
+                header = 2 + (view[offset + 1] & 0x7f if view[offset + 1] >= 0x80 else 0)
+                if bytes(element[header:header + len(PKCS7_SIGNED_DATA_OID)]) == PKCS7_SIGNED_DATA_OID:
+                    for cert in pkcs7.load_der_pkcs7_certificates(bytes(element)):
+                        yield ParsedBlock(base_offset + offset, 'PKCS7', cert, None)
+                else:
+                    yield ParsedBlock(base_offset + offset, label, self.parse_der_certificate(element), None)
+            except Exception as e:
+                yield ParsedBlock(base_offset + offset, label, None, str(e))
+            
+            offset += length
+    
+    def iter_certificates(self, data):
+        """Scan a PEM, DER or PKCS#7 bundle and yield one ParsedBlock at a time
+        
+        The input is scanned in place through a memoryview and only one block
+        is decoded at a time, so peak memory stays close to the input size.
+        """
+        if b'-----BEGIN ' not in data:
+            yield from self.iter_der_blocks(data)
+            return
+        
+        view = memoryview(data)
+        offset = data.find(b'-----BEGIN ')
+        while offset != -1:
+            label_start = offset + len(b'-----BEGIN ')
+            label_end = data.find(b'-----', label_start)
+            if label_end == -1:
+                yield ParsedBlock(offset, '', None, "Unterminated PEM header")
+                return
+            label = bytes(view[label_start:label_end]).decode('ascii', errors='replace')
+            
+            end_marker = b'-----END ' + label.encode('ascii', errors='replace') + b'-----'
+            end = data.find(end_marker, label_end + 5)
+            if end == -1:
+                yield ParsedBlock(offset, label, None, f"Missing '-----END {label}-----'")
+                return
+            
+            if label in ('CERTIFICATE', 'X509 CERTIFICATE', 'TRUSTED CERTIFICATE', 'PKCS7'):
+                try:
+                    der_data = binascii.a2b_base64(view[label_end + 5:end])
+                except binascii.Error as e:
+                    yield ParsedBlock(offset, label, None, f"Invalid base64: {e}")
+                else:
+                    if label == 'TRUSTED CERTIFICATE':
+                        # OpenSSL appends trust settings after the certificate itself
+                        try:
+                            der_data = der_data[:self.der_element_length(der_data, 0)]
+                        except ValueError:
+                            pass
+                    for block in self.iter_der_blocks(der_data, label=label):
+                        # Offsets inside a decoded PEM body are meaningless to the user
+                        yield block._replace(offset=offset)
+            else:
+                yield ParsedBlock(offset, label, None, f"Skipped non-certificate PEM block '{label}'")
+            
+            offset = data.find(b'-----BEGIN ', end + len(end_marker))
+    
+    def load_certificate_chain(self, chain_data):
+        """Load multiple certificates from a chain file (PEM, DER or PKCS#7)"""
+        certificates = []
+        self.parse_errors = []
+        
+        for block in self.iter_certificates(chain_data):
+            if block.certificate is not None:
+                certificates.append(block.certificate)
+            else:
+                logger.warning(f"Failed to load certificate from chain at offset {block.offset}: {block.error}")
+                self.parse_errors.append((block.offset, block.error))
+        
+        if not certificates and self.parse_errors and b'-----BEGIN' not in chain_data:
+            raise ValueError(f"Failed to load certificate chain: {self.parse_errors[0][1]}")
+        
+        return certificates
+    
+    def parse_url_hostname(self, url):
+        """Extract the hostname from a URL or bare host entry"""
+        parsed = urlparse(url)
+        hostname = parsed.hostname or parsed.path
+        
+        # Remove any path components if no scheme was provided
+        if not parsed.hostname and '/' in hostname:
+            hostname = hostname.split('/')[0]
+        
+        return hostname
+    
+    def get_presented_chain(self, ssl_object):
+        """Return the DER certificates the peer sent during the handshake, leaf first"""
+        if hasattr(ssl_object, 'get_unverified_chain'):
+            # Python 3.13+
+            chain = ssl_object.get_unverified_chain()
+        else:
+            # Python 3.10-3.12 expose the same OpenSSL call on the private _sslobj
+            sslobj = getattr(ssl_object, '_sslobj', None)
+            if sslobj is None or not hasattr(sslobj, 'get_unverified_chain'):
+                return []
+            chain = sslobj.get_unverified_chain()
+        
+        return [c if isinstance(c, bytes) else c.public_bytes(_ssl.ENCODING_DER) for c in chain or []]
+    
+    async def perform_tls_handshake(self, reader, writer, context, server_hostname, session=None):
+        """Run a client TLS handshake over an open stream using memory BIOs
+        
+        Driving the handshake ourselves (rather than passing ssl= to asyncio)
+        lets us offer a saved session for resumption.
+        """
+        incoming = ssl.MemoryBIO()
+        outgoing = ssl.MemoryBIO()
+        ssl_object = context.wrap_bio(incoming, outgoing, server_hostname=server_hostname, session=session)
         
-        # Extract extended key usage
+        while True:
+            try:
+                ssl_object.do_handshake()
+                break
+            except ssl.SSLWantReadError:
+                pass
+            
+            data = outgoing.read()
+            if data:
+                writer.write(data)
+                await writer.drain()
+            
+            data = await reader.read(65536)
+            if not data:
+                raise ConnectionError("Connection closed during TLS handshake")
+            incoming.write(data)
+        
+        # Send our Finished message
+        data = outgoing.read()
+        if data:
+            writer.write(data)
+            await writer.drain()
+        
+        return ssl_object, incoming
+    
+    async def save_tls_session(self, reader, ssl_object, incoming, session_key, presented_chain):
+        """Keep the negotiated session so the next probe of this host can resume it"""
+        if not ssl_object.session_reused:
+            # TLS 1.3 servers send their tickets after the handshake completes
+            try:
+                data = await asyncio.wait_for(reader.read(65536), timeout=TLS_SESSION_TICKET_WAIT)
+                if data:
+                    incoming.write(data)
+                    ssl_object.read(1)
+            except (asyncio.TimeoutError, ssl.SSLError):
+                pass
+        
+        session = ssl_object.session
+        if session is not None and (session.has_ticket or session.id):
+            # Resumed handshakes carry no certificates, so remember what was presented
+            tls_session_cache.set(session_key, (session, presented_chain))
+    
+    async def fetch_certificate_async(self, hostname, port=443, timeout=10, server_hostname=None, context=None):
+        """Fetch the certificate served at hostname:port without blocking a thread"""
+        if context is None:
+            context = get_client_context()
+        server_hostname = server_hostname or hostname
+        session_key = (hostname, port, server_hostname, id(context))
+        session, saved_chain = (tls_session_cache.get(session_key) if TLS_SESSION_RESUMPTION else None) or (None, None)
+        
+        streams = {}
+        
+        async def connect():
+            reader, writer = await asyncio.open_connection(hostname, port)
+            streams['writer'] = writer
+            ssl_object, incoming = await self.perform_tls_handshake(reader, writer, context, server_hostname, session)
+            return reader, ssl_object, incoming
+        
+        try:
+            # Connect and complete the handshake within the timeout
+            reader, ssl_object, incoming = await asyncio.wait_for(connect(), timeout=timeout)
+            
+            # Get the certificate in DER format
+            der_cert = ssl_object.getpeercert(True)
+            
+            presented_chain = self.get_presented_chain(ssl_object)
+            if ssl_object.session_reused and saved_chain and saved_chain[0] == der_cert:
+                presented_chain = saved_chain
+            
+            if TLS_SESSION_RESUMPTION:
+                await self.save_tls_session(reader, ssl_object, incoming, session_key, presented_chain)
+            
+            # Convert to x509 object
+            cert = x509.load_der_x509_certificate(der_cert, default_backend())
+            
+            # Keep the certificates exactly as the server presented them
+            chain = [cert]
+            for chain_der in presented_chain[1:]:
+                try:
+                    chain.append(x509.load_der_x509_certificate(chain_der, default_backend()))
+                except Exception as e:
+                    logger.warning(f"Failed to parse certificate presented by {hostname}:{port}: {e}")
+            
+            return cert, chain, hostname
+        
+        except (asyncio.TimeoutError, socket.timeout):
+            raise ValueError(f"Connection to {hostname}:{port} timed out")
+        except socket.gaierror:
+            raise ValueError(f"Failed to resolve hostname: {hostname}")
+        except Exception as e:
+            raise ValueError(f"Failed to connect to {hostname}:{port}: {str(e)}")
+        finally:
+            writer = streams.get('writer')
+            if writer is not None:
+                writer.close()
+                try:
+                    await asyncio.wait_for(writer.wait_closed(), timeout=1)
+                except Exception:
+                    pass
+    
+    def get_url_certificate(self, url, port=443, timeout=10):
+        """Fetch certificate from URL
+        
+        Results are cached for URL_RESULT_CACHE_TTL seconds per (host, port, SNI)
+        and concurrent requests for the same target share one handshake.
+        """
+        hostname = self.parse_url_hostname(url)
+        cache_key = (hostname.lower(), port, hostname.lower())
+        
+        chain_ders = url_certificate_cache.get(cache_key)
+        if chain_ders is None:
+            def fetch():
+                # Another worker may have fetched this target moments ago
+                shared_key = ':'.join(str(part) for part in cache_key)
+                blob, ttl = shared_cache.get_with_ttl('url', shared_key)
+                if blob is not None:
+                    result = self.split_der_chain(blob)
+                else:
+                    # The handshake runs on the shared loop; this thread only waits for it
+                    _, chain, _ = tls_handshakes.run(self.fetch_certificate_async(hostname, port, timeout=timeout))
+                    result = [c.public_bytes(serialization.Encoding.DER) for c in chain]
+                    ttl = URL_RESULT_CACHE_TTL
+                    shared_cache.set('url', shared_key, b''.join(result), ttl)
+                url_certificate_cache.set(cache_key, result, ttl)
+                return result
+            chain_ders = url_certificate_flight.do(cache_key, fetch)
+        
+        chain = self.load_shared_chain(chain_ders)
+        return chain[0], chain, hostname
+    
+    def split_der_chain(self, data):
+        """Split concatenated DER certificates back into a list"""
+        chain_ders = []
+        offset = 0
+        while offset < len(data):
+            length = self.der_element_length(data, offset)
+            chain_ders.append(data[offset:offset + length])
+            offset += length
+        return chain_ders
+    
+    def load_shared_chain(self, chain_ders):
+        """Fresh certificate objects for a cached DER chain
+        
+        cryptography 41 certificate objects raise "Already borrowed" when two
+        threads read them at once, so each caller gets its own copies.
+        """
+        return [x509.load_der_x509_certificate(der, default_backend()) for der in chain_ders]
+    
+    def verify_certificate_chain_order(self, certificates):
+        """Verify if certificates are in correct order and find the correct order"""
+        if not certificates:
+            return False, [], "No certificates provided"
+        
+        if len(certificates) == 1:
+            return True, certificates, "Single certificate (no chain to verify)"
+        
+        index = ChainIndex(certificates)
+        
+        # Find the end-entity certificate (leaf)
+        leaves = index.leaves()
+        if not leaves:
+            return False, certificates, "Could not identify leaf certificate"
+        
+        # Build the chain starting from the first leaf along its preferred path
+        paths = index.paths_from(leaves[0])
+        preferred = paths[0]
+        correct_order = [certificates[i] for i in preferred]
+        
+        # Add any remaining certificates (might be alternate chains or roots)
+        used = set(preferred)
+        correct_order.extend(cert for i, cert in enumerate(certificates) if i not in used)
+        
+        # Check if the original order matches the correct order
+        is_correct = all(a is b for a, b in zip(certificates, correct_order))
+        
+        message = "Chain order verified"
+        if len(paths) > 1:
+            message += f" ({len(paths)} candidate paths, preferred path shown)"
+        
+        return is_correct, correct_order, message
+    
+    def build_chain_paths(self, certificates):
+        """Return every candidate chain through certificates, preferred paths first"""
+        return ChainIndex(certificates).build_paths()
+    
+    def load_private_key(self, key_data, password=None):
+        """Load private key with optional password"""
+        if key_data.strip().startswith(b'-----BEGIN'):
+            # Keep the PEM error (e.g. a wrong password) rather than a misleading DER one
+            return serialization.load_pem_private_key(
+                key_data, 
+                password=password, 
+                backend=default_backend()
+            )
+        
+        # Try DER format
+        return serialization.load_der_private_key(
+            key_data, 
+            password=password, 
+            backend=default_backend()
+        )
+    
+    def describe_public_key(self, public_key):
+        """Short human-readable description of a public key"""
+        if isinstance(public_key, rsa.RSAPublicKey):
+            return f"RSA {public_key.key_size}-bit"
+        if isinstance(public_key, ec.EllipticCurvePublicKey):
+            return f"EC {public_key.curve.name}"
+        if isinstance(public_key, ed25519.Ed25519PublicKey):
+            return "Ed25519"
+        if isinstance(public_key, ed448.Ed448PublicKey):
+            return "Ed448"
+        if isinstance(public_key, dsa.DSAPublicKey):
+            return f"DSA {public_key.key_size}-bit"
+        return type(public_key).__name__
+    
+    def match_private_key(self, cert, private_key):
+        """Check in memory whether private_key belongs to the certificate's public key"""
+        cert_spki = cert.public_key().public_bytes(
+            serialization.Encoding.DER,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        key_public = private_key.public_key()
+        key_spki = key_public.public_bytes(
+            serialization.Encoding.DER,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        
+        cache_key = (cert.fingerprint(hashes.SHA256()), hashlib.sha256(key_spki).digest())
+        result = key_match_cache.get(cache_key)
+        if result is not None:
+            return result
+        
+        # RSA, EC, EdDSA and DSA keys all encode their public half as SubjectPublicKeyInfo
+        if cert_spki == key_spki:
+            result = (True, f"Certificate and private key match ({self.describe_public_key(key_public)})")
+        else:
+            result = (False, f"Private key ({self.describe_public_key(key_public)}) does not match "
+                             f"the certificate public key ({self.describe_public_key(cert.public_key())})")
+        
+        key_match_cache.set(cache_key, result)
+        return result
+    
+    def fetch_intermediate_certificates(self, cert):
+        """Fetch intermediate certificates from AIA extension"""
+        chain = []
+        seen_urls = set()
+        seen_certs = {cert.fingerprint(hashes.SHA256())}
+        current_cert = cert
+        
+        while current_cert:
+            # Self-signed certificates end the chain
+            if current_cert.subject == current_cert.issuer:
+                break
+            
+            try:
+                # Reuse a previously downloaded issuer without touching the network
+                intermediate_cert = intermediate_cache.get_issuer(current_cert)
+                
+                if intermediate_cert is None:
+                    aia_ext = current_cert.extensions.get_extension_for_oid(
+                        ExtensionOID.AUTHORITY_INFORMATION_ACCESS
+                    )
+                    
+                    ca_issuer_url = None
+                    for desc in aia_ext.value:
+                        if desc.access_method == x509.AuthorityInformationAccessOID.CA_ISSUERS:
+                            ca_issuer_url = desc.access_location.value
+                            break
+                    
+                    if not ca_issuer_url or ca_issuer_url in seen_urls:
+                        break
+                    
+                    seen_urls.add(ca_issuer_url)
+                    
+                    intermediate_cert = intermediate_cache.get_by_url(ca_issuer_url)
+                    if intermediate_cert is None:
+                        # Fetch certificate with timeout
+                        with urllib.request.urlopen(require_http_url(ca_issuer_url), timeout=10) as response:
+                            cert_data = response.read()
+                        intermediate_cert = self.load_certificate(cert_data)
+                        intermediate_cache.store(ca_issuer_url, intermediate_cert)
+                
+                fingerprint = intermediate_cert.fingerprint(hashes.SHA256())
+                if fingerprint in seen_certs:
+                    break
+                seen_certs.add(fingerprint)
+                
+                chain.append(intermediate_cert)
+                current_cert = intermediate_cert
+            
+            except Exception as e:
+                logger.warning(f"Failed to fetch intermediate certificate: {e}")
+                break
+        
+        return chain
+    
+    def build_certificate_chain(self, cert):
+        """Build complete certificate chain, sharing concurrent and recent builds for the same leaf"""
+        cache_key = cert.fingerprint(hashes.SHA256())
+        chain_ders = built_chain_cache.get(cache_key)
+        if chain_ders is None:
+            def build():
+                blob, ttl = shared_cache.get_with_ttl('chain', cache_key.hex())
+                if blob is not None:
+                    result = self.split_der_chain(blob)
+                    built_chain_cache.set(cache_key, result, ttl)
+                    return result
+                
+                chain = [cert]
+                intermediates = self.fetch_intermediate_certificates(cert)
+                chain.extend(intermediates)
+                
+                # Complete the chain with the root from the local trust store
+                if chain[-1].subject != chain[-1].issuer:
+                    anchor = trust_store.find_issuer(chain[-1])
+                    if anchor is not None:
+                        chain.append(anchor)
+                result = [c.public_bytes(serialization.Encoding.DER) for c in chain]
+                built_chain_cache.set(cache_key, result)
+                shared_cache.set('chain', cache_key.hex(), b''.join(result), URL_RESULT_CACHE_TTL)
+                return result
+            chain_ders = built_chain_flight.do(cache_key, build)
+        return [cert] + self.load_shared_chain(chain_ders[1:])
+    
+    def verify_signature(self, cert, issuer):
+        """Verify that issuer's key signed cert, memoized per (cert, issuer) edge"""
+        cache_key = (cert.fingerprint(hashes.SHA256()), issuer.fingerprint(hashes.SHA256()))
+        result = signature_cache.get(cache_key)
+        if result is not None:
+            return result
+        
+        try:
+            cert.verify_directly_issued_by(issuer)
+            result = (True, "Signature verified")
+        except InvalidSignature:
+            result = (False, "Signature does not verify with the issuer's public key")
+        except (TypeError, UnsupportedAlgorithm):
+            # Fall back to verifying the signature with the issuer's public key directly
+            result = self.verify_signature_with_public_key(cert, issuer)
+        except ValueError as e:
+            result = (False, str(e))
+        except Exception as e:
+            # Not a verdict on the signature, so it is reported but not memoized
+            logger.warning(f"Signature verification error: {e}")
+            return (False, f"Signature verification failed: {e}")
+        
+        signature_cache.set(cache_key, result)
+        return result
+    
+    def verify_with_public_key(self, public_key, signature, data, hash_algorithm, rsa_padding=None):
+        """Verify a signature for any supported key type; raises InvalidSignature"""
+        if isinstance(public_key, rsa.RSAPublicKey):
+            if not isinstance(rsa_padding, (padding.PKCS1v15, padding.PSS)):
+                rsa_padding = padding.PKCS1v15()
+            public_key.verify(signature, data, rsa_padding, hash_algorithm)
+        elif isinstance(public_key, ec.EllipticCurvePublicKey):
+            public_key.verify(signature, data, ec.ECDSA(hash_algorithm))
+        elif isinstance(public_key, dsa.DSAPublicKey):
+            public_key.verify(signature, data, hash_algorithm)
+        elif isinstance(public_key, (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey)):
+            public_key.verify(signature, data)
+        else:
+            raise UnsupportedAlgorithm(f"Unsupported key type {self.describe_public_key(public_key)}")
+    
+    def verify_signature_with_public_key(self, cert, issuer):
+        """Verify cert's signature by hand for algorithms verify_directly_issued_by rejects"""
+        if cert.issuer != issuer.subject:
+            return (False, "Issuer name does not match the issuer certificate's subject")
+        
+        try:
+            self.verify_with_public_key(issuer.public_key(), cert.signature, cert.tbs_certificate_bytes,
+                                        cert.signature_hash_algorithm, cert.signature_algorithm_parameters)
+        except InvalidSignature:
+            return (False, "Signature does not verify with the issuer's public key")
+        except Exception as e:
+            return (False, f"Signature verification failed: {e}")
+        return (True, "Signature verified")
+    
+    def verify_chain_signatures(self, chain):
+        """Verify every child/issuer link of an ordered chain
+        
+        Returns a list of (cert, issuer, status, message) for each link.
+        Uncached links are verified in parallel.
+        """
+        links = [(chain[i], chain[i + 1]) for i in range(len(chain) - 1)
+                 if chain[i].subject != chain[i].issuer]
+        
+        # A chain that stops below its root is still checked against the trusted anchor
+        if chain and chain[-1].subject != chain[-1].issuer:
+            anchor = trust_store.find_issuer(chain[-1])
+            if anchor is not None:
+                links.append((chain[-1], anchor))
+        
+        results = [signature_cache.get((cert.fingerprint(hashes.SHA256()), issuer.fingerprint(hashes.SHA256())))
+                   for cert, issuer in links]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if len(pending) > 1:
+            # Adjacent links share a certificate, so each pool task verifies its own copies
+            link_ders = {i: [c.public_bytes(serialization.Encoding.DER) for c in links[i]] for i in pending}
+            verify = lambda i: self.verify_signature(*self.load_shared_chain(link_ders[i]))
+            for i, result in zip(pending, signature_executor.map(verify, pending)):
+                results[i] = result
+        else:
+            for i in pending:
+                results[i] = self.verify_signature(*links[i])
+        
+        return [(cert, issuer, status, message) for (cert, issuer), (status, message) in zip(links, results)]
+    
+    def check_chain_signatures(self, chain):
+        """Summarize verify_chain_signatures as a validation result"""
+        links = self.verify_chain_signatures(chain)
+        if not links:
+            return None
+        
+        failures = [f"{cert.subject.rfc4514_string()} <- {issuer.subject.rfc4514_string()}: {message}"
+                    for cert, issuer, status, message in links if not status]
+        if failures:
+            return {
+                'check': 'Chain Signatures',
+                'status': False,
+                'message': f"{len(failures)} of {len(links)} signature(s) failed ({'; '.join(failures)})"
+            }
+        return {
+            'check': 'Chain Signatures',
+            'status': True,
+            'message': f"All {len(links)} issuer signature(s) verified"
+        }
+    
+    def find_issuer(self, cert, chain):
+        """Return cert's issuer from chain or the trust store"""
+        if cert.subject == cert.issuer:
+            return cert
+        for candidate in chain:
+            if candidate is not cert and candidate.subject == cert.issuer:
+                return candidate
+        return trust_store.find_issuer(cert)
+    
+    def get_ocsp_urls(self, cert):
+        """OCSP responder URLs from the Authority Information Access extension"""
+        try:
+            aia_ext = cert.extensions.get_extension_for_oid(ExtensionOID.AUTHORITY_INFORMATION_ACCESS)
+        except x509.ExtensionNotFound:
+            return []
+        return [desc.access_location.value for desc in aia_ext.value
+                if desc.access_method == x509.AuthorityInformationAccessOID.OCSP]
+    
+    def parse_ocsp_response(self, response_der, cert, issuer, request):
+        """Validate a DER OCSP response for cert and return its single response"""
+        response = ocsp.load_der_ocsp_response(response_der)
+        if response.response_status != ocsp.OCSPResponseStatus.SUCCESSFUL:
+            raise ValueError(f"OCSP responder returned {response.response_status.name}")
+        
+        single = None
+        for candidate in response.responses:
+            if candidate.serial_number == cert.serial_number and candidate.issuer_key_hash == request.issuer_key_hash:
+                single = candidate
+                break
+        if single is None:
+            raise ValueError("OCSP response does not cover this certificate")
+        
+        # The responder is either the issuer itself or a certificate it delegated OCSP signing to
+        responder = issuer
+        if not self.is_ocsp_responder(issuer, response):
+            responder = None
+            for delegate in response.certificates:
+                if not self.is_ocsp_responder(delegate, response):
+                    continue
+                try:
+                    eku = delegate.extensions.get_extension_for_class(x509.ExtendedKeyUsage).value
+                except x509.ExtensionNotFound:
+                    continue
+                if x509.oid.ExtendedKeyUsageOID.OCSP_SIGNING in eku and self.verify_signature(delegate, issuer)[0]:
+                    responder = delegate
+                    break
+            if responder is None:
+                raise ValueError("OCSP response is not signed by the issuer or an authorized responder")
+        
+        try:
+            self.verify_with_public_key(responder.public_key(), response.signature, response.tbs_response_bytes,
+                                        response.signature_hash_algorithm)
+        except InvalidSignature:
+            raise ValueError("OCSP response signature is invalid")
+        
+        now = datetime.datetime.utcnow()
+        if single.this_update > now + OCSP_CLOCK_SKEW:
+            raise ValueError("OCSP response is not yet valid")
+        if single.next_update is not None and single.next_update < now - OCSP_CLOCK_SKEW:
+            raise ValueError("OCSP response is stale")
+        return single
+    
+    def is_ocsp_responder(self, cert, response):
+        """True if cert is the responder identified in the OCSP response"""
+        if response.responder_name is not None:
+            return cert.subject == response.responder_name
+        # responder_key_hash is the SHA-1 of the subjectPublicKey bits, same as an RFC 5280 method-1 SKI
+        return x509.SubjectKeyIdentifier.from_public_key(cert.public_key()).digest == response.responder_key_hash
+    
+    def fetch_ocsp_response(self, url, request_der):
+        """POST an OCSP request and return the DER response"""
+        request = urllib.request.Request(require_http_url(url), data=request_der, headers={
+            'Content-Type': 'application/ocsp-request',
+            'Accept': 'application/ocsp-response'
+        })
+        with urllib.request.urlopen(request, timeout=OCSP_TIMEOUT) as response:
+            return response.read()
+    
+    def lookup_ocsp(self, cert, issuer):
+        """Return (single response, source) for cert, or None if OCSP does not apply
+        
+        A cached response is reused until its nextUpdate, and concurrent lookups
+        for the same certificate share one responder request. Requests carry no
+        nonce so that responses can be cached (the RFC 5019 profile); freshness
+        comes from the thisUpdate/nextUpdate checks instead. Stapled responses
+        are not used: the ssl module cannot request or read them. Raises
+        ValueError when no responder gave a valid answer.
+        """
+        if not OCSP_ENABLED or issuer is None or cert.subject == cert.issuer:
+            return None
+        urls = self.get_ocsp_urls(cert)
+        if not urls:
+            return None
+        
+        request = ocsp.OCSPRequestBuilder().add_certificate(cert, issuer, hashes.SHA1()).build()
+        cache_key = f"{request.issuer_key_hash.hex()}:{cert.serial_number:x}"
+        
+        cached = ocsp_cache.get(cache_key)
+        if cached is None:
+            # Fall back to responses other workers already fetched
+            cached, ttl = shared_cache.get_with_ttl('ocsp', cache_key)
+            if cached is not None:
+                ocsp_cache.set(cache_key, cached, ttl=ttl)
+        if cached is not None:
+            try:
+                return self.parse_ocsp_response(cached, cert, issuer, request), 'cached'
+            except ValueError:
+                pass
+        
+        request_der = request.public_bytes(serialization.Encoding.DER)
+        errors = []
+        for url in urls:
+            try:
+                response_der = ocsp_flight.do((url, cache_key), lambda url=url: self.fetch_ocsp_response(url, request_der))
+                single = self.parse_ocsp_response(response_der, cert, issuer, request)
+            except Exception as e:
+                logger.warning(f"OCSP check against {url} failed: {e}")
+                errors.append(f"{url}: {e}")
+                continue
+            self.store_ocsp_response(cache_key, response_der, single)
+            return single, url
+        raise ValueError('; '.join(errors) or "no usable responder")
+    
+    def ocsp_result(self, single, source):
+        """Validation result for an OCSP single response"""
+        status = single.certificate_status
+        if status == ocsp.OCSPCertStatus.GOOD:
+            return {
+                'check': 'Revocation (OCSP)',
+                'status': True,
+                'message': f"Certificate is not revoked (OCSP, {source})"
+            }
+        if status == ocsp.OCSPCertStatus.REVOKED:
+            return {
+                'check': 'Revocation (OCSP)',
+                'status': False,
+                'message': self.revoked_message(single.revocation_time, single.revocation_reason)
+            }
+        return {
+            'check': 'Revocation (OCSP)',
+            'status': False,
+            'message': f"OCSP responder does not know this certificate ({source})"
+        }
+    
+    def ocsp_error_result(self, error):
+        return {
+            'check': 'Revocation (OCSP)',
+            'status': False,
+            'message': f"Could not obtain a valid OCSP response ({error})"
+        }
+    
+    def revoked_message(self, revocation_time, reason=None):
+        reason = f", reason: {reason.name}" if reason else ''
+        return f"Certificate was revoked on {revocation_time.strftime('%Y-%m-%d %H:%M:%S')} UTC{reason}"
+    
+    def check_ocsp(self, cert, issuer):
+        """Check cert's revocation status via OCSP and return a validation result"""
+        try:
+            answer = self.lookup_ocsp(cert, issuer)
+        except ValueError as e:
+            return self.ocsp_error_result(e)
+        return self.ocsp_result(*answer) if answer else None
+    
+    def check_crl(self, cert, issuer):
+        """Check cert against the CRLs named in its CRL Distribution Points"""
+        if not CRL_ENABLED or issuer is None or cert.subject == cert.issuer:
+            return None
+        urls = self.extract_certificate_info(cert)['crl_distribution_points']
+        if not urls:
+            return None
+        
+        errors = []
+        for url in urls:
+            try:
+                index = crl_store.get(url, issuer)
+                if not index.verified_by(issuer):
+                    raise ValueError("CRL is not signed by the certificate's issuer")
+            except Exception as e:
+                logger.warning(f"CRL check against {url} failed: {e}")
+                errors.append(f"{url}: {e}")
+                continue
+            
+            revoked_at = index.lookup(cert.serial_number)
+            if revoked_at is not None:
+                return {
+                    'check': 'Revocation (CRL)',
+                    'status': False,
+                    'message': self.revoked_message(revoked_at, index.revocation_reason(cert.serial_number))
+                }
+            if index.is_stale():
+                return {
+                    'check': 'Revocation (CRL)',
+                    'status': False,
+                    'message': f"Certificate is not listed, but the CRL expired on {index.next_update.strftime('%Y-%m-%d %H:%M:%S')} UTC and could not be refreshed"
+                }
+            return {
+                'check': 'Revocation (CRL)',
+                'status': True,
+                'message': f"Certificate is not revoked (CRL with {index.count + len(index.extra)} entries)"
+            }
+        return {
+            'check': 'Revocation (CRL)',
+            'status': False,
+            'message': f"Could not obtain a valid CRL ({'; '.join(errors)})"
+        }
+    
+    def check_revocation(self, cert, issuer):
+        """Revocation results for cert: OCSP when it gives a definite answer, otherwise also the CRL"""
+        results = []
+        try:
+            answer = self.lookup_ocsp(cert, issuer)
+        except ValueError as e:
+            answer = None
+            results.append(self.ocsp_error_result(e))
+        if answer is not None:
+            results.append(self.ocsp_result(*answer))
+            if answer[0].certificate_status != ocsp.OCSPCertStatus.UNKNOWN:
+                return results
+        crl_result = self.check_crl(cert, issuer)
+        if crl_result is not None:
+            results.append(crl_result)
+        return results
+    
+    def store_ocsp_response(self, cache_key, response_der, single):
+        ttl = self.ocsp_cache_ttl(single)
+        ocsp_cache.set(cache_key, response_der, ttl=ttl)
+        shared_cache.set('ocsp', cache_key, response_der, ttl)
+    
+    def ocsp_cache_ttl(self, single):
+        """Seconds an OCSP response may be reused: until nextUpdate, bounded by OCSP_MAX_TTL"""
+        if single.next_update is None:
+            return OCSP_DEFAULT_TTL
+        remaining = (single.next_update - datetime.datetime.utcnow()).total_seconds()
+        return max(0, min(remaining, OCSP_MAX_TTL))
+    
+    def find_trust_anchor(self, chain):
+        """Return the trusted root the chain ends at or is issued by, if any"""
+        if not chain:
+            return None
+        top = chain[-1]
+        if trust_store.contains(top):
+            return top
+        if top.subject == top.issuer:
+            return None
+        return trust_store.find_issuer(top)
+    
+    def extract_certificate_info(self, cert):
+        """Extract detailed certificate information"""
+        return CertificateInfo.for_certificate(cert)
+    
+    def verify_domain_match(self, cert, domain):
+        """Verify if domain matches certificate"""
+        if not domain:
+            return True, "No domain specified for verification"
+        
+        # Get certificate domains
+        cert_domains = []
+        
+        # Add CN from subject
+        try:
+            cn = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)[0].value
+            cert_domains.append(cn)
+        except:
+            pass
+        
+        # Add SANs
+        try:
+            san_ext = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName)
+            for name in san_ext.value:
+                if isinstance(name, x509.DNSName):
+                    cert_domains.append(name.value)
+        except x509.ExtensionNotFound:
+            pass
+        
+        # Check domain match
+        domain_lower = domain.lower()
+        for cert_domain in cert_domains:
+            cert_domain_lower = cert_domain.lower()
+            if cert_domain_lower == domain_lower:
+                return True, f"Domain '{domain}' matches certificate"
+            
+            # Check wildcard
+            if cert_domain_lower.startswith('*.'):
+                wildcard_domain = cert_domain_lower[2:]
+                if domain_lower.endswith(wildcard_domain):
+                    # Check that it's a direct subdomain
+                    prefix = domain_lower[:-len(wildcard_domain)]
+                    if '.' not in prefix.rstrip('.'):
+                        return True, f"Domain '{domain}' matches wildcard certificate"
+        
+        return False, f"Domain '{domain}' does not match certificate. Certificate domains: {', '.join(cert_domains)}"
+    
+    def check_validity_period(self, cert_info):
+        """Check the certificate validity window against the current time"""
+        now = datetime.datetime.utcnow()
+        if now < cert_info['not_before']:
+            return {
+                'check': 'Validity Period',
+                'status': False,
+                'message': f"Certificate not yet valid (starts {cert_info['not_before']})"
+            }
+        if now > cert_info['not_after']:
+            return {
+                'check': 'Validity Period',
+                'status': False,
+                'message': f"Certificate has expired ({cert_info['not_after']})"
+            }
+        days_until_expiry = (cert_info['not_after'] - now).days
+        return {
+            'check': 'Validity Period',
+            'status': True,
+            'message': f"Certificate is valid ({days_until_expiry} days until expiry)"
+        }
+    
+    def check_url(self, url, port=443, check_hostname=True, timeout=10, fetched=None):
+        """Fetch the certificate served at url:port and run the URL validation checks
+        
+        fetched, if given, is the (cert, chain, hostname) of a handshake the
+        caller already made.
+        """
+        cert, chain, hostname = fetched or self.get_url_certificate(url, port, timeout=timeout)
+        
+        # Extract certificate information
+        cert_info = self.extract_certificate_info(cert)
+        
+        # Only fall back to AIA when the server did not send the leaf's issuer
+        server_chain_length = len(chain)
+        sent_intermediates = cert.subject == cert.issuer or any(
+            c.subject == cert.issuer for c in chain[1:]
+        )
+        if not sent_intermediates:
+            chain = self.build_certificate_chain(cert)
+        
+        # Validation results
+        validation_results = [self.check_validity_period(cert_info)]
+        
+        # Report what the server actually presented
+        if cert.subject == cert.issuer:
+            validation_results.append({
+                'check': 'Server Chain',
+                'status': True,
+                'message': "Server certificate is self-signed"
+            })
+        elif sent_intermediates:
+            validation_results.append({
+                'check': 'Server Chain',
+                'status': True,
+                'message': f"Server sent {server_chain_length} certificate(s) including the issuer"
+            })
+        else:
+            validation_results.append({
+                'check': 'Server Chain',
+                'status': False,
+                'message': "Server did not send intermediate certificates"
+                           + (" (completed via AIA)" if len(chain) > 1 else "")
+            })
+        
+        # Check hostname match
+        if check_hostname:
+            domain_match, domain_message = self.verify_domain_match(cert, hostname)
+            validation_results.append({
+                'check': 'Hostname Verification',
+                'status': domain_match,
+                'message': domain_message
+            })
+        
+        # Check certificate chain
+        if len(chain) > 1:
+            validation_results.append({
+                'check': 'Certificate Chain',
+                'status': True,
+                'message': f"Certificate chain contains {len(chain)} certificates"
+            })
+            
+            # Verify chain order
+            is_correct, ordered_chain, order_message = self.verify_certificate_chain_order(chain)
+            validation_results.append({
+                'check': 'Chain Order',
+                'status': is_correct,
+                'message': order_message if is_correct else "Chain may not be in correct order"
+            })
+            
+            # Verify issuer signatures along the preferred path only; extra certificates are not links
+            paths = self.build_chain_paths(chain)
+            signature_result = self.check_chain_signatures(paths[0] if paths else ordered_chain)
+            if signature_result:
+                validation_results.append(signature_result)
+        else:
+            validation_results.append({
+                'check': 'Certificate Chain',
+                'status': False,
+                'message': "Only single certificate found (no chain)"
+            })
+        
+        # Check the chain leads to a trusted root
+        anchor = self.find_trust_anchor(chain)
+        validation_results.append({
+            'check': 'Trust Anchor',
+            'status': anchor is not None,
+            'message': f"Anchored to trusted root {anchor.subject.rfc4514_string()}" if anchor is not None
+                       else "Chain does not lead to a root in the trust store"
+        })
+        
+        # Check revocation status of the leaf
+        validation_results.extend(self.check_revocation(cert, self.find_issuer(cert, chain)))
+        inventory.record(chain, 'endpoint', f"{hostname}:{port}")
+        
+        # Determine overall result type
+        if all(r['status'] for r in validation_results):
+            result_type = 'success'
+        else:
+            result_type = 'warning' if any(r['status'] for r in validation_results) else 'error'
+        
+        return {
+            'hostname': hostname,
+            'port': port,
+            'cert': cert,
+            'chain': chain,
+            'server_chain_length': server_chain_length,
+            'cert_info': cert_info,
+            'validation_results': validation_results,
+            'result_type': result_type
+        }
+    
+    def check_cert_key(self, cert, private_key, domain='', verify_chain=True):
+        """Run the certificate + private key checks; the chain is only built when the key matches"""
+        cert_info = self.extract_certificate_info(cert)
+        
+        # Check if certificate and key match
+        key_match, match_message = self.match_private_key(cert, private_key)
+        validation_results = [{
+            'check': 'Certificate/Key Match',
+            'status': key_match,
+            'message': match_message
+        }]
+        if not key_match:
+            inventory.record([cert], 'upload')
+            return {
+                'cert': cert,
+                'chain': [cert],
+                'cert_info': cert_info,
+                'key_match': False,
+                'validation_results': validation_results,
+                'result_type': 'error'
+            }
+        
+        # Build certificate chain
+        chain = self.build_certificate_chain(cert) if verify_chain else [cert]
+        
+        # Check certificate validity period
+        validation_results.append(self.check_validity_period(cert_info))
+        
+        # Check domain match
+        if domain:
+            domain_match, domain_message = self.verify_domain_match(cert, domain)
+            validation_results.append({
+                'check': 'Domain Verification',
+                'status': domain_match,
+                'message': domain_message
+            })
+        
+        # Check certificate chain
+        if verify_chain and len(chain) > 1:
+            validation_results.append({
+                'check': 'Certificate Chain',
+                'status': True,
+                'message': f"Complete chain built ({len(chain)} certificates)"
+            })
+        elif verify_chain:
+            validation_results.append({
+                'check': 'Certificate Chain',
+                'status': False,
+                'message': "Could not build complete certificate chain"
+            })
+        
+        if verify_chain:
+            # Verify issuer signatures along the chain
+            signature_result = self.check_chain_signatures(chain)
+            if signature_result:
+                validation_results.append(signature_result)
+            
+            # Check revocation status of the certificate
+            validation_results.extend(self.check_revocation(cert, self.find_issuer(cert, chain)))
+        inventory.record(chain, 'upload')
+        
+        # Determine overall result type
+        if all(r['status'] for r in validation_results):
+            result_type = 'success'
+        else:
+            result_type = 'warning' if any(r['status'] for r in validation_results) else 'error'
+        
+        return {
+            'cert': cert,
+            'chain': chain,
+            'cert_info': cert_info,
+            'key_match': True,
+            'validation_results': validation_results,
+            'result_type': result_type
+        }
+    
+    def check_chain(self, certificates, check_revocation=True):
+        """Run the chain-only checks on certificates loaded by load_certificate_chain"""
+        # Extract info for all certificates
+        certs_info = [self.extract_certificate_info(cert) for cert in certificates]
+        
+        # Verify chain order
+        is_correct_order, correct_chain, order_message = self.verify_certificate_chain_order(certificates)
+        
+        # Validation results
+        validation_results = []
+        
+        # Check number of certificates
+        validation_results.append({
+            'check': 'Certificate Count',
+            'status': True,
+            'message': f"Found {len(certificates)} certificate(s) in the chain"
+        })
+        
+        # Report blocks that could not be parsed
+        if self.parse_errors:
+            details = '; '.join(f"offset {offset}: {error}" for offset, error in self.parse_errors[:5])
+            if len(self.parse_errors) > 5:
+                details += f"; ... and {len(self.parse_errors) - 5} more"
+            validation_results.append({
+                'check': 'Parse Errors',
+                'status': False,
+                'message': f"{len(self.parse_errors)} block(s) skipped ({details})"
+            })
+        
+        # Check chain order
+        validation_results.append({
+            'check': 'Chain Order',
+            'status': is_correct_order,
+            'message': order_message if is_correct_order else "Chain is NOT in correct order (should be: server → intermediate → root)"
+        })
+        
+        # Check each certificate validity
+        now = datetime.datetime.utcnow()
+        for i, cert_info in enumerate(certs_info):
+            cert_name = cert_info['subject'].get('commonName', f'Certificate {i+1}')
+            if now > cert_info['not_after']:
+                validation_results.append({
+                    'check': f'Certificate Validity [{i+1}]',
+                    'status': False,
+                    'message': f"{cert_name} has expired ({cert_info['not_after']})"
+                })
+            elif now < cert_info['not_before']:
+                validation_results.append({
+                    'check': f'Certificate Validity [{i+1}]',
+                    'status': False,
+                    'message': f"{cert_name} is not yet valid (starts {cert_info['not_before']})"
+                })
+            else:
+                days_until_expiry = (cert_info['not_after'] - now).days
+                validation_results.append({
+                    'check': f'Certificate Validity [{i+1}]',
+                    'status': True,
+                    'message': f"{cert_name} is valid ({days_until_expiry} days until expiry)"
+                })
+        
+        # Check if chain is complete (has root), consulting the trust store for a missing root
+        has_root = any(cert.subject == cert.issuer for cert in certificates)
+        paths = self.build_chain_paths(certificates)
+        preferred_path = paths[0] if paths else correct_chain
+        anchor = self.find_trust_anchor(preferred_path)
+        if has_root:
+            message = "Chain includes root certificate"
+            if anchor is not None:
+                message += f" (trusted: {anchor.subject.rfc4514_string()})"
+            else:
+                message += " (not in the trust store)"
+        elif anchor is not None:
+            message = f"Chain anchored to trusted root {anchor.subject.rfc4514_string()} (root not included in the file)"
+        else:
+            message = "Chain does not include root certificate and no trusted root issues it"
+        validation_results.append({
+            'check': 'Chain Completeness',
+            'status': has_root or anchor is not None,
+            'message': message
+        })
+        
+        # Verify issuer signatures along the preferred path
+        signature_result = self.check_chain_signatures(preferred_path)
+        if signature_result:
+            validation_results.append(signature_result)
+        
+        # Check revocation status of the leaf
+        if check_revocation:
+            validation_results.extend(self.check_revocation(preferred_path[0],
+                                                            self.find_issuer(preferred_path[0], preferred_path)))
+        
+        inventory.record(certificates, 'upload')
+        
+        # Determine overall result type
+        if all(r['status'] for r in validation_results):
+            result_type = 'success'
+        elif is_correct_order:
+            result_type = 'warning'
+        else:
+            result_type = 'error'
+        
+        return {
+            'certificates': certificates,
+            'certs_info': certs_info,
+            'is_correct_order': is_correct_order,
+            'correct_chain': correct_chain,
+            'validation_results': validation_results,
+            'result_type': result_type
+        }
+    
+    def fixed_chain(self, correct_chain, include_root=False):
+        """The correctly ordered chain for download, without the root unless asked for"""
+        if include_root:
+            return correct_chain
+        return [cert for cert in correct_chain if cert.subject != cert.issuer]
+    
+    def chain_to_pem(self, chain):
+        return b''.join(cert.public_bytes(serialization.Encoding.PEM) for cert in chain)
+    
+    def read_chain_bundles(self, uploads):
+        """Expand uploaded (filename, data) pairs into (name, data) chain bundles
+        
+        Zip and tar archives contribute every member with a certificate file
+        extension; other uploads are taken as a single bundle. Member sizes are
+        checked before extraction.
+        """
+        bundles = []
+        names = set()
+        total = 0
+        
+        def add(name, data_or_reader, size):
+            nonlocal total
+            if len(bundles) >= BATCH_MAX_BUNDLES:
+                raise ValueError(f"Too many chain files; the maximum per batch is {BATCH_MAX_BUNDLES}")
+            if size > MAX_FILE_SIZE:
+                raise ValueError(f"{name} exceeds the maximum allowed size (5MB)")
+            total += size
+            if total > BATCH_MAX_SIZE:
+                raise ValueError(f"Batch exceeds the maximum total size ({BATCH_MAX_SIZE} bytes)")
+            # Archive paths are kept (relative) so corrected chains land in the same layout
+            name = '/'.join(part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..'))
+            unique = name
+            counter = 1
+            while unique in names:
+                counter += 1
+                root, ext = os.path.splitext(name)
+                unique = f"{root}-{counter}{ext}"
+            names.add(unique)
+            bundles.append((unique, data_or_reader() if callable(data_or_reader) else data_or_reader))
+        
+        def wanted(name):
+            base = os.path.basename(name)
+            return (not base.startswith('.') and '__MACOSX' not in name.split('/')
+                    and os.path.splitext(base)[1].lower() in ALLOWED_EXTENSIONS - {'.key'})
+        
+        for filename, data in uploads:
+            if zipfile.is_zipfile(BytesIO(data)):
+                with zipfile.ZipFile(BytesIO(data)) as archive:
+                    for member in archive.infolist():
+                        if not member.is_dir() and wanted(member.filename):
+                            add(member.filename, lambda: archive.read(member), member.file_size)
+                continue
+            try:
+                archive = tarfile.open(fileobj=BytesIO(data), mode='r:*')
+            except tarfile.TarError:
+                archive = None
+            if archive is not None:
+                with archive:
+                    for member in archive:
+                        if member.isfile() and wanted(member.name):
+                            add(member.name, lambda: archive.extractfile(member).read(), member.size)
+                continue
+            add(os.path.basename(filename) or 'chain.pem', data, len(data))
+        return bundles
+    
+    def analyze_chain_bundle(self, name, data, include_root=False, check_revocation=True):
+        """Load and check one chain bundle; returns a plain (picklable) result row"""
+        row = {
+            'name': name,
+            'status': 'error',
+            'certificates': 0,
+            'subject': None,
+            'not_after': None,
+            'is_correct_order': None,
+            'failed_checks': [],
+            'validation_results': [],
+            'error': None,
+            'fixed_chain': None
+        }
         try:
-            ext_key_usage = cert.extensions.get_extension_for_class(x509.ExtendedKeyUsage)
-            info['extended_key_usage'] = [usage._name for usage in ext_key_usage.value]
-        except x509.ExtensionNotFound:
-            pass
-        
-        return info
+            certificates = self.load_certificate_chain(data)
+            if not certificates:
+                row['error'] = "No valid certificates found"
+                return row
+            check = self.check_chain(certificates, check_revocation=check_revocation)
+        except Exception as e:
+            row['error'] = str(e)
+            return row
+        
+        leaf = check['correct_chain'][0] if check['correct_chain'] else certificates[0]
+        leaf_info = self.extract_certificate_info(leaf)
+        row.update({
+            'status': check['result_type'],
+            'certificates': len(certificates),
+            'subject': leaf_info['subject'].get('commonName', leaf.subject.rfc4514_string()),
+            'not_after': leaf_info['not_after'].isoformat(),
+            'is_correct_order': check['is_correct_order'],
+            'failed_checks': [f"{r['check']}: {r['message']}" for r in check['validation_results'] if not r['status']],
+            'validation_results': check['validation_results']
+        })
+        if not check['is_correct_order']:
+            row['fixed_chain'] = self.chain_to_pem(self.fixed_chain(check['correct_chain'], include_root))
+        return row
     
-    def verify_domain_match(self, cert, domain):
-        """Verify if domain matches certificate"""
-        if not domain:
-            return True, "No domain specified for verification"
+    def parse_scan_targets(self, text):
+        """Parse host[:port] or URL entries (one per line) into (hostname, port) pairs"""
+        targets = []
+        invalid = []
+        seen = set()
+        
+        for line in text.splitlines():
+            entry = line.split('#', 1)[0].strip()
+            if not entry:
+                continue
+            
+            try:
+                if '://' in entry:
+                    parsed = urlparse(entry)
+                else:
+                    parsed = urlparse('//' + entry)
+                hostname = parsed.hostname
+                port = parsed.port or 443
+                if not hostname:
+                    raise ValueError
+            except ValueError:
+                invalid.append(entry)
+                continue
+            
+            if (hostname, port) not in seen:
+                seen.add((hostname, port))
+                targets.append((hostname, port))
         
-        # Get certificate domains
-        cert_domains = []
+        return targets, invalid
+    
+    def scan_urls(self, targets, check_hostname=True, max_workers=BULK_MAX_WORKERS,
+                  timeout=BULK_HOST_TIMEOUT, deadline=BULK_DEADLINE):
+        """Check many (hostname, port) targets concurrently on a bounded thread pool"""
+        results = {(row['hostname'], row['port']): row
+                   for row in self.iter_scan_urls(targets, check_hostname, max_workers, timeout, deadline)}
+        
+        # Keep the input order in the aggregated result set
+        return [results[target] for target in targets]
+    
+    def iter_scan_urls(self, targets, check_hostname=True, max_workers=BULK_MAX_WORKERS,
+                       timeout=BULK_HOST_TIMEOUT, deadline=BULK_DEADLINE):
+        """Like scan_urls, but yield each target's row as soon as it completes
+        
+        All handshakes are started at once on the shared handshake loop, which
+        bounds them to ASYNC_MAX_CONCURRENCY. Each completed handshake is then
+        validated (chain building, revocation) on a pool of max_workers threads.
+        """
+        def scan_one(hostname, port, fetched):
+            check = CertificateValidator().check_url(hostname, port, check_hostname=check_hostname, timeout=timeout,
+                                                     fetched=fetched)
+            cert_info = check['cert_info']
+            days_until_expiry = (cert_info['not_after'] - datetime.datetime.utcnow()).days
+            return {
+                'status': check['result_type'],
+                'subject': cert_info['subject'].get('commonName', ''),
+                'issuer': cert_info['issuer'].get('commonName', ''),
+                'not_after': cert_info['not_after'].isoformat(),
+                'days_until_expiry': days_until_expiry,
+                'chain_length': len(check['chain']),
+                'failed_checks': [f"{r['check']}: {r['message']}" for r in check['validation_results'] if not r['status']],
+                'error': ''
+            }
         
-        # Add CN from subject
-        try:
-            cn = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)[0].value
-            cert_domains.append(cn)
-        except:
-            pass
+        def row(target, result):
+            hostname, port = target
+            return dict({'target': f"{hostname}:{port}", 'hostname': hostname, 'port': port}, **result)
         
-        # Add SANs
-        try:
-            san_ext = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName)
-            for name in san_ext.value:
-                if isinstance(name, x509.DNSName):
-                    cert_domains.append(name.value)
-        except x509.ExtensionNotFound:
-            pass
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(targets))),
+            thread_name_prefix='bulk-scan'
+        )
+        handshakes = []
         
-        # Check domain match
-        domain_lower = domain.lower()
-        for cert_domain in cert_domains:
-            cert_domain_lower = cert_domain.lower()
-            if cert_domain_lower == domain_lower:
-                return True, f"Domain '{domain}' matches certificate"
+        def scan(hostname, port):
+            """Future for the target's row: handshake on the loop, then validation on the pool"""
+            scanned = concurrent.futures.Future()
             
-            # Check wildcard
-            if cert_domain_lower.startswith('*.'):
-                wildcard_domain = cert_domain_lower[2:]
-                if domain_lower.endswith(wildcard_domain):
-                    # Check that it's a direct subdomain
-                    prefix = domain_lower[:-len(wildcard_domain)]
-                    if '.' not in prefix.rstrip('.'):
-                        return True, f"Domain '{domain}' matches wildcard certificate"
+            def copy_result(source):
+                try:
+                    if source.cancelled():
+                        scanned.set_exception(ValueError("Scan cancelled"))
+                    elif source.exception() is not None:
+                        scanned.set_exception(source.exception())
+                    else:
+                        scanned.set_result(source.result())
+                except concurrent.futures.InvalidStateError:
+                    pass  # given up on at the deadline
+            
+            def validate(handshake):
+                if handshake.cancelled() or handshake.exception() is not None:
+                    copy_result(handshake)
+                    return
+                try:
+                    executor.submit(scan_one, hostname, port, handshake.result()).add_done_callback(copy_result)
+                except RuntimeError as e:
+                    # The scan is over and its executor shut down
+                    failed = concurrent.futures.Future()
+                    failed.set_exception(ValueError(f"Scan cancelled: {e}"))
+                    copy_result(failed)
+            
+            handshake = tls_handshakes.submit(self.fetch_certificate_async(hostname, port, timeout=timeout))
+            handshakes.append(handshake)
+            handshake.add_done_callback(validate)
+            return scanned
         
-        return False, f"Domain '{domain}' does not match certificate. Certificate domains: {', '.join(cert_domains)}"
+        try:
+            futures = {scan(hostname, port): (hostname, port) for hostname, port in targets}
+            pending = set(futures)
+            try:
+                for future in concurrent.futures.as_completed(futures, timeout=deadline):
+                    pending.discard(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'status': 'error', 'error': str(e)}
+                    yield row(futures[future], result)
+            except concurrent.futures.TimeoutError:
+                pass
+            
+            for future in pending:
+                future.cancel()
+                yield row(futures[future], {'status': 'timeout', 'error': f"Not completed within the {deadline:g}s scan deadline"})
+        finally:
+            # Do not wait for stragglers past the deadline; queued work is dropped
+            for handshake in handshakes:
+                handshake.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
     
-    def generate_pdf_report(self, cert_info, chain_info, validation_results, output_path):
-        """Generate detailed PDF report"""
-        pdf = FPDF()
+    def generate_pdf_report(self, cert_info, chain_info, validation_results, generated_at=None):
+        """Generate detailed PDF report; returns the PDF bytes"""
+        generated_at = generated_at or datetime.datetime.utcnow()
+        pdf = ReportPDF()
         pdf.add_page()
         pdf.set_font("Arial", "B", size=16)
         pdf.cell(0, 10, "SSL Certificate Validation Report", ln=True, align='C')
@@ -1304,7 +4413,7 @@ class CertificateValidator:
         
         # Report metadata
         pdf.set_font("Arial", size=10)
-        pdf.cell(0, 10, f"Generated: {datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}", ln=True)
+        pdf.cell(0, 10, f"Generated: {generated_at.strftime('%Y-%m-%d %H:%M:%S UTC')}", ln=True)
         pdf.ln(5)
         
         # Certificate information
@@ -1366,31 +4475,937 @@ class CertificateValidator:
             status = "PASS" if result['status'] else "FAIL"
             pdf.cell(0, 6, f"[{status}] {result['check']}: {result['message']}", ln=True)
         
-        pdf.output(output_path)
+        return pdf.output(dest='S').encode('latin-1')
     
-    def generate_json_report(self, cert_info, chain_info, validation_results, output_path):
-        """Generate JSON report"""
-        report = {
-            'timestamp': datetime.datetime.utcnow().isoformat(),
-            'certificate': cert_info,
-            'chain': chain_info,
+    def build_json_report(self, cert_info, chain_info, validation_results, generated_at=None):
+        """The JSON report as a dict"""
+        def as_dict(info):
+            return info.to_dict() if isinstance(info, CertificateInfo) else info
+        
+        return {
+            'timestamp': (generated_at or datetime.datetime.utcnow()).isoformat(),
+            'certificate': as_dict(cert_info),
+            'chain': [as_dict(info) for info in chain_info],
+            'validation_results': validation_results
+        }
+    
+    def generate_json_report(self, cert_info, chain_info, validation_results, generated_at=None):
+        """Generate JSON report; returns the JSON bytes"""
+        report = self.build_json_report(cert_info, chain_info, validation_results, generated_at)
+        return json.dumps(report, indent=2, default=str).encode()
+    
+    def result_record(self, chain, validation_results):
+        """What the reports are rendered from, as bytes: the chain as DER plus the check results"""
+        return json.dumps({
+            'validated_at': datetime.datetime.utcnow().isoformat(),
+            'chain': [base64.b64encode(cert.public_bytes(serialization.Encoding.DER)).decode('ascii') for cert in chain],
             'validation_results': validation_results
+        }, default=str).encode()
+    
+    def render_report(self, record, report_format):
+        """Render the 'pdf' or 'json' report for a result record; returns the report bytes"""
+        record = json.loads(record)
+        chain = [self.parse_der_certificate(base64.b64decode(der)) for der in record['chain']]
+        chain_info = [self.extract_certificate_info(cert) for cert in chain]
+        cert_info = chain_info[0] if chain_info else {}
+        generated_at = datetime.datetime.fromisoformat(record['validated_at'])
+        
+        if report_format == 'pdf':
+            return self.generate_pdf_report(cert_info, chain_info, record['validation_results'], generated_at=generated_at)
+        return self.generate_json_report(cert_info, chain_info, record['validation_results'], generated_at)
+    
+    def generate_bulk_reports(self, scan_results, summary):
+        """Aggregated bulk scan results as (JSON bytes, CSV bytes)"""
+        json_report = json.dumps({
+            'timestamp': datetime.datetime.utcnow().isoformat(),
+            'summary': summary,
+            'results': scan_results
+        }, indent=2, default=str).encode()
+        
+        fields = ['target', 'hostname', 'port', 'status', 'subject', 'issuer', 'not_after',
+                  'days_until_expiry', 'chain_length', 'failed_checks', 'error']
+        output = StringIO(newline='')
+        writer = csv.DictWriter(output, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for row in scan_results:
+            row = dict(row)
+            row['failed_checks'] = '; '.join(row.get('failed_checks', []))
+            writer.writerow(row)
+        return json_report, output.getvalue().encode()
+
+# Build the trust anchor index at import time (before workers fork under --preload)
+trust_store = TrustStore()
+trust_store.load()
+
+class CertificateInventory:
+    """Every certificate seen by a validation, kept in SQLite for expiry, issuer and name queries
+    
+    Validations only queue the DER bytes of the certificates they saw; a
+    background thread per process decodes its own copies (certificate objects
+    must not be shared between threads) and writes them in one transaction per
+    batch. A certificate is stored once per fingerprint, its DNS/IP names in a
+    lookup table, and each place it was seen (an endpoint host:port, or an
+    upload) as a sighting with first and last seen times. Queries page with
+    opaque cursors over index order, so their cost does not grow with the
+    table.
+    """
+    
+    BATCH_SIZE = 1000  # queued sightings that trigger an early flush
+    TOUCH_INTERVAL = 60  # seconds; a repeated sighting is written at most once per minute
+    RECENT_SIZE = 8192  # sightings remembered for the touch interval
+    
+    def __init__(self, path=INVENTORY_DB, flush_interval=INVENTORY_FLUSH_INTERVAL, enabled=True):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self.recorded = 0
+        self.written = 0
+        self.errors = 0
+        self._pending = {}
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._local = threading.local()
+        self._pid = None
+    
+    def _connection(self):
+        # Connections must not cross a fork, so they are also keyed by PID
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS certificates ('
+            'id INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL UNIQUE, serial TEXT, subject TEXT, subject_cn TEXT, '
+            'issuer TEXT, issuer_cn TEXT, not_before INTEGER, not_after INTEGER, key_type TEXT, spki_sha256 TEXT, '
+            'is_ca INTEGER, first_seen REAL NOT NULL, last_seen REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS certificates_not_after ON certificates (not_after)')
+        conn.execute('CREATE INDEX IF NOT EXISTS certificates_issuer ON certificates (issuer)')
+        conn.execute('CREATE INDEX IF NOT EXISTS certificates_issuer_cn ON certificates (issuer_cn)')
+        conn.execute('CREATE INDEX IF NOT EXISTS certificates_spki ON certificates (spki_sha256)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS certificate_names ('
+            'name TEXT NOT NULL, certificate_id INTEGER NOT NULL, PRIMARY KEY (name, certificate_id)) WITHOUT ROWID'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS certificate_names_certificate ON certificate_names (certificate_id)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS sightings ('
+            'certificate_id INTEGER NOT NULL, kind TEXT NOT NULL, location TEXT NOT NULL, '
+            'first_seen REAL NOT NULL, last_seen REAL NOT NULL, '
+            'PRIMARY KEY (certificate_id, kind, location)) WITHOUT ROWID'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    # Recording
+    
+    def record(self, certificates, kind, location=''):
+        """Queue certificates seen by a validation; kind is 'endpoint' (location host:port) or 'upload'"""
+        if not self.enabled or not certificates:
+            return
+        now = time.time()
+        with self._lock:
+            for cert in certificates:
+                key = (cert.fingerprint(hashes.SHA256()).hex(), kind, location)
+                if now - self._recent.get(key, 0) < self.TOUCH_INTERVAL:
+                    continue
+                self._recent[key] = now
+                self._recent.move_to_end(key)
+                self._pending[key] = (cert.public_bytes(serialization.Encoding.DER), now)
+                self.recorded += 1
+            while len(self._recent) > self.RECENT_SIZE:
+                self._recent.popitem(last=False)
+            full = len(self._pending) >= self.BATCH_SIZE
+        self._start()
+        if full:
+            self._wakeup.set()
+    
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='inventory-writer', daemon=True).start()
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+    
+    def describe(self, der):
+        """The stored fields of a DER certificate and its names"""
+        cert = x509.load_der_x509_certificate(der, default_backend())
+        info = CertificateInfo.for_certificate(cert)
+        public_key = cert.public_key()
+        names = set()
+        try:
+            for name in cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value:
+                if isinstance(name, (x509.DNSName, x509.IPAddress)):
+                    names.add(str(name.value).lower())
+        except x509.ExtensionNotFound:
+            pass
+        subject_cn = info['subject'].get('commonName')
+        if subject_cn and not info['is_ca']:
+            names.add(subject_cn.lower())
+        return {
+            'fingerprint': cert.fingerprint(hashes.SHA256()).hex(),
+            'serial': info['serial_number'],
+            'subject': cert.subject.rfc4514_string(),
+            'subject_cn': subject_cn,
+            'issuer': cert.issuer.rfc4514_string(),
+            'issuer_cn': info['issuer'].get('commonName'),
+            'not_before': int(info['not_before'].replace(tzinfo=datetime.timezone.utc).timestamp()),
+            'not_after': int(info['not_after'].replace(tzinfo=datetime.timezone.utc).timestamp()),
+            'key_type': CertificateValidator().describe_public_key(public_key),
+            'spki_sha256': hashlib.sha256(public_key.public_bytes(
+                serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)).hexdigest(),
+            'is_ca': int(bool(info['is_ca']))
+        }, sorted(names)
+    
+    def flush(self):
+        """Write the queued sightings now"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            
+            # A certificate that cannot be described is skipped; the rest of the batch is still written
+            described = {}
+            for (fingerprint, _, _), (der, _) in pending.items():
+                if fingerprint in described:
+                    continue
+                try:
+                    described[fingerprint] = self.describe(der)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Certificate inventory skipped {fingerprint}: {e}")
+            
+            try:
+                conn = self._connection()
+                ids = {}
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    for (fingerprint, kind, location), (_, seen) in pending.items():
+                        if fingerprint not in described:
+                            continue
+                        if fingerprint not in ids:
+                            fields, names = described[fingerprint]
+                            ids[fingerprint] = conn.execute(
+                                f"INSERT INTO certificates ({', '.join(fields)}, first_seen, last_seen) "
+                                f"VALUES ({', '.join('?' * len(fields))}, ?, ?) "
+                                'ON CONFLICT (fingerprint) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen) '
+                                'RETURNING id', list(fields.values()) + [seen, seen]
+                            ).fetchone()[0]
+                            conn.executemany('INSERT OR IGNORE INTO certificate_names (name, certificate_id) VALUES (?, ?)',
+                                             [(name, ids[fingerprint]) for name in names])
+                        conn.execute(
+                            'INSERT INTO sightings (certificate_id, kind, location, first_seen, last_seen) '
+                            'VALUES (?, ?, ?, ?, ?) ON CONFLICT (certificate_id, kind, location) DO UPDATE SET '
+                            'last_seen = MAX(last_seen, excluded.last_seen)',
+                            (ids[fingerprint], kind, location, seen, seen)
+                        )
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+                self.written += sum(1 for fingerprint, _, _ in pending if fingerprint in described)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Certificate inventory write failed: {e}")
+    
+    # Queries
+    
+    CERTIFICATE_COLUMNS = ('id', 'fingerprint', 'serial', 'subject', 'subject_cn', 'issuer', 'issuer_cn', 'not_before',
+                           'not_after', 'key_type', 'spki_sha256', 'is_ca', 'first_seen', 'last_seen')
+    
+    def encode_cursor(self, key):
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+    
+    def decode_cursor(self, cursor, length):
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        if not isinstance(key, list) or len(key) != length:
+            raise ValueError("Invalid cursor")
+        return key
+    
+    def certificates(self, expiring_within=None, issuer=None, issuer_dn=None, spki_sha256=None, cursor=None, limit=100):
+        """(certificates, next cursor) for one filter, in index order
+        
+        expiring_within (days) lists certificates that have not expired yet by
+        expiry date; the other filters list matches by insertion order.
+        """
+        self.flush()
+        columns = ', '.join(self.CERTIFICATE_COLUMNS)
+        if expiring_within is not None:
+            now = int(time.time())
+            after = self.decode_cursor(cursor, 2) if cursor else [now, 0]
+            rows = self._connection().execute(
+                f"SELECT {columns} FROM certificates WHERE not_after >= ? AND not_after <= ? "
+                "AND (not_after, id) > (?, ?) ORDER BY not_after, id LIMIT ?",
+                (now, now + int(expiring_within * 86400), after[0], after[1], limit)
+            ).fetchall()
+            next_key = lambda row: [row[8], row[0]]
+        else:
+            after = self.decode_cursor(cursor, 1) if cursor else [0]
+            for column, value in (('issuer_cn', issuer), ('issuer', issuer_dn), ('spki_sha256', spki_sha256)):
+                if value:
+                    where, args = f"{column} = ? AND id > ?", [value, after[0]]
+                    break
+            else:
+                where, args = 'id > ?', [after[0]]
+            rows = self._connection().execute(
+                f"SELECT {columns} FROM certificates WHERE {where} ORDER BY id LIMIT ?", args + [limit]
+            ).fetchall()
+            next_key = lambda row: [row[0]]
+        certificates = [dict(zip(self.CERTIFICATE_COLUMNS, row)) for row in rows]
+        return certificates, self.encode_cursor(next_key(rows[-1])) if len(rows) == limit else None
+    
+    def certificate(self, fingerprint):
+        """A certificate with its names and sightings, or None"""
+        self.flush()
+        conn = self._connection()
+        row = conn.execute(f"SELECT {', '.join(self.CERTIFICATE_COLUMNS)} FROM certificates WHERE fingerprint = ?",
+                           (fingerprint.lower(),)).fetchone()
+        if row is None:
+            return None
+        certificate = dict(zip(self.CERTIFICATE_COLUMNS, row))
+        certificate['names'] = [name for name, in conn.execute(
+            'SELECT name FROM certificate_names WHERE certificate_id = ? ORDER BY name', (certificate['id'],))]
+        certificate['sightings'] = [
+            {'kind': kind, 'location': location, 'first_seen': first_seen, 'last_seen': last_seen}
+            for kind, location, first_seen, last_seen in conn.execute(
+                'SELECT kind, location, first_seen, last_seen FROM sightings WHERE certificate_id = ? '
+                'ORDER BY last_seen DESC', (certificate['id'],))
+        ]
+        return certificate
+    
+    def endpoints_serving(self, name, cursor=None, limit=100):
+        """(endpoints whose certificate covers name, next cursor); wildcard certificates match one label"""
+        self.flush()
+        name = name.strip().lower().rstrip('.')
+        names = [name]
+        if '.' in name:
+            names.append('*.' + name.split('.', 1)[1])
+        after = self.decode_cursor(cursor, 2) if cursor else [0, '']
+        rows = self._connection().execute(
+            'SELECT s.certificate_id, s.location, s.first_seen, s.last_seen, c.fingerprint, c.subject_cn, '
+            'c.issuer_cn, c.not_after FROM certificate_names n '
+            'JOIN sightings s ON s.certificate_id = n.certificate_id AND s.kind = ? '
+            'JOIN certificates c ON c.id = n.certificate_id '
+            f"WHERE n.name IN ({', '.join('?' * len(names))}) AND (s.certificate_id, s.location) > (?, ?) "
+            'ORDER BY s.certificate_id, s.location LIMIT ?',
+            ['endpoint'] + names + after + [limit]
+        ).fetchall()
+        endpoints = [
+            {'endpoint': location, 'first_seen': first_seen, 'last_seen': last_seen, 'fingerprint': fingerprint,
+             'subject_cn': subject_cn, 'issuer_cn': issuer_cn, 'not_after': not_after}
+            for _, location, first_seen, last_seen, fingerprint, subject_cn, issuer_cn, not_after in rows
+        ]
+        return endpoints, self.encode_cursor(list(rows[-1][:2])) if len(rows) == limit else None
+    
+    def stats(self):
+        stats = {
+            'enabled': self.enabled,
+            'recorded': self.recorded,
+            'written': self.written,
+            'pending': len(self._pending),
+            'errors': self.errors
         }
+        try:
+            conn = self._connection()
+            stats['certificates'] = conn.execute('SELECT MAX(id) FROM certificates').fetchone()[0] or 0
+        except sqlite3.Error as e:
+            stats['error'] = str(e)
+        return stats
+
+inventory = CertificateInventory(enabled=INVENTORY_ENABLED)
+atexit.register(inventory.flush)
+
+class MonitorScheduler:
+    """Re-probes a stored endpoint inventory on an interval and records what changed
+    
+    Endpoints live in SQLite; the index on next_due is the priority queue. One
+    process per host holds the leader lock and runs the scheduler. It leases due
+    endpoints to a bounded thread pool, with at most per_host probes per
+    hostname at a time. Each probe is a handshake via get_url_certificate. The
+    full check_url validation only runs when the served chain changed, the last
+    full check is older than full_check_interval, or the endpoint has never been
+    checked. Endpoints whose result keeps repeating are probed less often, up to
+    max_backoff times the interval, except close to expiry.
+    """
+    
+    BACKOFF_AFTER = 3  # unchanged probes before each doubling of the interval
+    LEADER_RETRY = 30  # seconds between attempts to take over the scheduler
+    HOST_DEFER = 1  # seconds an endpoint waits when its host is at the per-host limit
+    NEW_ENDPOINT_WINDOW = 60  # seconds over which the first probes of a large import are spread
+    
+    def __init__(self, path=MONITOR_DB, interval=MONITOR_INTERVAL, jitter=MONITOR_JITTER,
+                 concurrency=MONITOR_CONCURRENCY, per_host=MONITOR_PER_HOST, timeout=MONITOR_TIMEOUT,
+                 max_backoff=MONITOR_MAX_BACKOFF, enabled=True):
+        self.path = path
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.max_backoff = max(1, max_backoff)
+        self.enabled = enabled
+        self.lease = timeout * 3 + 60  # a probe not recorded by then is retried
+        self.leader = False
+        self.probes = 0
+        self.full_checks = 0
+        self.changes = 0
+        self.errors = 0
+        self._recent = deque()  # completion times of probes in the last minute
+        self._in_flight = 0
+        self._host_counts = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._local = threading.local()
+        self._pid = None
+        self._lock_file = None
+    
+    def _connection(self):
+        # Connections must not cross a fork, so they are also keyed by PID
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS endpoints ('
+            'id INTEGER PRIMARY KEY, hostname TEXT NOT NULL, port INTEGER NOT NULL, check_hostname INTEGER NOT NULL, '
+            'interval INTEGER, enabled INTEGER NOT NULL DEFAULT 1, created_at REAL NOT NULL, next_due REAL NOT NULL, '
+            'last_checked REAL, last_full_check REAL, status TEXT, chain_hash TEXT, fingerprint TEXT, subject TEXT, '
+            'issuer TEXT, not_after REAL, failed_checks TEXT, error TEXT, unchanged_count INTEGER NOT NULL DEFAULT 0, '
+            'UNIQUE (hostname, port))'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS endpoints_due ON endpoints (next_due) WHERE enabled = 1')
+        conn.execute('CREATE INDEX IF NOT EXISTS endpoints_status ON endpoints (status)')
+        conn.execute('CREATE INDEX IF NOT EXISTS endpoints_not_after ON endpoints (not_after)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS endpoint_changes ('
+            'endpoint_id INTEGER NOT NULL, checked_at REAL NOT NULL, status TEXT, fingerprint TEXT, not_after REAL, '
+            'failed_checks TEXT, error TEXT)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS endpoint_changes_endpoint ON endpoint_changes (endpoint_id, checked_at)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    # Inventory
+    
+    def add_endpoints(self, targets, interval=None, check_hostname=None):
+        """Add (hostname, port) targets or update their settings; returns (added, updated)
+        
+        Settings left as None keep their stored value for existing endpoints
+        and take the defaults (MONITOR_INTERVAL, hostname checks on) for new ones.
+        """
+        conn = self._connection()
+        total = conn.execute('SELECT COUNT(*) FROM endpoints').fetchone()[0]
+        existing = set()
+        for offset in range(0, len(targets), 500):
+            chunk = targets[offset:offset + 500]
+            clause = ' OR '.join(['(hostname = ? AND port = ?)'] * len(chunk))
+            existing.update(conn.execute(f'SELECT hostname, port FROM endpoints WHERE {clause}',
+                                         [value for target in chunk for value in target]).fetchall())
+        new = [target for target in targets if target not in existing]
+        if total + len(new) > MONITOR_MAX_ENDPOINTS:
+            raise ValueError(f"The inventory is limited to {MONITOR_MAX_ENDPOINTS} endpoints")
+        
+        # New endpoints are probed right away; a large import is spread over about the
+        # time the probe slots need to work through it, so its next probes do not bunch up
+        now = time.time()
+        spread = min(self.NEW_ENDPOINT_WINDOW, len(new) / self.concurrency)
+        check = None if check_hostname is None else int(check_hostname)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO endpoints (hostname, port, check_hostname, interval, created_at, next_due) '
+                'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (hostname, port) DO UPDATE SET '
+                'check_hostname = COALESCE(?, check_hostname), interval = COALESCE(?, interval), enabled = 1',
+                [(hostname, port, 1 if check is None else check, interval, now, now + random.uniform(0, spread),
+                  check, interval)
+                 for hostname, port in targets]
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._wakeup.set()
+        return len(new), len(targets) - len(new)
+    
+    def remove_endpoint(self, endpoint_id):
+        conn = self._connection()
+        deleted = conn.execute('DELETE FROM endpoints WHERE id = ?', (endpoint_id,)).rowcount
+        conn.execute('DELETE FROM endpoint_changes WHERE endpoint_id = ?', (endpoint_id,))
+        return deleted > 0
+    
+    ENDPOINT_COLUMNS = ('id', 'hostname', 'port', 'check_hostname', 'interval', 'enabled', 'created_at', 'next_due',
+                        'last_checked', 'last_full_check', 'status', 'chain_hash', 'fingerprint', 'subject', 'issuer',
+                        'not_after', 'failed_checks', 'error', 'unchanged_count')
+    
+    def _endpoint(self, row):
+        endpoint = dict(zip(self.ENDPOINT_COLUMNS, row))
+        endpoint['failed_checks'] = json.loads(endpoint['failed_checks']) if endpoint['failed_checks'] else []
+        return endpoint
+    
+    def get_endpoint(self, endpoint_id):
+        """The endpoint with its recorded changes (newest first), or None"""
+        conn = self._connection()
+        row = conn.execute(f"SELECT {', '.join(self.ENDPOINT_COLUMNS)} FROM endpoints WHERE id = ?",
+                           (endpoint_id,)).fetchone()
+        if row is None:
+            return None
+        endpoint = self._endpoint(row)
+        endpoint['history'] = [
+            {'checked_at': checked_at, 'status': status, 'fingerprint': fingerprint, 'not_after': not_after,
+             'failed_checks': json.loads(failed_checks) if failed_checks else [], 'error': error}
+            for checked_at, status, fingerprint, not_after, failed_checks, error in conn.execute(
+                'SELECT checked_at, status, fingerprint, not_after, failed_checks, error FROM endpoint_changes '
+                'WHERE endpoint_id = ? ORDER BY checked_at DESC', (endpoint_id,))
+        ]
+        return endpoint
+    
+    def list_endpoints(self, status=None, hostname=None, after_id=0, limit=100):
+        """Endpoints with id > after_id in id order, optionally filtered by status or hostname"""
+        query = f"SELECT {', '.join(self.ENDPOINT_COLUMNS)} FROM endpoints WHERE id > ?"
+        args = [after_id]
+        if status:
+            query += ' AND status = ?'
+            args.append(status)
+        if hostname:
+            query += ' AND hostname = ?'
+            args.append(hostname.lower())
+        query += ' ORDER BY id LIMIT ?'
+        args.append(limit)
+        return [self._endpoint(row) for row in self._connection().execute(query, args)]
+    
+    # Scheduling
+    
+    def start(self):
+        """Start this process's leader election thread once"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='monitor-scheduler', daemon=True).start()
+    
+    def _acquire_leadership(self):
+        # flock is released by the kernel when the holding process exits
+        if self._lock_file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._lock_file = open(f"{self.path}.lock", 'a')
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+    
+    def _run(self):
+        while not self._acquire_leadership():
+            time.sleep(self.LEADER_RETRY)
+        self.leader = True
+        logger.info(f"Certificate monitor scheduler running in process {os.getpid()}")
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='monitor')
+        while True:
+            try:
+                self._schedule(executor)
+            except Exception as e:
+                logger.error(f"Monitor scheduling error: {str(e)}", exc_info=True)
+                time.sleep(5)
+    
+    def _schedule(self, executor):
+        """Dispatch due endpoints, then sleep until the next one is due or a probe finishes"""
+        conn = self._connection()
+        now = time.time()
+        with self._lock:
+            free = self.concurrency - self._in_flight
+        
+        if free > 0:
+            rows = conn.execute(
+                f"SELECT {', '.join(self.ENDPOINT_COLUMNS)} FROM endpoints WHERE enabled = 1 AND next_due <= ? "
+                "ORDER BY next_due LIMIT ?", (now, free * 4)
+            ).fetchall()
+            dispatch = []
+            deferred = []
+            with self._lock:
+                for row in rows:
+                    endpoint = self._endpoint(row)
+                    if len(dispatch) >= free:
+                        break
+                    hostname = endpoint['hostname']
+                    if self._host_counts.get(hostname, 0) >= self.per_host:
+                        deferred.append(endpoint['id'])
+                        continue
+                    self._host_counts[hostname] = self._host_counts.get(hostname, 0) + 1
+                    self._in_flight += 1
+                    dispatch.append(endpoint)
+            
+            # Leased endpoints are due again only if their probe is never recorded
+            conn.executemany('UPDATE endpoints SET next_due = ? WHERE id = ?',
+                             [(now + self.lease, endpoint['id']) for endpoint in dispatch] +
+                             [(now + self.HOST_DEFER, endpoint_id) for endpoint_id in deferred])
+            for endpoint in dispatch:
+                executor.submit(self._probe_and_record, endpoint)
+            if dispatch or deferred:
+                return
+        
+        next_due = conn.execute('SELECT MIN(next_due) FROM endpoints WHERE enabled = 1').fetchone()[0]
+        wait = 5 if next_due is None or free <= 0 else min(5, max(0.05, next_due - time.time()))
+        self._wakeup.wait(wait)
+        self._wakeup.clear()
+    
+    def _probe_and_record(self, endpoint):
+        try:
+            self.record(endpoint, self.probe(endpoint))
+        except Exception as e:
+            logger.error(f"Monitoring {endpoint['hostname']}:{endpoint['port']} failed: {str(e)}", exc_info=True)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._host_counts[endpoint['hostname']] -= 1
+                if not self._host_counts[endpoint['hostname']]:
+                    del self._host_counts[endpoint['hostname']]
+            self._wakeup.set()
+    
+    def probe(self, endpoint):
+        """Handshake with the endpoint and validate it again if what it serves changed"""
+        now = time.time()
+        hostname, port = endpoint['hostname'], endpoint['port']
+        result = {'checked_at': now, 'full_check': False, 'error': None}
+        validator = CertificateValidator()
+        try:
+            cert, chain, _ = validator.get_url_certificate(hostname, port, timeout=self.timeout)
+        except Exception as e:
+            result.update({'status': 'error', 'chain_hash': None, 'fingerprint': None, 'subject': None,
+                           'issuer': None, 'not_after': None, 'failed_checks': [], 'error': str(e)})
+            return result
+        
+        chain_hash = hashlib.sha256(b''.join(c.public_bytes(serialization.Encoding.DER) for c in chain)).hexdigest()
+        not_after = cert.not_valid_after.replace(tzinfo=datetime.timezone.utc).timestamp()
+        result.update({
+            'chain_hash': chain_hash,
+            'fingerprint': cert.fingerprint(hashes.SHA256()).hex(),
+            'subject': cert.subject.rfc4514_string(),
+            'issuer': cert.issuer.rfc4514_string(),
+            'not_after': not_after
+        })
+        
+        unchanged = (chain_hash == endpoint['chain_hash'] and endpoint['status'] is not None
+                     and now - (endpoint['last_full_check'] or 0) < MONITOR_FULL_CHECK_INTERVAL)
+        if unchanged:
+            inventory.record(chain, 'endpoint', f"{hostname}:{port}")
+            result['status'] = endpoint['status']
+            result['failed_checks'] = endpoint['failed_checks']
+            if not_after <= now and endpoint['status'] != 'error':
+                result['status'] = 'error'
+                result['failed_checks'] = endpoint['failed_checks'] + ["Validity Period: Certificate has expired"]
+            return result
+        
+        # The handshake result is cached briefly, so check_url does not connect again
+        try:
+            check = validator.check_url(hostname, port, check_hostname=bool(endpoint['check_hostname']),
+                                        timeout=self.timeout)
+        except Exception as e:
+            result.update({'status': 'error', 'failed_checks': [], 'error': str(e)})
+            return result
+        result.update({
+            'full_check': True,
+            'status': check['result_type'],
+            'failed_checks': [f"{r['check']}: {r['message']}" for r in check['validation_results'] if not r['status']]
+        })
+        return result
+    
+    def record(self, endpoint, result):
+        """Store a probe result, log it as a change if the outcome differs, and schedule the next probe"""
+        now = result['checked_at']
+        changed = (endpoint['status'] is None or result['status'] != endpoint['status']
+                   or result['chain_hash'] != endpoint['chain_hash']
+                   or result['failed_checks'] != endpoint['failed_checks'] or result['error'] != endpoint['error'])
+        unchanged_count = 0 if changed else endpoint['unchanged_count'] + 1
+        
+        # Back off for endpoints that keep returning the same result, unless expiry is near
+        backoff = min(self.max_backoff, 2 ** (unchanged_count // self.BACKOFF_AFTER))
+        if result['not_after'] is not None and result['not_after'] - now < MONITOR_EXPIRY_DAYS * 86400:
+            backoff = 1
+        interval = (endpoint['interval'] or self.interval) * backoff
+        next_due = now + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        failed_checks = json.dumps(result['failed_checks'])
+        
+        conn = self._connection()
+        conn.execute(
+            'UPDATE endpoints SET next_due = ?, last_checked = ?, last_full_check = COALESCE(?, last_full_check), '
+            'status = ?, chain_hash = ?, fingerprint = ?, subject = ?, issuer = ?, not_after = ?, failed_checks = ?, '
+            'error = ?, unchanged_count = ? WHERE id = ?',
+            (next_due, now, now if result['full_check'] else None, result['status'], result['chain_hash'],
+             result['fingerprint'], result['subject'], result['issuer'], result['not_after'], failed_checks,
+             result['error'], unchanged_count, endpoint['id'])
+        )
+        if changed:
+            conn.execute(
+                'INSERT INTO endpoint_changes (endpoint_id, checked_at, status, fingerprint, not_after, failed_checks, error) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (endpoint['id'], now, result['status'], result['fingerprint'], result['not_after'], failed_checks,
+                 result['error'])
+            )
+            conn.execute(
+                'DELETE FROM endpoint_changes WHERE endpoint_id = ? AND rowid NOT IN ('
+                'SELECT rowid FROM endpoint_changes WHERE endpoint_id = ? ORDER BY checked_at DESC LIMIT ?)',
+                (endpoint['id'], endpoint['id'], MONITOR_HISTORY)
+            )
         
-        import json
-        with open(output_path, 'w') as f:
-            json.dump(report, f, indent=2, default=str)
+        with self._lock:
+            self.probes += 1
+            self.full_checks += result['full_check']
+            self.changes += changed
+            self.errors += result['status'] == 'error'
+            self._recent.append(time.monotonic())
+    
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            while self._recent and self._recent[0] < time.monotonic() - 60:
+                self._recent.popleft()
+            stats = {
+                'enabled': self.enabled,
+                'leader': self.leader,
+                'in_flight': self._in_flight,
+                'probes': self.probes,
+                'full_checks': self.full_checks,
+                'changes': self.changes,
+                'errors': self.errors,
+                'probes_last_minute': len(self._recent)
+            }
+        try:
+            conn = self._connection()
+            endpoints, due = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(enabled = 1 AND next_due <= ?), 0) FROM endpoints', (now,)
+            ).fetchone()
+            stats.update({
+                'endpoints': endpoints,
+                'due': due,
+                'by_status': dict(conn.execute(
+                    "SELECT COALESCE(status, 'pending'), COUNT(*) FROM endpoints GROUP BY status").fetchall()),
+                'expiring': conn.execute('SELECT COUNT(*) FROM endpoints WHERE not_after < ?',
+                                         (now + MONITOR_EXPIRY_DAYS * 86400,)).fetchone()[0]
+            })
+        except sqlite3.Error as e:
+            stats['error'] = str(e)
+        return stats
+
+monitor = MonitorScheduler(enabled=MONITOR_ENABLED)
+
+def run_chain_bundle(name, data, include_root, check_revocation):
+    """Process pool entry point for one batch bundle"""
+    try:
+        return CertificateValidator().analyze_chain_bundle(name, data, include_root, check_revocation)
+    finally:
+        # Pool workers exit without running atexit handlers
+        inventory.flush()
+
+# Batch bundles are parsed and checked in worker processes. They come from a
+# fork server that has imported this module once, so each worker starts with the
+# trust store loaded without forking the threaded gunicorn worker itself.
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+def get_batch_executor():
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _batch_executor = concurrent.futures.ProcessPoolExecutor(max_workers=max(1, BATCH_WORKERS),
+                                                                      mp_context=context)
+        return _batch_executor
+
+def discard_batch_executor(executor):
+    """Drop a pool whose worker died so the next batch starts a fresh one"""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is executor:
+            _batch_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def iter_chain_batch(bundles, include_root=False, check_revocation=True):
+    """Check (name, data) bundles in the process pool, yielding each row as it finishes
+    
+    The last record is a summary with links to a zip of the corrected chains
+    and the full JSON results.
+    """
+    result_id = artifact_store.new_result_id()
+    started = time.monotonic()
+    executor = get_batch_executor()
+    futures = {executor.submit(run_chain_bundle, name, data, include_root, check_revocation): name
+               for name, data in bundles}
+    counts = {}
+    rows = []
+    fixed_chains = []
+    yield {'type': 'start', 'bundles': len(bundles)}
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                if isinstance(e, concurrent.futures.BrokenExecutor):
+                    discard_batch_executor(executor)
+                row = {'name': futures[future], 'status': 'error', 'certificates': 0, 'failed_checks': [],
+                       'validation_results': [], 'error': f"Bundle analysis failed: {e}", 'fixed_chain': None}
+            
+            fixed_chain = row.pop('fixed_chain', None)
+            if fixed_chain:
+                fixed_chains.append((row['name'], fixed_chain))
+            row['fixed'] = bool(fixed_chain)
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+            rows.append(row)
+            yield dict(row, type='bundle')
+    finally:
+        for future in futures:
+            future.cancel()
+    
+    summary = {
+        'type': 'summary',
+        'result_id': result_id,
+        'bundles': len(bundles),
+        'counts': counts,
+        'fixed': len(fixed_chains),
+        'elapsed_seconds': round(time.monotonic() - started, 2),
+        'workers': max(1, BATCH_WORKERS)
+    }
+    file_types = ['batch_json']
+    if fixed_chains:
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, pem in sorted(fixed_chains):
+                zf.writestr(name, pem)
+        artifact_store.put(result_id, 'fixed_chains', archive.getvalue())
+        file_types.append('fixed_chains')
+    artifact_store.put(result_id, 'batch_json', json.dumps({
+        'timestamp': datetime.datetime.utcnow().isoformat(),
+        'summary': summary,
+        'results': sorted(rows, key=lambda row: row['name'])
+    }, indent=2, default=str).encode())
+    summary['downloads'] = artifact_links(result_id, *file_types)
+    yield summary
+
+def iter_bulk_scan(targets, invalid, check_hostname=True, deadline=BULK_STREAM_DEADLINE):
+    """Scan targets, yielding each host's row as it completes and then a summary with the report links"""
+    validator = CertificateValidator()
+    result_id = artifact_store.new_result_id()
+    started = time.monotonic()
+    counts = {}
+    rows = {}
+    yield {'type': 'start', 'targets': len(targets), 'invalid_entries': invalid}
+    for row in validator.iter_scan_urls(targets, check_hostname=check_hostname, deadline=deadline):
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+        rows[(row['hostname'], row['port'])] = row
+        yield dict(row, type='host')
+    
+    summary = {
+        'targets': len(targets),
+        'invalid_entries': invalid,
+        'counts': counts,
+        'elapsed_seconds': round(time.monotonic() - started, 2),
+        'workers': min(BULK_MAX_WORKERS, len(targets))
+    }
+    json_report, csv_report = validator.generate_bulk_reports([rows[target] for target in targets], summary)
+    artifact_store.put(result_id, 'bulk_json', json_report)
+    artifact_store.put(result_id, 'bulk_csv', csv_report)
+    yield dict(summary, type='summary', result_id=result_id,
+               downloads=artifact_links(result_id, 'bulk_csv', 'bulk_json'))
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, default=str) + '\n'
+
+def sse_events(records):
+    for record in records:
+        yield f"event: {record['type']}\ndata: {json.dumps(record, default=str)}\n\n"
+
+def stream_records(records):
+    """Stream records as Server-Sent Events when the client asks for them, otherwise as NDJSON
+    
+    Each record is flushed as soon as it is produced. A failure part way through
+    ends the stream with an 'error' record.
+    """
+    def guarded():
+        try:
+            yield from records
+        except Exception as e:
+            logger.error(f"Streaming error: {str(e)}", exc_info=True)
+            yield {'type': 'error', 'error': str(e)}
+    
+    if request.accept_mimetypes.best_match(['application/x-ndjson', 'text/event-stream']) == 'text/event-stream':
+        body, mimetype = sse_events(guarded()), 'text/event-stream'
+    else:
+        body, mimetype = ndjson_lines(guarded()), 'application/x-ndjson'
+    response = app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep reverse proxies from buffering the stream
+    return response
+
+# Downloadable artifacts: file_type -> (download name, MIME type)
+DOWNLOADS = {
+    'chain': ('certificate_chain.pem', 'application/x-pem-file'),
+    'fixed_chain': ('certificate_chain_fixed.pem', 'application/x-pem-file'),
+    'report': ('certificate_report.pdf', 'application/pdf'),
+    'json': ('certificate_report.json', 'application/json'),
+    'bulk_json': ('bulk_scan_report.json', 'application/json'),
+    'bulk_csv': ('bulk_scan_report.csv', 'text/csv'),
+    'fixed_chains': ('certificate_chains_fixed.zip', 'application/zip'),
+    'batch_json': ('chain_batch_report.json', 'application/json')
+}
+
+# Reports rendered on demand from the stored result record: file_type -> format
+LAZY_REPORTS = {'report': 'pdf', 'json': 'json'}
+
+def artifact_links(result_id, *file_types):
+    return {file_type: url_for('download_file', result_id=result_id, file_type=file_type) for file_type in file_types}
+
+def save_result(result, result_type, result_id=None, *file_types):
+    """Keep the result for index() server-side; the session only carries its ID"""
+    result_id = result_id or artifact_store.new_result_id()
+    artifact_store.put(result_id, 'result', json.dumps({
+        'result': result,
+        'result_type': result_type,
+        'download_links': artifact_links(result_id, *file_types)
+    }).encode())
+    session['result_id'] = result_id
+
+def load_result():
+    """The result saved by the last validation of this session, removed from the session"""
+    result_id = session.pop('result_id', None)
+    stored = artifact_store.read(result_id, 'result') if result_id else None
+    return json.loads(stored) if stored else {}
 
 @app.route('/')
 def index():
-    result = session.pop('result', None)
-    result_type = session.pop('result_type', None)
-    download_links = session.pop('download_links', None)
+    saved = load_result()
     active_tab = session.pop('active_tab', None)
     return render_template_string(HTML_TEMPLATE, 
-                                result=result, 
-                                result_type=result_type,
-                                download_links=download_links,
+                                result=saved.get('result'), 
+                                result_type=saved.get('result_type'),
+                                download_links=saved.get('download_links'),
                                 active_tab=active_tab)
 
 @app.route('/validate/cert-key', methods=['POST'])
@@ -1441,96 +5456,20 @@ def validate_cert_key():
         try:
             private_key = validator.load_private_key(key_data, key_password)
         except Exception as e:
-            session['result'] = f"Private key error: {str(e)}"
-            session['result_type'] = 'error'
+            save_result(f"Private key error: {str(e)}", 'error')
             session['active_tab'] = 'cert-key'
             return redirect(url_for('index'))
         
-        # Extract certificate information
-        cert_info = validator.extract_certificate_info(cert)
-        
-        # Build certificate chain
-        if verify_chain:
-            chain = validator.build_certificate_chain(cert)
-        else:
-            chain = [cert]
-        
-        # Create chain PEM
-        chain_pem = b''
-        for cert_in_chain in chain:
-            chain_pem += cert_in_chain.public_bytes(serialization.Encoding.PEM)
-        
-        # Validate certificate/key pair
-        validation_results = []
-        
-        # Check if certificate and key match
-        cert_path = validator.create_temp_file(chain_pem, '.pem')
-        key_path = validator.create_temp_file(key_data, '.key')
-        
-        try:
-            ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-            ssl_ctx.load_cert_chain(certfile=cert_path, keyfile=key_path, 
-                                  password=key_password.decode() if key_password else None)
-            validation_results.append({
-                'check': 'Certificate/Key Match',
-                'status': True,
-                'message': 'Certificate and private key match'
-            })
-        except Exception as e:
-            validation_results.append({
-                'check': 'Certificate/Key Match',
-                'status': False,
-                'message': str(e)
-            })
-            session['result'] = f"Certificate/key validation failed: {str(e)}"
-            session['result_type'] = 'error'
+        # Run the certificate/key checks
+        check = validator.check_cert_key(cert, private_key, domain=domain, verify_chain=verify_chain)
+        if not check['key_match']:
+            save_result(f"Certificate/key validation failed: {check['validation_results'][0]['message']}", 'error')
             session['active_tab'] = 'cert-key'
             return redirect(url_for('index'))
-        
-        # Check certificate validity period
-        now = datetime.datetime.utcnow()
-        if now < cert_info['not_before']:
-            validation_results.append({
-                'check': 'Validity Period',
-                'status': False,
-                'message': f"Certificate not yet valid (starts {cert_info['not_before']})"
-            })
-        elif now > cert_info['not_after']:
-            validation_results.append({
-                'check': 'Validity Period',
-                'status': False,
-                'message': f"Certificate has expired ({cert_info['not_after']})"
-            })
-        else:
-            days_until_expiry = (cert_info['not_after'] - now).days
-            validation_results.append({
-                'check': 'Validity Period',
-                'status': True,
-                'message': f"Certificate is valid ({days_until_expiry} days until expiry)"
-            })
-        
-        # Check domain match
-        if domain:
-            domain_match, domain_message = validator.verify_domain_match(cert, domain)
-            validation_results.append({
-                'check': 'Domain Verification',
-                'status': domain_match,
-                'message': domain_message
-            })
-        
-        # Check certificate chain
-        if verify_chain and len(chain) > 1:
-            validation_results.append({
-                'check': 'Certificate Chain',
-                'status': True,
-                'message': f"Complete chain built ({len(chain)} certificates)"
-            })
-        elif verify_chain:
-            validation_results.append({
-                'check': 'Certificate Chain',
-                'status': False,
-                'message': "Could not build complete certificate chain"
-            })
+        cert_info = check['cert_info']
+        chain = check['chain']
+        validation_results = check['validation_results']
+        result_type = check['result_type']
         
         # Prepare result summary
         result_lines = ["Certificate Validation Report\n" + "="*40 + "\n"]
@@ -1548,48 +5487,24 @@ def validate_cert_key():
         result_lines.append("")
         
         # Validation results
-        result_lines.append("Validation Results:")
-        for result in validation_results:
-            status = "✅" if result['status'] else "❌"
-            result_lines.append(f"{status} {result['check']}: {result['message']}")
-        
-        # Determine overall result type
-        if all(r['status'] for r in validation_results):
-            result_type = 'success'
-        elif any(not r['status'] for r in validation_results):
-            result_type = 'warning' if any(r['status'] for r in validation_results) else 'error'
-        
-        # Save files for download
-        session_id = session.get('_id', 'default')
-        chain_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}chain_{session_id}.pem")
-        with open(chain_path, 'wb') as f:
-            f.write(chain_pem)
-        
-        # Generate reports
-        report_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}report_{session_id}.pdf")
-        chain_info = [validator.extract_certificate_info(c) for c in chain]
-        validator.generate_pdf_report(cert_info, chain_info, validation_results, report_path)
+        result_lines.append("Validation Results:")
+        for result in validation_results:
+            status = "✅" if result['status'] else "❌"
+            result_lines.append(f"{status} {result['check']}: {result['message']}")
         
-        json_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}report_{session_id}.json")
-        validator.generate_json_report(cert_info, chain_info, validation_results, json_path)
+        # Save files for download; reports are rendered from the record on first download
+        result_id = artifact_store.new_result_id()
+        artifact_store.put(result_id, 'chain', validator.chain_to_pem(chain))
+        artifact_store.put(result_id, 'record', validator.result_record(chain, validation_results))
         
-        # Set session data
-        session['result'] = '\n'.join(result_lines)
-        session['result_type'] = result_type
-        session['download_links'] = {
-            'chain': url_for('download_file', file_type='chain'),
-            'report': url_for('download_file', file_type='report'),
-            'json': url_for('download_file', file_type='json')
-        }
+        # Save the result for index()
+        save_result('\n'.join(result_lines), result_type, result_id, 'chain', 'report', 'json')
         session['active_tab'] = 'cert-key'
-        
+    
     except Exception as e:
         logger.error(f"Validation error: {str(e)}", exc_info=True)
-        session['result'] = f"Validation error: {str(e)}"
-        session['result_type'] = 'error'
+        save_result(f"Validation error: {str(e)}", 'error')
         session['active_tab'] = 'cert-key'
-    finally:
-        validator.cleanup()
     
     return redirect(url_for('index'))
 
@@ -1625,71 +5540,13 @@ def validate_url():
         else:
             port = 443  # Default HTTPS port
         
-        # Fetch certificate from URL
-        cert, chain, hostname = validator.get_url_certificate(url, port)
-        
-        # Extract certificate information
-        cert_info = validator.extract_certificate_info(cert)
-        
-        # If no chain was provided by server, try to build it
-        if not chain or len(chain) == 1:
-            chain = validator.build_certificate_chain(cert)
-        
-        # Validation results
-        validation_results = []
-        
-        # Check certificate validity period
-        now = datetime.datetime.utcnow()
-        if now < cert_info['not_before']:
-            validation_results.append({
-                'check': 'Validity Period',
-                'status': False,
-                'message': f"Certificate not yet valid (starts {cert_info['not_before']})"
-            })
-        elif now > cert_info['not_after']:
-            validation_results.append({
-                'check': 'Validity Period',
-                'status': False,
-                'message': f"Certificate has expired ({cert_info['not_after']})"
-            })
-        else:
-            days_until_expiry = (cert_info['not_after'] - now).days
-            validation_results.append({
-                'check': 'Validity Period',
-                'status': True,
-                'message': f"Certificate is valid ({days_until_expiry} days until expiry)"
-            })
-        
-        # Check hostname match
-        if check_hostname:
-            domain_match, domain_message = validator.verify_domain_match(cert, hostname)
-            validation_results.append({
-                'check': 'Hostname Verification',
-                'status': domain_match,
-                'message': domain_message
-            })
-        
-        # Check certificate chain
-        if len(chain) > 1:
-            validation_results.append({
-                'check': 'Certificate Chain',
-                'status': True,
-                'message': f"Certificate chain contains {len(chain)} certificates"
-            })
-            
-            # Verify chain order
-            is_correct, _, order_message = validator.verify_certificate_chain_order(chain)
-            validation_results.append({
-                'check': 'Chain Order',
-                'status': is_correct,
-                'message': order_message if is_correct else "Chain may not be in correct order"
-            })
-        else:
-            validation_results.append({
-                'check': 'Certificate Chain',
-                'status': False,
-                'message': "Only single certificate found (no chain)"
-            })
+        # Fetch certificate from URL and run the checks
+        check = validator.check_url(url, port, check_hostname=check_hostname)
+        hostname = check['hostname']
+        cert_info = check['cert_info']
+        chain = check['chain']
+        validation_results = check['validation_results']
+        result_type = check['result_type']
         
         # Prepare result summary
         result_lines = [f"Certificate Report for {hostname}:{port}\n" + "="*40 + "\n"]
@@ -1712,48 +5569,19 @@ def validate_url():
             status = "✅" if result['status'] else "❌"
             result_lines.append(f"{status} {result['check']}: {result['message']}")
         
-        # Determine overall result type
-        if all(r['status'] for r in validation_results):
-            result_type = 'success'
-        elif any(not r['status'] for r in validation_results):
-            result_type = 'warning' if any(r['status'] for r in validation_results) else 'error'
+        # Save files for download; reports are rendered from the record on first download
+        result_id = artifact_store.new_result_id()
+        artifact_store.put(result_id, 'chain', validator.chain_to_pem(chain))
+        artifact_store.put(result_id, 'record', validator.result_record(chain, validation_results))
         
-        # Create chain PEM
-        chain_pem = b''
-        for cert_in_chain in chain:
-            chain_pem += cert_in_chain.public_bytes(serialization.Encoding.PEM)
-        
-        # Save files for download
-        session_id = session.get('_id', 'default')
-        chain_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}chain_{session_id}.pem")
-        with open(chain_path, 'wb') as f:
-            f.write(chain_pem)
-        
-        # Generate reports
-        report_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}report_{session_id}.pdf")
-        chain_info = [validator.extract_certificate_info(c) for c in chain]
-        validator.generate_pdf_report(cert_info, chain_info, validation_results, report_path)
-        
-        json_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}report_{session_id}.json")
-        validator.generate_json_report(cert_info, chain_info, validation_results, json_path)
-        
-        # Set session data
-        session['result'] = '\n'.join(result_lines)
-        session['result_type'] = result_type
-        session['download_links'] = {
-            'chain': url_for('download_file', file_type='chain'),
-            'report': url_for('download_file', file_type='report'),
-            'json': url_for('download_file', file_type='json')
-        }
+        # Save the result for index()
+        save_result('\n'.join(result_lines), result_type, result_id, 'chain', 'report', 'json')
         session['active_tab'] = 'url-check'
-        
+    
     except Exception as e:
         logger.error(f"URL validation error: {str(e)}", exc_info=True)
-        session['result'] = f"Error fetching certificate: {str(e)}"
-        session['result_type'] = 'error'
+        save_result(f"Error fetching certificate: {str(e)}", 'error')
         session['active_tab'] = 'url-check'
-    finally:
-        validator.cleanup()
     
     return redirect(url_for('index'))
 
@@ -1791,65 +5619,17 @@ def validate_chain_only():
         certificates = validator.load_certificate_chain(chain_data)
         
         if not certificates:
-            session['result'] = "No valid certificates found in the uploaded file"
-            session['result_type'] = 'error'
+            save_result("No valid certificates found in the uploaded file", 'error')
             session['active_tab'] = 'chain-only'
             return redirect(url_for('index'))
         
-        # Extract info for all certificates
-        certs_info = [validator.extract_certificate_info(cert) for cert in certificates]
-        
-        # Verify chain order
-        is_correct_order, correct_chain, order_message = validator.verify_certificate_chain_order(certificates)
-        
-        # Validation results
-        validation_results = []
-        
-        # Check number of certificates
-        validation_results.append({
-            'check': 'Certificate Count',
-            'status': True,
-            'message': f"Found {len(certificates)} certificate(s) in the chain"
-        })
-        
-        # Check chain order
-        validation_results.append({
-            'check': 'Chain Order',
-            'status': is_correct_order,
-            'message': order_message if is_correct_order else "Chain is NOT in correct order (should be: server → intermediate → root)"
-        })
-        
-        # Check each certificate validity
-        now = datetime.datetime.utcnow()
-        for i, cert_info in enumerate(certs_info):
-            cert_name = cert_info['subject'].get('commonName', f'Certificate {i+1}')
-            if now > cert_info['not_after']:
-                validation_results.append({
-                    'check': f'Certificate Validity [{i+1}]',
-                    'status': False,
-                    'message': f"{cert_name} has expired ({cert_info['not_after']})"
-                })
-            elif now < cert_info['not_before']:
-                validation_results.append({
-                    'check': f'Certificate Validity [{i+1}]',
-                    'status': False,
-                    'message': f"{cert_name} is not yet valid (starts {cert_info['not_before']})"
-                })
-            else:
-                days_until_expiry = (cert_info['not_after'] - now).days
-                validation_results.append({
-                    'check': f'Certificate Validity [{i+1}]',
-                    'status': True,
-                    'message': f"{cert_name} is valid ({days_until_expiry} days until expiry)"
-                })
-        
-        # Check if chain is complete (has root)
-        has_root = any(cert.subject == cert.issuer for cert in certificates)
-        validation_results.append({
-            'check': 'Chain Completeness',
-            'status': has_root,
-            'message': "Chain includes root certificate" if has_root else "Chain does not include root certificate (may need to be fetched)"
-        })
+        # Run the chain checks
+        check = validator.check_chain(certificates)
+        certs_info = check['certs_info']
+        is_correct_order = check['is_correct_order']
+        correct_chain = check['correct_chain']
+        validation_results = check['validation_results']
+        result_type = check['result_type']
         
         # Prepare result summary
         result_lines = ["Certificate Chain Analysis\n" + "="*40 + "\n"]
@@ -1877,101 +5657,699 @@ def validate_chain_only():
             status = "✅" if result['status'] else "❌"
             result_lines.append(f"{status} {result['check']}: {result['message']}")
         
-        # Determine overall result type
-        if all(r['status'] for r in validation_results):
-            result_type = 'success'
-        elif is_correct_order:
-            result_type = 'warning'
-        else:
-            result_type = 'error'
-        
-        # Save original chain
-        session_id = session.get('_id', 'default')
-        chain_pem = b''
-        for cert in certificates:
-            chain_pem += cert.public_bytes(serialization.Encoding.PEM)
-        
-        chain_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}chain_{session_id}.pem")
-        with open(chain_path, 'wb') as f:
-            f.write(chain_pem)
-        
-        # Prepare download links
-        download_links = {
-            'chain': url_for('download_file', file_type='chain'),
-            'report': url_for('download_file', file_type='report'),
-            'json': url_for('download_file', file_type='json')
-        }
+        # Save original chain; reports are rendered from the record on first download
+        result_id = artifact_store.new_result_id()
+        artifact_store.put(result_id, 'chain', validator.chain_to_pem(certificates))
+        artifact_store.put(result_id, 'record', validator.result_record(certificates, validation_results))
+        file_types = ['chain', 'report', 'json']
         
         # Save fixed chain if order was incorrect
         if not is_correct_order:
-            fixed_chain_pem = b''
-            # Filter out root if not wanted
-            output_chain = correct_chain
-            if not include_root:
-                output_chain = [cert for cert in correct_chain if cert.subject != cert.issuer]
-            
-            for cert in output_chain:
-                fixed_chain_pem += cert.public_bytes(serialization.Encoding.PEM)
-            
-            fixed_chain_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}fixed_chain_{session_id}.pem")
-            with open(fixed_chain_path, 'wb') as f:
-                f.write(fixed_chain_pem)
-            
-            download_links['fixed_chain'] = url_for('download_file', file_type='fixed_chain')
+            artifact_store.put(result_id, 'fixed_chain',
+                               validator.chain_to_pem(validator.fixed_chain(correct_chain, include_root)))
+            file_types.append('fixed_chain')
             result_lines.append(f"\n⚠️ Chain order needs fixing. Download the corrected chain below.")
         
-        # Generate reports
-        report_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}report_{session_id}.pdf")
-        chain_info = [validator.extract_certificate_info(c) for c in certificates]
-        validator.generate_pdf_report(certs_info[0] if certs_info else {}, chain_info, validation_results, report_path)
-        
-        json_path = os.path.join(TEMP_DIR, f"{TEMP_FILE_PREFIX}report_{session_id}.json")
-        validator.generate_json_report(certs_info[0] if certs_info else {}, chain_info, validation_results, json_path)
-        
-        # Set session data
-        session['result'] = '\n'.join(result_lines)
-        session['result_type'] = result_type
-        session['download_links'] = download_links
+        # Save the result for index()
+        save_result('\n'.join(result_lines), result_type, result_id, *file_types)
         session['active_tab'] = 'chain-only'
-        
+    
     except Exception as e:
         logger.error(f"Chain validation error: {str(e)}", exc_info=True)
-        session['result'] = f"Chain validation error: {str(e)}"
-        session['result_type'] = 'error'
+        save_result(f"Chain validation error: {str(e)}", 'error')
         session['active_tab'] = 'chain-only'
-    finally:
-        validator.cleanup()
     
     return redirect(url_for('index'))
 
-@app.route('/download/<file_type>')
-def download_file(file_type):
-    session_id = session.get('_id', 'default')
-    file_map = {
-        'chain': (f"{TEMP_FILE_PREFIX}chain_{session_id}.pem", "certificate_chain.pem"),
-        'fixed_chain': (f"{TEMP_FILE_PREFIX}fixed_chain_{session_id}.pem", "certificate_chain_fixed.pem"),
-        'report': (f"{TEMP_FILE_PREFIX}report_{session_id}.pdf", "certificate_report.pdf"),
-        'json': (f"{TEMP_FILE_PREFIX}report_{session_id}.json", "certificate_report.json")
+@app.route('/validate/bulk', methods=['POST'])
+def validate_bulk():
+    """Scan many host[:port] entries concurrently"""
+    validator = CertificateValidator()
+    
+    try:
+        # Targets come from the textarea and/or an uploaded list
+        targets_text = request.form.get('targets', '')
+        targets_file = request.files.get('targets_file')
+        if targets_file and targets_file.filename:
+            file_data = targets_file.read()
+            if len(file_data) > MAX_FILE_SIZE:
+                flash('File size exceeds maximum allowed (5MB).', 'error')
+                session['active_tab'] = 'bulk-scan'
+                return redirect(url_for('index'))
+            targets_text += '\n' + file_data.decode('utf-8', errors='replace')
+        check_hostname = request.form.get('check_hostname', 'on') == 'on'
+        
+        targets, invalid = validator.parse_scan_targets(targets_text)
+        
+        if not targets:
+            flash('Please enter at least one host to scan.', 'error')
+            session['active_tab'] = 'bulk-scan'
+            return redirect(url_for('index'))
+        
+        if len(targets) > BULK_MAX_TARGETS:
+            flash(f'Too many hosts ({len(targets)}). The maximum per scan is {BULK_MAX_TARGETS}.', 'error')
+            session['active_tab'] = 'bulk-scan'
+            return redirect(url_for('index'))
+        
+        started = time.monotonic()
+        scan_results = validator.scan_urls(targets, check_hostname=check_hostname)
+        elapsed = time.monotonic() - started
+        
+        counts = {}
+        for row in scan_results:
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        
+        summary = {
+            'targets': len(targets),
+            'invalid_entries': invalid,
+            'counts': counts,
+            'elapsed_seconds': round(elapsed, 2),
+            'workers': min(BULK_MAX_WORKERS, len(targets))
+        }
+        
+        # Prepare result summary (full details are in the downloadable reports)
+        result_lines = ["Bulk Certificate Scan\n" + "="*40 + "\n"]
+        result_lines.append(f"Hosts scanned: {len(targets)} in {elapsed:.1f}s "
+                            f"({len(targets) / elapsed if elapsed else 0:.1f} hosts/s, {summary['workers']} workers)")
+        for status in ('success', 'warning', 'error', 'timeout'):
+            if counts.get(status):
+                result_lines.append(f"  {status.capitalize()}: {counts[status]}")
+        if invalid:
+            result_lines.append(f"Skipped {len(invalid)} invalid entr{'y' if len(invalid) == 1 else 'ies'}: {', '.join(invalid[:5])}")
+        
+        problems = [row for row in scan_results if row['status'] != 'success']
+        if problems:
+            result_lines.append("\nHosts needing attention:")
+            for row in problems[:25]:
+                detail = row['error'] or '; '.join(row.get('failed_checks', []))
+                status = "⚠️" if row['status'] == 'warning' else "❌"
+                result_lines.append(f"{status} {row['target']}: {detail}")
+            if len(problems) > 25:
+                result_lines.append(f"      ... and {len(problems) - 25} more (see the downloadable report)")
+        
+        if counts.get('success') == len(targets):
+            result_type = 'success'
+        elif counts.get('success'):
+            result_type = 'warning'
+        else:
+            result_type = 'error'
+        
+        # Save aggregated reports for download
+        result_id = artifact_store.new_result_id()
+        json_report, csv_report = validator.generate_bulk_reports(scan_results, summary)
+        artifact_store.put(result_id, 'bulk_json', json_report)
+        artifact_store.put(result_id, 'bulk_csv', csv_report)
+        
+        # Save the result for index()
+        save_result('\n'.join(result_lines), result_type, result_id, 'bulk_csv', 'bulk_json')
+        session['active_tab'] = 'bulk-scan'
+    
+    except Exception as e:
+        logger.error(f"Bulk scan error: {str(e)}", exc_info=True)
+        save_result(f"Bulk scan error: {str(e)}", 'error')
+        session['active_tab'] = 'bulk-scan'
+    
+    return redirect(url_for('index'))
+
+API_REPORTS = ('json', 'pdf', 'chain', 'fixed_chain')
+
+def api_params():
+    """Request options from a JSON body or from form fields"""
+    if request.is_json:
+        return request.get_json(silent=True) or {}
+    return request.form.to_dict()
+
+def api_flag(params, name, default):
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+def api_upload(params, name):
+    """Uploaded file contents, or PEM text passed as a JSON/form field"""
+    upload = request.files.get(name)
+    if upload is not None and upload.filename:
+        data = upload.read()
+    elif params.get(name):
+        data = params[name].encode()
+    else:
+        raise ValueError(f"'{name}' is required")
+    if len(data) > MAX_FILE_SIZE:
+        raise ValueError(f"'{name}' exceeds the maximum allowed size (5MB)")
+    return data
+
+def api_requested_reports(params):
+    requested = params.get('reports') or []
+    if isinstance(requested, str):
+        requested = [r.strip() for r in requested.split(',') if r.strip()]
+    unknown = [r for r in requested if r not in API_REPORTS]
+    if unknown:
+        raise ValueError(f"Unknown report type(s): {', '.join(unknown)}")
+    return set(requested)
+
+def api_response(payload, status=200):
+    # default=str renders datetimes exactly like the downloadable JSON report
+    return app.response_class(json.dumps(payload, default=str), status=status, mimetype='application/json')
+
+def api_error(message, status=400):
+    return api_response({'error': message}, status)
+
+def api_result(validator, cert_info, chain, validation_results, result_type, reports, result_id=None, **extra):
+    """Structured API response; reports are only rendered when requested
+    
+    With a result_id the chain and report record are also kept in the artifact
+    store and the response links to their downloads.
+    """
+    chain_info = [validator.extract_certificate_info(c) for c in chain]
+    payload = {
+        'result_type': result_type,
+        'certificate': cert_info.to_dict() if isinstance(cert_info, CertificateInfo) else cert_info,
+        'chain': [info.to_dict() for info in chain_info],
+        'validation_results': validation_results
     }
+    payload.update(extra)
+    
+    if result_id is not None:
+        artifact_store.put(result_id, 'chain', validator.chain_to_pem(chain))
+        artifact_store.put(result_id, 'record', validator.result_record(chain, validation_results))
+        payload['result_id'] = result_id
+        payload['downloads'] = artifact_links(result_id, 'chain', 'report', 'json')
+    
+    if reports:
+        payload['reports'] = {}
+    if 'json' in reports:
+        payload['reports']['json'] = validator.build_json_report(cert_info, chain_info, validation_results)
+    if 'pdf' in reports:
+        pdf = validator.generate_pdf_report(cert_info, chain_info, validation_results)
+        payload['reports']['pdf'] = base64.b64encode(pdf).decode('ascii')
+    if 'chain' in reports:
+        payload['reports']['chain'] = validator.chain_to_pem(chain).decode('ascii')
+    return payload
+
+def api_url_params(params):
+    """(url, port, check_hostname) from URL validation parameters"""
+    url = str(params.get('url', '')).strip()
+    if not url:
+        raise ValueError("'url' is required")
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    try:
+        port = int(params.get('port') or 443)
+    except (TypeError, ValueError):
+        port = 0
+    if port < 1 or port > 65535:
+        raise ValueError("'port' must be a number between 1 and 65535")
+    return url, port, api_flag(params, 'check_hostname', True)
+
+def run_url_validation(validator, params, read_input, result_id=None):
+    """(payload, HTTP status) for the certificate served at a URL"""
+    reports = api_requested_reports(params)
+    url, port, check_hostname = api_url_params(params)
+    try:
+        check = validator.check_url(url, port, check_hostname=check_hostname)
+    except ValueError as e:
+        # The request was fine; the remote server could not be reached or handshaken with
+        return {'error': str(e)}, 502
+    return api_result(
+        validator, check['cert_info'], check['chain'], check['validation_results'], check['result_type'], reports,
+        result_id, hostname=check['hostname'], port=port, server_chain_length=check['server_chain_length']
+    ), 200
+
+def run_cert_key_validation(validator, params, read_input, result_id=None):
+    """(payload, HTTP status) for a certificate and private key pair"""
+    reports = api_requested_reports(params)
+    cert = validator.load_certificate(read_input('cert'))
+    key_password = str(params.get('key_password') or '').encode() or None
+    try:
+        private_key = validator.load_private_key(read_input('key'), key_password)
+    except Exception as e:
+        raise ValueError(f"Private key error: {str(e)}")
+    
+    check = validator.check_cert_key(cert, private_key, domain=str(params.get('domain') or '').strip(),
+                                     verify_chain=api_flag(params, 'verify_chain', True))
+    return api_result(
+        validator, check['cert_info'], check['chain'], check['validation_results'], check['result_type'], reports,
+        result_id, key_match=check['key_match']
+    ), 200
+
+def run_chain_validation(validator, params, read_input, result_id=None):
+    """(payload, HTTP status) for a certificate chain's order and completeness"""
+    reports = api_requested_reports(params)
+    certificates = validator.load_certificate_chain(read_input('chain'))
+    if not certificates:
+        raise ValueError("No valid certificates found in the uploaded chain")
+    
+    check = validator.check_chain(certificates)
+    fixed_chain = validator.fixed_chain(check['correct_chain'], api_flag(params, 'include_root', False))
+    payload = api_result(
+        validator, check['certs_info'][0], certificates, check['validation_results'], check['result_type'], reports,
+        result_id,
+        correct_order=check['is_correct_order'],
+        corrected_order=[cert.subject.rfc4514_string() for cert in check['correct_chain']],
+        parse_errors=[{'offset': offset, 'error': error} for offset, error in validator.parse_errors]
+    )
+    if 'fixed_chain' in reports:
+        payload['reports']['fixed_chain'] = validator.chain_to_pem(fixed_chain).decode('ascii')
+    if result_id is not None and not check['is_correct_order']:
+        artifact_store.put(result_id, 'fixed_chain', validator.chain_to_pem(fixed_chain))
+        payload['downloads'].update(artifact_links(result_id, 'fixed_chain'))
+    return payload, 200
+
+@app.route('/api/v1/validate/url', methods=['POST'])
+def api_validate_url():
+    """Validate the certificate served at a URL and return the result as JSON"""
+    validator = CertificateValidator()
+    
+    try:
+        params = api_params()
+        return api_response(*run_url_validation(validator, params, lambda name: api_upload(params, name)))
+    except ValueError as e:
+        return api_error(str(e))
+    except Exception as e:
+        logger.error(f"API URL validation error: {str(e)}", exc_info=True)
+        return api_error("Internal error during validation", 500)
+
+@app.route('/api/v1/validate/cert-key', methods=['POST'])
+def api_validate_cert_key():
+    """Validate a certificate and private key pair and return the result as JSON"""
+    validator = CertificateValidator()
+    
+    try:
+        params = api_params()
+        return api_response(*run_cert_key_validation(validator, params, lambda name: api_upload(params, name)))
+    except ValueError as e:
+        return api_error(str(e))
+    except Exception as e:
+        logger.error(f"API certificate/key validation error: {str(e)}", exc_info=True)
+        return api_error("Internal error during validation", 500)
+
+@app.route('/api/v1/validate/chain', methods=['POST'])
+def api_validate_chain():
+    """Validate a certificate chain's order and completeness and return the result as JSON"""
+    validator = CertificateValidator()
+    
+    try:
+        params = api_params()
+        return api_response(*run_chain_validation(validator, params, lambda name: api_upload(params, name)))
+    except ValueError as e:
+        return api_error(str(e))
+    except Exception as e:
+        logger.error(f"API chain validation error: {str(e)}", exc_info=True)
+        return api_error("Internal error during validation", 500)
+
+def api_chain_bundles(validator, params):
+    """(bundles, include_root, check_revocation) from an uploaded archive and/or chain files"""
+    uploads = [(upload.filename, upload.read())
+               for field in ('archive', 'chain_files') for upload in request.files.getlist(field)
+               if upload.filename]
+    if not uploads:
+        raise ValueError("Upload an 'archive' (zip or tar) or one or more 'chain_files'")
+    bundles = validator.read_chain_bundles(uploads)
+    if not bundles:
+        raise ValueError("No certificate chain files found in the upload")
+    return bundles, api_flag(params, 'include_root', False), api_flag(params, 'revocation', True)
+
+def api_bulk_targets(validator, params, max_targets=BULK_MAX_TARGETS):
+    """(targets, invalid entries, check_hostname) from the targets field and/or an uploaded host list"""
+    targets_text = params.get('targets') or ''
+    if isinstance(targets_text, list):
+        targets_text = '\n'.join(str(target) for target in targets_text)
+    targets_file = request.files.get('targets_file')
+    if targets_file is not None and targets_file.filename:
+        file_data = targets_file.read()
+        if len(file_data) > MAX_FILE_SIZE:
+            raise ValueError("'targets_file' exceeds the maximum allowed size (5MB)")
+        targets_text += '\n' + file_data.decode('utf-8', errors='replace')
+    
+    targets, invalid = validator.parse_scan_targets(targets_text)
+    if not targets:
+        raise ValueError("'targets' must list at least one host")
+    if len(targets) > max_targets:
+        raise ValueError(f"Too many hosts ({len(targets)}). The maximum per request is {max_targets}.")
+    return targets, invalid, api_flag(params, 'check_hostname', True)
+
+@app.route('/api/v1/validate/chains', methods=['POST'])
+def api_validate_chains():
+    """Validate many chain bundles in the process pool, streaming one NDJSON record per bundle"""
+    validator = CertificateValidator()
+    
+    try:
+        bundles, include_root, check_revocation = api_chain_bundles(validator, api_params())
+    except ValueError as e:
+        return api_error(str(e))
+    
+    return stream_records(iter_chain_batch(bundles, include_root, check_revocation))
+
+@app.route('/api/v1/validate/bulk', methods=['POST'])
+def api_validate_bulk():
+    """Scan many hosts, streaming one record per host as it completes"""
+    validator = CertificateValidator()
+    
+    try:
+        targets, invalid, check_hostname = api_bulk_targets(validator, api_params())
+    except ValueError as e:
+        return api_error(str(e))
+    
+    return stream_records(iter_bulk_scan(targets, invalid, check_hostname))
+
+# Job kinds that run a single validation: kind -> (runner, uploaded inputs)
+JOB_VALIDATIONS = {
+    'url': (run_url_validation, ()),
+    'cert-key': (run_cert_key_validation, ('cert', 'key')),
+    'chain': (run_chain_validation, ('chain',))
+}
+JOB_KINDS = tuple(JOB_VALIDATIONS) + ('chains', 'bulk')
+JOB_PROGRESS_INTERVAL = 0.5  # seconds between progress writes of batch and bulk jobs
+
+def job_view(job):
+    """A job as returned by the API: timestamps in ISO format, parameters left out"""
+    view = {key: value for key, value in job.items() if key != 'params'}
+    for field in ('submitted_at', 'started_at', 'finished_at'):
+        if view[field] is not None:
+            view[field] = datetime.datetime.utcfromtimestamp(view[field]).isoformat()
+    return view
+
+def execute_job(job):
+    """Run a claimed job on a job worker thread and return its result"""
+    params = job['params']
+    inputs = job_queue.inputs(job['id'])
+    
+    # Download links are built as if for a request to the mounted app
+    with app.test_request_context(base_url=f"http://localhost{URL_PREFIX}"):
+        if job['kind'] in JOB_VALIDATIONS:
+            runner, _ = JOB_VALIDATIONS[job['kind']]
+            named_inputs = dict(inputs)
+            
+            def read_input(name):
+                if name not in named_inputs:
+                    raise ValueError(f"'{name}' is required")
+                return named_inputs[name]
+            
+            payload, status = runner(CertificateValidator(), params, read_input, artifact_store.new_result_id())
+            if status >= 400:
+                raise ValueError(payload['error'])
+            return payload
+        
+        if job['kind'] == 'chains':
+            records = iter_chain_batch(inputs, api_flag(params, 'include_root', False), api_flag(params, 'revocation', True))
+        elif job['kind'] == 'bulk':
+            targets, _ = CertificateValidator().parse_scan_targets('\n'.join(params['targets']))
+            records = iter_bulk_scan(targets, params.get('invalid', []), api_flag(params, 'check_hostname', True))
+        else:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        
+        # Keep per-item records out of the job row; the full results are in the downloads
+        progress = {'completed': 0, 'total': 0, 'counts': {}}
+        last_write = 0
+        for record in records:
+            if record['type'] == 'start':
+                progress['total'] = record.get('targets') or record.get('bundles') or 0
+            elif record['type'] in ('host', 'bundle'):
+                progress['completed'] += 1
+                progress['counts'][record['status']] = progress['counts'].get(record['status'], 0) + 1
+            elif record['type'] == 'summary':
+                job_queue.progress(job['id'], progress)
+                return {key: value for key, value in record.items() if key != 'type'}
+            if time.monotonic() - last_write >= JOB_PROGRESS_INTERVAL:
+                last_write = time.monotonic()
+                job_queue.progress(job['id'], progress)
+        raise ValueError("Job ended without a summary")
+
+def iter_job_updates(job_id, interval=0.5, keepalive=15):
+    """Poll a job, yielding a status record whenever it changes and a final result record"""
+    last_state = None
+    last_sent = 0
+    while True:
+        job = job_queue.get(job_id)
+        if job is None:
+            yield {'type': 'error', 'error': "Job no longer exists"}
+            return
+        view = job_view(job)
+        if view['status'] in ('done', 'failed'):
+            yield dict(view, type='result')
+            return
+        state = (view['status'], json.dumps(view['progress']), view.get('queue_position'))
+        if state != last_state or time.monotonic() - last_sent >= keepalive:
+            last_state = state
+            last_sent = time.monotonic()
+            yield dict(view, type='status')
+        time.sleep(interval)
+
+@app.before_request
+def start_job_workers():
+    # Worker threads cannot be started before gunicorn forks (--preload), so each process starts its own
+    job_queue.start(execute_job)
+    monitor.start()
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a validation and return its job ID without waiting for it"""
+    validator = CertificateValidator()
+    
+    try:
+        params = api_params()
+        kind = str(params.pop('kind', '') or '')
+        if kind in JOB_VALIDATIONS:
+            if kind == 'url':
+                api_url_params(params)
+            api_requested_reports(params)
+            _, input_names = JOB_VALIDATIONS[kind]
+            inputs = [(name, api_upload(params, name)) for name in input_names]
+            params = {key: value for key, value in params.items() if key not in input_names}
+        elif kind == 'chains':
+            inputs, include_root, check_revocation = api_chain_bundles(validator, params)
+            params = {'include_root': include_root, 'revocation': check_revocation}
+        elif kind == 'bulk':
+            targets, invalid, check_hostname = api_bulk_targets(validator, params)
+            inputs = []
+            params = {'targets': [f"{hostname}:{port}" for hostname, port in targets],
+                      'invalid': invalid, 'check_hostname': check_hostname}
+        else:
+            return api_error(f"'kind' must be one of: {', '.join(JOB_KINDS)}")
+        job_id = job_queue.submit(kind, params, inputs)
+    except ValueError as e:
+        return api_error(str(e))
+    
+    status_url = url_for('job_status', job_id=job_id)
+    response = api_response({
+        'id': job_id,
+        'kind': kind,
+        'status': 'queued',
+        'status_url': status_url,
+        'stream_url': url_for('job_stream', job_id=job_id)
+    }, 202)
+    response.headers['Location'] = status_url
+    return response
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Status of a job, with its result once it has finished"""
+    job = job_queue.get(job_id) if job_queue.valid_job_id(job_id) else None
+    if job is None:
+        return api_error("Unknown job", 404)
+    return api_response(job_view(job))
+
+@app.route('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    """Stream a job's status changes until it finishes, as NDJSON or Server-Sent Events"""
+    if not job_queue.valid_job_id(job_id) or job_queue.get(job_id) is None:
+        return api_error("Unknown job", 404)
+    return stream_records(iter_job_updates(job_id))
+
+def monitor_endpoint_view(endpoint):
+    """A monitored endpoint as returned by the API: timestamps in ISO format"""
+    view = {key: value for key, value in endpoint.items() if key not in ('chain_hash', 'unchanged_count')}
+    view['check_hostname'] = bool(endpoint['check_hostname'])
+    view['enabled'] = bool(endpoint['enabled'])
+    for record, fields in [(view, ('created_at', 'next_due', 'last_checked', 'last_full_check', 'not_after'))] + \
+            [(change, ('checked_at', 'not_after')) for change in view.get('history', [])]:
+        for field in fields:
+            if record[field] is not None:
+                record[field] = datetime.datetime.utcfromtimestamp(record[field]).isoformat()
+    return view
+
+@app.route('/monitor/endpoints', methods=['POST'])
+def monitor_add_endpoints():
+    """Add hosts to the monitored inventory, or update the settings of ones already in it"""
+    validator = CertificateValidator()
+    
+    try:
+        params = api_params()
+        targets, invalid, check_hostname = api_bulk_targets(validator, params, MONITOR_MAX_ENDPOINTS)
+        if params.get('check_hostname') in (None, ''):
+            check_hostname = None  # keep the stored setting of known hosts
+        interval = params.get('interval')
+        if interval not in (None, ''):
+            try:
+                interval = int(interval)
+            except (TypeError, ValueError):
+                raise ValueError("'interval' must be a number of seconds")
+            if interval < 60:
+                raise ValueError("'interval' must be at least 60 seconds")
+        else:
+            interval = None
+        added, updated = monitor.add_endpoints(targets, interval, check_hostname)
+    except ValueError as e:
+        return api_error(str(e))
+    
+    return api_response({'added': added, 'updated': updated, 'invalid_entries': invalid}, 201 if added else 200)
+
+@app.route('/monitor/endpoints')
+def monitor_list_endpoints():
+    """Page through the monitored endpoints; pass next_cursor back as cursor for the next page"""
+    try:
+        cursor = int(request.args.get('cursor') or 0)
+        limit = min(1000, max(1, int(request.args.get('limit') or 100)))
+    except ValueError:
+        return api_error("'cursor' and 'limit' must be integers")
+    
+    endpoints = monitor.list_endpoints(request.args.get('status'), request.args.get('host'), cursor, limit)
+    return api_response({
+        'endpoints': [monitor_endpoint_view(endpoint) for endpoint in endpoints],
+        'next_cursor': endpoints[-1]['id'] if len(endpoints) == limit else None
+    })
+
+@app.route('/monitor/endpoints/<int:endpoint_id>', methods=['GET', 'DELETE'])
+def monitor_endpoint(endpoint_id):
+    """An endpoint's current state and recorded changes, or remove it from monitoring"""
+    if request.method == 'DELETE':
+        if not monitor.remove_endpoint(endpoint_id):
+            return api_error("Unknown endpoint", 404)
+        return api_response({'deleted': endpoint_id})
     
-    if file_type not in file_map:
+    endpoint = monitor.get_endpoint(endpoint_id)
+    if endpoint is None:
+        return api_error("Unknown endpoint", 404)
+    return api_response(monitor_endpoint_view(endpoint))
+
+@app.route('/monitor/status')
+def monitor_status():
+    """Scheduler state and a summary of the inventory"""
+    return api_response(monitor.stats())
+
+def inventory_view(record):
+    """An inventory record as returned by the API: timestamps in ISO format"""
+    view = {key: value for key, value in record.items() if key != 'id'}
+    if 'is_ca' in view:
+        view['is_ca'] = bool(view['is_ca'])
+    for entry in [view] + view.get('sightings', []):
+        for field in ('not_before', 'not_after', 'first_seen', 'last_seen'):
+            if entry.get(field) is not None:
+                entry[field] = datetime.datetime.utcfromtimestamp(entry[field]).isoformat()
+    return view
+
+def inventory_limit():
+    try:
+        return min(1000, max(1, int(request.args.get('limit') or 100)))
+    except ValueError:
+        raise ValueError("'limit' must be an integer")
+
+@app.route('/inventory/certificates')
+def inventory_certificates():
+    """Stored certificates expiring within `days`, from an issuer, or with a public key; paged by cursor"""
+    try:
+        days = request.args.get('days')
+        if days not in (None, ''):
+            try:
+                days = float(days)
+            except ValueError:
+                raise ValueError("'days' must be a number")
+        else:
+            days = None
+        certificates, next_cursor = inventory.certificates(
+            expiring_within=days,
+            issuer=request.args.get('issuer'),
+            issuer_dn=request.args.get('issuer_dn'),
+            spki_sha256=(request.args.get('spki_sha256') or '').lower() or None,
+            cursor=request.args.get('cursor'),
+            limit=inventory_limit()
+        )
+    except ValueError as e:
+        return api_error(str(e))
+    return api_response({
+        'certificates': [inventory_view(certificate) for certificate in certificates],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/inventory/certificates/<fingerprint>')
+def inventory_certificate(fingerprint):
+    """A stored certificate by SHA-256 fingerprint, with its names and where it was seen"""
+    certificate = inventory.certificate(fingerprint.replace(':', ''))
+    if certificate is None:
+        return api_error("Unknown certificate", 404)
+    return api_response(inventory_view(certificate))
+
+@app.route('/inventory/endpoints')
+def inventory_endpoints():
+    """Endpoints seen serving a certificate valid for `name`; paged by cursor"""
+    name = request.args.get('name') or ''
+    if not name.strip():
+        return api_error("'name' is required")
+    try:
+        endpoints, next_cursor = inventory.endpoints_serving(name, request.args.get('cursor'), inventory_limit())
+    except ValueError as e:
+        return api_error(str(e))
+    return api_response({
+        'endpoints': [inventory_view(endpoint) for endpoint in endpoints],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/download/<result_id>/<file_type>')
+def download_file(result_id, file_type):
+    if file_type not in DOWNLOADS or not artifact_store.valid_result_id(result_id):
         flash('Invalid download request.', 'error')
         return redirect(url_for('index'))
     
-    temp_filename, download_name = file_map[file_type]
-    file_path = os.path.join(TEMP_DIR, temp_filename)
+    download_name, mimetype = DOWNLOADS[file_type]
+    artifact = artifact_store.get(result_id, file_type)
     
-    if not os.path.exists(file_path):
+    # Render the report on its first download and keep it for later ones
+    if artifact is None and file_type in LAZY_REPORTS:
+        record = artifact_store.read(result_id, 'record')
+        if record is not None:
+            artifact_store.put(result_id, file_type,
+                               CertificateValidator().render_report(record, LAZY_REPORTS[file_type]))
+            artifact = artifact_store.get(result_id, file_type)
+    
+    if artifact is None:
         flash('File not found. Please validate again.', 'error')
         return redirect(url_for('index'))
     
-    return send_file(file_path, as_attachment=True, download_name=download_name)
+    kind, value = artifact
+    source = BytesIO(value) if kind == 'data' else value
+    return send_file(source, mimetype=mimetype, as_attachment=True, download_name=download_name)
 
 @app.route('/health')
 def health_check():
     """Health check endpoint for Render"""
     return jsonify({'status': 'healthy'}), 200
 
+@app.route('/stats')
+def cache_stats():
+    """Cache statistics for monitoring"""
+    return jsonify({
+        'trust_store': trust_store.stats(),
+        'intermediate_cache': intermediate_cache.stats(),
+        'certificate_parse_cache': certificate_parse_cache.stats(),
+        'certificate_info_cache': certificate_info_cache.stats(),
+        'key_match_cache': key_match_cache.stats(),
+        'signature_cache': signature_cache.stats(),
+        'shared_cache': shared_cache.stats(),
+        'artifact_store': artifact_store.stats(),
+        'job_queue': job_queue.stats(),
+        'monitor': monitor.stats(),
+        'inventory': inventory.stats(),
+        'ocsp_cache': dict(ocsp_cache.stats(), requests=ocsp_flight.stats()),
+        'crl_store': crl_store.stats(),
+        'url_certificate_cache': dict(url_certificate_cache.stats(), fetches=url_certificate_flight.stats()),
+        'built_chain_cache': dict(built_chain_cache.stats(), builds=built_chain_flight.stats()),
+        'tls_session_cache': dict(tls_session_cache.stats(), enabled=TLS_SESSION_RESUMPTION),
+        'tls_handshakes': tls_handshakes.stats(),
+        'client_contexts': len(_client_contexts)
+    }), 200
+
 @app.errorhandler(404)
 def not_found(e):
     return redirect(url_for('index'))
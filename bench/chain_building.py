@@ -0,0 +1,82 @@
+"""Benchmark for chain building on large shuffled bundles
+
+Each bundle has one root, 100 intermediates signed by it and leaves signed by a
+random intermediate, shuffled. The script times verify_certificate_chain_order
+(the preferred path for the first leaf) and build_chain_paths (every leaf's paths).
+
+With --baseline REV, app.py from that git revision is imported as well and its
+verify_certificate_chain_order is timed on the smallest bundle. Versions before
+the chain index are quadratic, so larger bundles take minutes.
+
+Usage: python bench/chain_building.py [--sizes 1000 5000] [--baseline REV]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+from common import REPO_DIR, import_app, make_certificate, make_key
+
+INTERMEDIATES = 100
+
+def build_bundle(size):
+    """A shuffled bundle of size certificates"""
+    root_key = make_key()
+    root = make_certificate('Bench Root', root_key, ca=True)
+    intermediates = []
+    for i in range(INTERMEDIATES):
+        key = make_key()
+        intermediates.append((make_certificate(f'Bench Intermediate {i}', key, root, root_key, ca=True), key))
+    
+    leaf_key = make_key()
+    leaves = []
+    for i in range(size - INTERMEDIATES - 1):
+        issuer, issuer_key = random.choice(intermediates)
+        leaves.append(make_certificate(f'leaf{i}.example.com', leaf_key, issuer, issuer_key))
+    
+    bundle = [root] + [cert for cert, _ in intermediates] + leaves
+    random.shuffle(bundle)
+    return bundle
+
+def import_baseline(revision):
+    """Import app.py as it was at revision"""
+    source = subprocess.run(['git', 'show', f'{revision}:app.py'], cwd=REPO_DIR, check=True,
+                            capture_output=True).stdout
+    path = os.path.join(tempfile.mkdtemp(prefix='ssl_validator_bench_'), 'baseline_app.py')
+    with open(path, 'wb') as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location('baseline_app', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def seconds(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000], help='bundle sizes (default: 1000 5000)')
+    parser.add_argument('--baseline', metavar='REV', help='also time verify_certificate_chain_order from this revision')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the bundle order (default: 1)')
+    args = parser.parse_args()
+    random.seed(args.seed)
+    
+    app = import_app()
+    validator = app.CertificateValidator()
+    baseline = import_baseline(args.baseline).CertificateValidator() if args.baseline else None
+    
+    for size in sorted(args.sizes):
+        bundle = build_bundle(size)
+        print(f"{size:,} certificates:")
+        print(f"  ordering:       {seconds(validator.verify_certificate_chain_order, bundle):.3f} s")
+        print(f"  all leaf paths: {seconds(validator.build_chain_paths, bundle):.3f} s")
+        if baseline is not None and size == min(args.sizes):
+            print(f"  ordering ({args.baseline}): {seconds(baseline.verify_certificate_chain_order, bundle):.3f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Helpers shared by the benchmark scripts"""
+import datetime
+import os
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+
+from cryptography import x509
+from cryptography.x509.oid import AuthorityInformationAccessOID, NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_app():
+    """Import app.py from the repository root"""
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    import app
+    return app
+
+def make_key():
+    return ec.generate_private_key(ec.SECP256R1())
+
+def make_certificate(common_name, key, issuer=None, issuer_key=None, ca=False, san=None, days=365, expired=False,
+                     crl_url=None, ocsp_url=None):
+    """A certificate for key, self-signed unless issuer and issuer_key are given
+    
+    An expired certificate was valid for days and ran out yesterday.
+    """
+    now = datetime.datetime.utcnow()
+    if expired:
+        now -= datetime.timedelta(days=days + 1)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+    signing_key = issuer_key or key
+    builder = (x509.CertificateBuilder()
+               .subject_name(name)
+               .issuer_name(issuer.subject if issuer is not None else name)
+               .public_key(key.public_key())
+               .serial_number(x509.random_serial_number())
+               .not_valid_before(now - datetime.timedelta(days=1))
+               .not_valid_after(now + datetime.timedelta(days=days))
+               .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+               .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)
+               .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(signing_key.public_key()),
+                              critical=False))
+    if san:
+        builder = builder.add_extension(x509.SubjectAlternativeName([x509.DNSName(n) for n in san]), critical=False)
+    if crl_url:
+        point = x509.DistributionPoint([x509.UniformResourceIdentifier(crl_url)], None, None, None)
+        builder = builder.add_extension(x509.CRLDistributionPoints([point]), critical=False)
+    if ocsp_url:
+        access = x509.AccessDescription(AuthorityInformationAccessOID.OCSP, x509.UniformResourceIdentifier(ocsp_url))
+        builder = builder.add_extension(x509.AuthorityInformationAccess([access]), critical=False)
+    return builder.sign(signing_key, hashes.SHA256())
+
+def start_tls_server(chain, key):
+    """Serve chain on a loopback port from a background thread; returns the port"""
+    directory = tempfile.mkdtemp(prefix='ssl_validator_bench_')
+    cert_path = os.path.join(directory, 'chain.pem')
+    key_path = os.path.join(directory, 'key.pem')
+    with open(cert_path, 'wb') as f:
+        f.write(b''.join(cert.public_bytes(serialization.Encoding.PEM) for cert in chain))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(128)
+    
+    def handle(conn):
+        try:
+            with context.wrap_socket(conn, server_side=True) as tls:
+                tls.recv(1)
+        except (OSError, ssl.SSLError):
+            pass
+    
+    def accept_loop():
+        while True:
+            conn, _ = listener.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+    
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return listener.getsockname()[1]
+
+def timed(func, number):
+    """Average wall time of func() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number * 1000
@@ -0,0 +1,50 @@
+"""Micro-benchmark for the shared client SSL contexts and TLS session resumption
+
+Starts a loopback TLS server with an ECDSA certificate and times:
+  - building a client context with ssl.create_default_context()
+  - looking up the shared context with get_client_context()
+  - fetching the certificate with a new context per request
+  - fetching the certificate with the shared context
+  - fetching the certificate with a resumed TLS session
+
+Usage: python bench/tls_contexts.py [--fetches N]
+"""
+import argparse
+import ssl
+
+from common import import_app, make_certificate, make_key, start_tls_server, timed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fetches', type=int, default=100, help='certificate fetches per mode (default: 100)')
+    args = parser.parse_args()
+    
+    app = import_app()
+    key = make_key()
+    port = start_tls_server([make_certificate('localhost', key, san=['localhost'])], key)
+    validator = app.CertificateValidator()
+    
+    def fresh_context():
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+    
+    def fetch(context=None):
+        app.tls_handshakes.run(validator.fetch_certificate_async('localhost', port, context=context))
+    
+    print(f"create_default_context():    {timed(fresh_context, 50):.3f} ms per call")
+    print(f"get_client_context() lookup: {timed(app.get_client_context, 100000):.5f} ms per call")
+    
+    app.TLS_SESSION_RESUMPTION = False
+    fetch()
+    print(f"fetch, per-request context:  {timed(lambda: fetch(fresh_context()), args.fetches):.2f} ms per fetch")
+    print(f"fetch, shared context:       {timed(fetch, args.fetches):.2f} ms per fetch")
+    
+    app.TLS_SESSION_RESUMPTION = True
+    fetch()
+    print(f"fetch, resumed session:      {timed(fetch, args.fetches):.2f} ms per fetch")
+    print(f"session cache: {app.tls_session_cache.stats()}")
+
+if __name__ == '__main__':
+    main()
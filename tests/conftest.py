@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'bench'))
+
+# Settings are read when app is imported: keep its databases out of the real
+# cache directory and start no background work
+os.environ['SHARED_CACHE_DIR'] = tempfile.mkdtemp(prefix='ssl_validator_tests_')
+os.environ['MONITOR_ENABLED'] = '0'
+os.environ['INVENTORY_ENABLED'] = '0'
+os.environ['JOB_WORKERS'] = '0'
+
+from common import make_certificate, make_key  # noqa: E402
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    return app
+
+@pytest.fixture
+def validator(app_module):
+    return app_module.CertificateValidator()
+
+@pytest.fixture(scope='session')
+def pki():
+    """A root, an intermediate it signed and a leaf the intermediate signed, with their keys"""
+    root_key, intermediate_key, leaf_key = make_key(), make_key(), make_key()
+    root = make_certificate('Test Root', root_key, ca=True)
+    intermediate = make_certificate('Test Intermediate', intermediate_key, root, root_key, ca=True)
+    leaf = make_certificate('leaf.example.com', leaf_key, intermediate, intermediate_key, san=['leaf.example.com'])
+    return {
+        'root': root, 'root_key': root_key,
+        'intermediate': intermediate, 'intermediate_key': intermediate_key,
+        'leaf': leaf, 'leaf_key': leaf_key
+    }
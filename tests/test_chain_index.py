@@ -0,0 +1,66 @@
+from common import make_certificate, make_key
+
+def names(chain):
+    return [cert.subject.rfc4514_string() for cert in chain]
+
+def cross_signed(pki):
+    """The test intermediate's subject and key, issued by a second root that expires sooner"""
+    other_root_key = make_key()
+    other_root = make_certificate('Other Root', other_root_key, ca=True, days=30)
+    cross = make_certificate('Test Intermediate', pki['intermediate_key'], other_root, other_root_key, ca=True, days=30)
+    return cross, other_root
+
+def test_chain_order_from_shuffled_bundle(validator, pki):
+    is_correct, ordered, message = validator.verify_certificate_chain_order([pki['root'], pki['leaf'], pki['intermediate']])
+    assert not is_correct
+    assert ordered == [pki['leaf'], pki['intermediate'], pki['root']]
+    assert message == "Chain order verified"
+
+def test_cross_signed_intermediate_gives_both_paths(validator, pki):
+    cross, other_root = cross_signed(pki)
+    bundle = [pki['leaf'], cross, pki['intermediate'], other_root, pki['root']]
+    paths = validator.build_chain_paths(bundle)
+    
+    # Both paths are complete and current; the one that stays valid longer wins
+    assert [names(path) for path in paths] == [
+        ['CN=leaf.example.com', 'CN=Test Intermediate', 'CN=Test Root'],
+        ['CN=leaf.example.com', 'CN=Test Intermediate', 'CN=Other Root'],
+    ]
+    assert paths[0][1] is pki['intermediate'] and paths[1][1] is cross
+    
+    _, ordered, message = validator.verify_certificate_chain_order(bundle)
+    assert ordered[:3] == paths[0]
+    assert message == "Chain order verified (2 candidate paths, preferred path shown)"
+
+def test_expired_path_ranks_after_longer_current_path(app_module, pki):
+    # Test Intermediate is also issued by a current Mid CA below a second root
+    other_root_key, mid_key = make_key(), make_key()
+    other_root = make_certificate('Other Root', other_root_key, ca=True)
+    mid = make_certificate('Mid CA', mid_key, other_root, other_root_key, ca=True)
+    via_mid = make_certificate('Test Intermediate', pki['intermediate_key'], mid, mid_key, ca=True)
+    expired = make_certificate('Test Intermediate', pki['intermediate_key'], pki['root'], pki['root_key'], ca=True,
+                               expired=True)
+    
+    index = app_module.ChainIndex([pki['leaf'], expired, pki['root'], via_mid, mid, other_root])
+    paths = index.paths_from(0)
+    assert paths == [[0, 3, 4, 5], [0, 1, 2]]
+
+def test_complete_path_ranks_before_incomplete(app_module, pki):
+    # The intermediate's own root is missing from the bundle
+    cross, other_root = cross_signed(pki)
+    index = app_module.ChainIndex([pki['leaf'], pki['intermediate'], cross, other_root])
+    assert index.paths_from(0) == [[0, 2, 3], [0, 1]]
+
+def test_duplicate_subjects_are_all_indexed_and_paths_are_capped(app_module, pki):
+    bundle = [pki['leaf']]
+    for i in range(app_module.ChainIndex.MAX_PATHS + 4):
+        root_key = make_key()
+        root = make_certificate(f'Root {i}', root_key, ca=True)
+        bundle += [make_certificate('Test Intermediate', pki['intermediate_key'], root, root_key, ca=True), root]
+    
+    index = app_module.ChainIndex(bundle)
+    assert len(index.issuers_of(0)) == app_module.ChainIndex.MAX_PATHS + 4
+    
+    paths = index.paths_from(0)
+    assert len(paths) == app_module.ChainIndex.MAX_PATHS
+    assert all(len(path) == 3 and index.is_self_signed(path[-1]) for path in paths)
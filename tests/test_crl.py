@@ -0,0 +1,111 @@
+import datetime
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+
+from common import make_certificate, make_key
+
+CRL_URL = 'http://crl.example.com/test-intermediate.crl'
+
+def write_crl(directory, issuer, issuer_key, revoked, name='test-intermediate.crl'):
+    """Write a DER CRL listing revoked (serial, reason) pairs"""
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    builder = (x509.CertificateRevocationListBuilder()
+               .issuer_name(issuer.subject)
+               .last_update(now - datetime.timedelta(hours=1))
+               .next_update(now + datetime.timedelta(days=1)))
+    for serial, reason in revoked:
+        entry = (x509.RevokedCertificateBuilder()
+                 .serial_number(serial)
+                 .revocation_date(now - datetime.timedelta(minutes=5)))
+        if reason is not None:
+            entry = entry.add_extension(x509.CRLReason(reason), critical=False)
+        builder = builder.add_revoked_certificate(entry.build())
+    with open(os.path.join(directory, name), 'wb') as f:
+        f.write(builder.sign(issuer_key, hashes.SHA256()).public_bytes(serialization.Encoding.DER))
+
+@pytest.fixture
+def crl_store(app_module, tmp_path, monkeypatch):
+    """A CRL store reading CRL_URL from a local directory"""
+    local_dir = tmp_path / 'local'
+    local_dir.mkdir()
+    store = app_module.CRLStore(cache_dir=str(tmp_path / 'cache'), local_dir=str(local_dir))
+    monkeypatch.setattr(app_module, 'crl_store', store)
+    return store
+
+def test_index_finds_every_listed_serial(app_module, tmp_path):
+    epoch = app_module.CRLIndex.EPOCH
+    rng = random.Random(1)
+    serials = sorted({rng.getrandbits(64) | 1 for _ in range(500)}) + [0, (1 << 159) - 1]
+    revoked = [SimpleNamespace(serial_number=serial, revocation_date=epoch + datetime.timedelta(seconds=serial % 10 ** 9))
+               for serial in serials]
+    index_path = str(tmp_path / 'crl.idx')
+    count, extra = app_module.CRLIndex.write(revoked, index_path)
+    assert (count, extra) == (len(serials), {})
+    
+    index = app_module.CRLIndex(index_path, None, {'count': count})
+    for entry in revoked:
+        assert index.lookup(entry.serial_number) == entry.revocation_date
+    for serial in (2, 1 << 64, (1 << 160) - 1):
+        assert index.lookup(serial) is None
+
+def test_serials_outside_the_record_width_are_kept_in_extra(app_module, tmp_path):
+    epoch = app_module.CRLIndex.EPOCH
+    when = epoch + datetime.timedelta(days=20000)
+    revoked = [SimpleNamespace(serial_number=serial, revocation_date=when) for serial in (1 << 200, -5, 42)]
+    index_path = str(tmp_path / 'crl.idx')
+    count, extra = app_module.CRLIndex.write(revoked, index_path)
+    assert count == 1
+    assert set(extra) == {str(1 << 200), '-5'}
+    
+    # extra goes through the metadata JSON, so its keys are strings
+    index = app_module.CRLIndex(index_path, None, {'count': count, 'extra': extra})
+    assert index.lookup(1 << 200) == when
+    assert index.lookup(-5) == when
+    assert index.lookup(42) == when
+    assert index.lookup(1 << 160) is None and index.lookup(-6) is None
+
+def test_revoked_serial_fails_the_crl_check(validator, pki, crl_store):
+    leaf = make_certificate('revoked.example.com', make_key(), pki['intermediate'], pki['intermediate_key'],
+                            crl_url=CRL_URL)
+    write_crl(crl_store.local_dir, pki['intermediate'], pki['intermediate_key'],
+              [(leaf.serial_number, x509.ReasonFlags.key_compromise), (leaf.serial_number + 1, None)])
+    
+    result = validator.check_crl(leaf, pki['intermediate'])
+    assert result['check'] == 'Revocation (CRL)' and not result['status']
+    assert result['message'].endswith("reason: key_compromise")
+
+def test_unlisted_serial_passes_the_crl_check(validator, pki, crl_store):
+    leaf = make_certificate('good.example.com', make_key(), pki['intermediate'], pki['intermediate_key'],
+                            crl_url=CRL_URL)
+    write_crl(crl_store.local_dir, pki['intermediate'], pki['intermediate_key'], [(leaf.serial_number + 1, None)])
+    
+    result = validator.check_crl(leaf, pki['intermediate'])
+    assert result == {
+        'check': 'Revocation (CRL)',
+        'status': True,
+        'message': "Certificate is not revoked (CRL with 1 entries)"
+    }
+    assert crl_store.stats()['rebuilds'] == 1
+
+def test_crl_from_another_issuer_is_rejected(validator, pki, crl_store):
+    leaf = make_certificate('other.example.com', make_key(), pki['intermediate'], pki['intermediate_key'],
+                            crl_url=CRL_URL)
+    write_crl(crl_store.local_dir, pki['intermediate'], make_key(), [])
+    
+    result = validator.check_crl(leaf, pki['intermediate'])
+    assert not result['status']
+    assert result['message'] == f"Could not obtain a valid CRL ({CRL_URL}: CRL is not signed by the certificate's issuer)"
+
+def test_local_crls_are_matched_by_file_name_only(pki, crl_store, tmp_path):
+    write_crl(crl_store.local_dir, pki['intermediate'], pki['intermediate_key'], [])
+    write_crl(str(tmp_path), pki['intermediate'], pki['intermediate_key'], [], name='outside.crl')
+    
+    assert crl_store.local_source(CRL_URL) == os.path.join(crl_store.local_dir, 'test-intermediate.crl')
+    assert crl_store.local_source('http://crl.example.com/../outside.crl') is None
+    assert crl_store.local_source(f'file://{tmp_path}/outside.crl') is None
+    assert crl_store.local_source('http://crl.example.com/') is None
@@ -0,0 +1,79 @@
+import json
+import socket
+import subprocess
+import sys
+
+import pytest
+
+@pytest.fixture
+def queue(app_module, tmp_path):
+    return app_module.JobQueue(path=str(tmp_path / 'jobs.sqlite3'), workers=1, lease=60, max_attempts=2)
+
+@pytest.fixture(scope='module')
+def dead_worker():
+    """Worker name of a process on this host that has exited"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return f"{socket.gethostname()}:{process.pid}"
+
+def kill_worker(queue, job_id, worker):
+    """Make it look as if job_id was claimed by worker, with its lease still running"""
+    queue._connection().execute('UPDATE jobs SET worker = ? WHERE id = ?', (worker, job_id))
+
+def test_job_of_a_dead_worker_is_retried_then_abandoned(queue, dead_worker):
+    job_id = queue.submit('url', {'url': 'example.com'})
+    assert queue.claim()['attempts'] == 1
+    
+    kill_worker(queue, job_id, dead_worker)
+    job = queue.claim()
+    assert (job['id'], job['status'], job['attempts']) == (job_id, 'running', 2)
+    
+    kill_worker(queue, job_id, dead_worker)
+    assert queue.claim() is None
+    job = queue.get(job_id)
+    assert (job['status'], job['error']) == ('failed', "Abandoned after 2 attempt(s)")
+
+def test_job_with_an_expired_lease_is_retried(app_module, tmp_path):
+    queue = app_module.JobQueue(path=str(tmp_path / 'jobs.sqlite3'), workers=1, lease=-1, max_attempts=3)
+    job_id = queue.submit('url', {'url': 'example.com'})
+    assert queue.claim()['attempts'] == 1
+    assert queue.claim()['attempts'] == 2
+    assert queue.get(job_id)['status'] == 'running'
+
+def test_live_lease_is_not_taken_over(queue):
+    queue.submit('url', {'url': 'example.com'})
+    assert queue.claim() is not None
+    assert queue.claim() is None
+
+def test_private_key_stays_in_memory(queue):
+    job_id = queue.submit('cert-key', {'key_password': 'secret', 'domain': 'example.com'},
+                          [('cert', b'certificate'), ('key', b'private key')])
+    
+    conn = queue._connection()
+    assert conn.execute('SELECT name FROM job_inputs WHERE job_id = ?', (job_id,)).fetchall() == [('cert',)]
+    assert json.loads(conn.execute('SELECT params FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]) == \
+        {'domain': 'example.com'}
+    
+    job = queue.claim()
+    assert job['params'] == {'key_password': 'secret', 'domain': 'example.com'}
+    assert queue.inputs(job_id) == [('cert', b'certificate'), ('key', b'private key')]
+    
+    queue.finish(job_id, result={'ok': True})
+    assert queue.inputs(job_id) == []
+    assert queue._secrets == {}
+
+def test_private_key_job_fails_when_its_owner_died(app_module, queue, dead_worker):
+    # The job was accepted by a process that has exited, taking the key with it
+    job_id = queue.submit('cert-key', {}, [('cert', b'certificate'), ('key', b'private key')])
+    queue._connection().execute('UPDATE jobs SET owner = ? WHERE id = ?', (dead_worker, job_id))
+    other_process = app_module.JobQueue(path=queue.path, workers=1)
+    
+    assert other_process.claim() is None
+    job = queue.get(job_id)
+    assert (job['status'], job['error']) == ('failed', app_module.JobQueue.LOST_SECRETS)
+    assert queue._connection().execute('SELECT COUNT(*) FROM job_inputs WHERE job_id = ?', (job_id,)).fetchone()[0] == 0
+
+def test_private_key_job_needs_a_worker_in_the_accepting_process(app_module, tmp_path):
+    queue = app_module.JobQueue(path=str(tmp_path / 'jobs.sqlite3'), workers=0)
+    with pytest.raises(ValueError):
+        queue.submit('cert-key', {}, [('cert', b'certificate'), ('key', b'private key')])
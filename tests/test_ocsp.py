@@ -0,0 +1,154 @@
+import datetime
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.x509 import ocsp
+
+from common import make_certificate, make_key
+
+class Responder:
+    """A loopback OCSP responder answering for one issuer
+    
+    It answers for the leaves made by leaf(). status, this_update, next_update,
+    signer (certificate, key) and delay can be changed between requests; every request
+    received is kept in requests.
+    """
+    
+    def __init__(self, issuer, issuer_key):
+        self.issuer = issuer
+        self.issuer_key = issuer_key
+        self.signer = (issuer, issuer_key)
+        self.status = ocsp.OCSPCertStatus.GOOD
+        self.this_update = datetime.timedelta(minutes=-1)
+        self.next_update = datetime.timedelta(hours=1)
+        self.delay = 0
+        self.requests = []
+        self.certificates = {}
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def handler(self):
+        responder = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = ocsp.load_der_ocsp_request(self.rfile.read(int(self.headers['Content-Length'])))
+                responder.requests.append(request)
+                time.sleep(responder.delay)
+                body = responder.respond(request)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/ocsp-response')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        return Handler
+    
+    def respond(self, request):
+        now = datetime.datetime.utcnow()
+        revoked = self.status == ocsp.OCSPCertStatus.REVOKED
+        builder = (ocsp.OCSPResponseBuilder()
+                   .add_response(self.certificates[request.serial_number], self.issuer, request.hash_algorithm,
+                                 self.status, now + self.this_update, now + self.next_update,
+                                 now - datetime.timedelta(days=1) if revoked else None,
+                                 x509.ReasonFlags.key_compromise if revoked else None)
+                   .responder_id(ocsp.OCSPResponderEncoding.HASH, self.signer[0]))
+        return builder.sign(self.signer[1], hashes.SHA256()).public_bytes(serialization.Encoding.DER)
+    
+    def leaf(self):
+        """A new leaf (so nothing about it is cached yet) naming this responder in its AIA"""
+        cert = make_certificate('ocsp.example.com', make_key(), self.issuer, self.issuer_key, ocsp_url=self.url)
+        self.certificates[cert.serial_number] = cert
+        return cert
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def responder(pki):
+    responder = Responder(pki['intermediate'], pki['intermediate_key'])
+    yield responder
+    responder.close()
+
+def test_good_response_is_cached_until_next_update(validator, pki, responder):
+    leaf = responder.leaf()
+    assert validator.check_ocsp(leaf, pki['intermediate']) == {
+        'check': 'Revocation (OCSP)',
+        'status': True,
+        'message': f"Certificate is not revoked (OCSP, {responder.url})"
+    }
+    assert validator.check_ocsp(leaf, pki['intermediate'])['message'] == "Certificate is not revoked (OCSP, cached)"
+    assert len(responder.requests) == 1
+    
+    # The request identifies the certificate and carries no nonce, so the answer can be shared
+    request = responder.requests[0]
+    assert request.serial_number == leaf.serial_number
+    assert list(request.extensions) == []
+
+def test_cached_response_expires_with_next_update(validator, pki, responder):
+    responder.next_update = datetime.timedelta(seconds=1)
+    leaf = responder.leaf()
+    assert validator.check_ocsp(leaf, pki['intermediate'])['status']
+    time.sleep(1.5)
+    assert validator.check_ocsp(leaf, pki['intermediate'])['status']
+    assert len(responder.requests) == 2
+
+def test_concurrent_lookups_share_one_request(app_module, pki, responder):
+    responder.delay = 0.3
+    leaf = responder.leaf()
+    results = []
+    
+    def lookup():
+        # Certificate objects are not thread-safe; each request parses its own copy
+        copies = [x509.load_der_x509_certificate(cert.public_bytes(serialization.Encoding.DER))
+                  for cert in (leaf, pki['intermediate'])]
+        results.append(app_module.CertificateValidator().check_ocsp(*copies))
+    
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8 and all(result['status'] for result in results)
+    assert len(responder.requests) == 1
+
+def test_revoked_status_is_reported(validator, pki, responder):
+    responder.status = ocsp.OCSPCertStatus.REVOKED
+    result = validator.check_ocsp(responder.leaf(), pki['intermediate'])
+    assert not result['status']
+    assert result['message'].endswith("reason: key_compromise")
+
+@pytest.mark.parametrize('this_update, next_update, error', [
+    (datetime.timedelta(days=-2), datetime.timedelta(days=-1), "OCSP response is stale"),
+    (datetime.timedelta(hours=1), datetime.timedelta(hours=2), "OCSP response is not yet valid"),
+])
+def test_response_outside_its_validity_window_is_rejected(validator, pki, responder, this_update, next_update, error):
+    responder.this_update, responder.next_update = this_update, next_update
+    leaf = responder.leaf()
+    result = validator.check_ocsp(leaf, pki['intermediate'])
+    assert result == {
+        'check': 'Revocation (OCSP)',
+        'status': False,
+        'message': f"Could not obtain a valid OCSP response ({responder.url}: {error})"
+    }
+    
+    # Rejected responses are not cached
+    responder.this_update, responder.next_update = datetime.timedelta(minutes=-1), datetime.timedelta(hours=1)
+    assert validator.check_ocsp(leaf, pki['intermediate'])['status']
+    assert len(responder.requests) == 2
+
+def test_response_signed_by_another_key_is_rejected(validator, pki, responder):
+    key = make_key()
+    responder.signer = (make_certificate('Test Intermediate', key), key)
+    result = validator.check_ocsp(responder.leaf(), pki['intermediate'])
+    assert not result['status']
+    assert result['message'].endswith("OCSP response is not signed by the issuer or an authorized responder)")
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+
+@pytest.fixture
+def parse_cache(app_module, monkeypatch):
+    cache = app_module.CertificateParseCache(max_entries=100, max_bytes=1 << 20)
+    monkeypatch.setattr(app_module, 'certificate_parse_cache', cache)
+    return cache
+
+@pytest.fixture
+def bundle(pki):
+    return b''.join(pki[name].public_bytes(serialization.Encoding.PEM) for name in ('leaf', 'intermediate', 'root'))
+
+def test_reuploaded_bundle_is_not_decoded_again(validator, parse_cache, bundle):
+    first = validator.load_certificate_chain(bundle)
+    second = validator.load_certificate_chain(bundle)
+    assert all(a is b for a, b in zip(first, second))
+    
+    stats = parse_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['hit_rate']) == (3, 3, 3, 0.5)
+    assert stats['bytes'] == sum(len(cert.public_bytes(serialization.Encoding.DER)) for cert in first)
+
+def test_threads_never_share_decoded_certificates(app_module, parse_cache, bundle):
+    mine = app_module.CertificateValidator().load_certificate_chain(bundle)
+    theirs = []
+    thread = threading.Thread(target=lambda: theirs.extend(app_module.CertificateValidator().load_certificate_chain(bundle)))
+    thread.start()
+    thread.join()
+    
+    assert [cert.serial_number for cert in theirs] == [cert.serial_number for cert in mine]
+    assert not any(a is b for a, b in zip(mine, theirs))
+    
+    # The exited thread's cache is dropped but its lookups still count
+    stats = parse_cache.stats()
+    assert (stats['threads'], stats['entries'], stats['misses']) == (1, 3, 6)
+
+def test_each_thread_cache_is_bounded_by_der_bytes(app_module, pki, monkeypatch):
+    size = len(pki['leaf'].public_bytes(serialization.Encoding.DER))
+    cache = app_module.CertificateParseCache(max_entries=100, max_bytes=size + 1)
+    cache.decode(pki['leaf'].public_bytes(serialization.Encoding.DER))
+    cache.decode(pki['intermediate'].public_bytes(serialization.Encoding.DER))
+    
+    stats = cache.stats()
+    assert stats['entries'] == 1 and stats['evictions'] == 1 and stats['bytes'] <= stats['max_bytes']
+
+def test_stats_endpoint_reports_the_parse_cache(app_module, parse_cache, bundle):
+    app_module.CertificateValidator().load_certificate_chain(bundle)
+    stats = app_module.app.test_client().get(f'{app_module.URL_PREFIX}/stats').get_json()['certificate_parse_cache']
+    assert stats['max_bytes'] == 1 << 20 and 'hit_rate' in stats
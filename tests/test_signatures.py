@@ -0,0 +1,63 @@
+from cryptography.exceptions import UnsupportedAlgorithm
+from cryptography.hazmat.primitives import hashes
+
+from common import make_certificate, make_key
+
+class DirectVerifyFails:
+    """A certificate whose verify_directly_issued_by raises error"""
+    
+    def __init__(self, cert, error):
+        self._cert = cert
+        self._error = error
+    
+    def __getattr__(self, name):
+        return getattr(self._cert, name)
+    
+    def verify_directly_issued_by(self, issuer):
+        raise self._error
+
+def forged_leaf(pki):
+    """A leaf naming the test intermediate as issuer but signed by another key"""
+    return make_certificate('forged.example.com', make_key(), pki['intermediate'], make_key())
+
+def test_chain_signatures_verify(validator, pki):
+    links = validator.verify_chain_signatures([pki['leaf'], pki['intermediate'], pki['root']])
+    assert [(status, message) for _, _, status, message in links] == [(True, "Signature verified")] * 2
+
+def test_bad_signature_fails_its_link(validator, pki):
+    links = validator.verify_chain_signatures([forged_leaf(pki), pki['intermediate'], pki['root']])
+    assert [status for _, _, status, _ in links] == [False, True]
+    assert links[0][3] == "Signature does not verify with the issuer's public key"
+    
+    result = validator.check_chain_signatures([forged_leaf(pki), pki['intermediate'], pki['root']])
+    assert not result['status']
+    assert result['message'].startswith("1 of 2 signature(s) failed")
+
+def test_fallback_verifies_with_the_public_key(validator, pki):
+    error = UnsupportedAlgorithm("not supported by verify_directly_issued_by")
+    assert validator.verify_signature(DirectVerifyFails(pki['leaf'], error), pki['intermediate']) == \
+        (True, "Signature verified")
+    assert validator.verify_signature(DirectVerifyFails(forged_leaf(pki), error), pki['intermediate']) == \
+        (False, "Signature does not verify with the issuer's public key")
+    
+    status, message = validator.verify_signature_with_public_key(pki['leaf'], pki['root'])
+    assert not status and message == "Issuer name does not match the issuer certificate's subject"
+
+def test_unexpected_error_fails_the_link_without_caching(app_module, validator, pki):
+    leaf = make_certificate('error.example.com', make_key(), pki['intermediate'], pki['intermediate_key'])
+    status, message = validator.verify_signature(DirectVerifyFails(leaf, RuntimeError("boom")), pki['intermediate'])
+    assert not status and message == "Signature verification failed: boom"
+    
+    cache_key = (leaf.fingerprint(hashes.SHA256()), pki['intermediate'].fingerprint(hashes.SHA256()))
+    assert app_module.signature_cache.get(cache_key) is None
+    assert validator.verify_signature(leaf, pki['intermediate']) == (True, "Signature verified")
+
+def test_url_check_verifies_only_the_built_path(validator, pki):
+    # A certificate the server sent that is not on the leaf's path is not a link
+    stray = make_certificate('Unrelated CA', make_key(), ca=True)
+    chain = [pki['leaf'], pki['intermediate'], stray, pki['root']]
+    check = validator.check_url('leaf.example.com', 443, fetched=(pki['leaf'], chain, 'leaf.example.com'))
+    
+    signatures = next(r for r in check['validation_results'] if r['check'] == 'Chain Signatures')
+    assert signatures['status'], signatures['message']
+    assert signatures['message'] == "All 2 issuer signature(s) verified"
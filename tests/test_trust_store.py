@@ -0,0 +1,60 @@
+import os
+import threading
+
+from cryptography.hazmat.primitives import serialization
+
+from common import make_certificate, make_key
+
+def write_bundle(path, certificates):
+    """Replace the bundle at path, as package managers do"""
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(b''.join(cert.public_bytes(serialization.Encoding.PEM) for cert in certificates))
+    os.replace(f'{path}.tmp', path)
+
+def test_reload_applies_added_and_removed_anchors(app_module, pki, tmp_path):
+    path = str(tmp_path / 'roots.pem')
+    other_root = make_certificate('Other Root', make_key(), ca=True)
+    write_bundle(path, [other_root])
+    store = app_module.TrustStore(path=path, check_interval=0)
+    store.load()
+    assert store.find_issuer(pki['intermediate']) is None
+    
+    write_bundle(path, [pki['root']])
+    assert store.find_issuer(pki['intermediate']) == pki['root']
+    assert store.contains(pki['root']) and not store.contains(other_root)
+    assert len(store) == 1
+
+def test_lookups_during_reloads_see_a_consistent_index(app_module, pki, tmp_path):
+    path = str(tmp_path / 'roots.pem')
+    fillers = [make_certificate(f'Filler {i}', make_key(), ca=True) for i in range(20)]
+    write_bundle(path, fillers + [pki['root']])
+    store = app_module.TrustStore(path=path, check_interval=3600)
+    store.load()
+    
+    # The root stays in every version of the bundle while the fillers come and go
+    stop = threading.Event()
+    errors = []
+    
+    def look_up():
+        intermediate = app_module.CertificateValidator().parse_der_certificate(
+            pki['intermediate'].public_bytes(serialization.Encoding.DER))
+        while not stop.is_set():
+            try:
+                anchor = store.find_issuer(intermediate)
+                if anchor is None or anchor.subject != intermediate.issuer:
+                    errors.append(anchor)
+            except Exception as e:
+                errors.append(e)
+    
+    threads = [threading.Thread(target=look_up) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for i in range(30):
+            write_bundle(path, fillers[i % 2::2] + [pki['root']] + fillers[:i % 3])
+            store.load()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert errors == []